@@ -6,11 +6,14 @@ CORREÇÕES: target_duration, is_short, formato de imagens
 """
 
 import os
+import json
 import asyncio
 import logging
 import subprocess
 import tempfile
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
 from dotenv import load_dotenv
@@ -33,13 +36,32 @@ from config.settings import (
     TELEGRAM_BOT_TOKEN,
     AUTHORIZED_USERS,
     OUTPUT_PROJECTS,
+    PIPELINE_CONFIG,
+    SEARCH_CACHE,
+    MEDIA_LIBRARY,
+    MEDIA_DEDUP,
+    CACHE_WARMER,
     print_config_status
 )
-from src.generators.text_generator import TextGenerator
+from src.generators.text_generator import TextGenerator, SEARCH_ACTIONS, EMOTION_SEARCH_TERMS
 from src.generators.image_generator import ImageGenerator
 from src.generators.audio_generator import AudioGenerator
 from src.generators.video_generator import VideoGenerator
+from src.generators.progressive_renderer import ProgressiveRenderer
 from src.platforms.youtube_uploader import YouTubeUploader
+from src.utils.audio_fitter import AudioFitter
+from src.utils.voice_samples import VoiceSampleStore
+from src.utils.cache_warmer import CacheWarmer, common_search_terms
+from src.utils.media_acquisition import MediaAcquisition, TENOR_SEARCH_URL, PIXABAY_SEARCH_URL
+from src.utils.search_cache import SearchCache
+from src.utils.media_library import MediaLibrary
+from src.utils.perceptual_hash import HashSet
+from src.utils.search_terms import (
+    ACTION_MAPPINGS,
+    CONCEPT_MAPPINGS,
+    KeywordMatcher,
+    relevant_words,
+)
 
 # Logging
 logging.basicConfig(
@@ -68,161 +90,16 @@ class StickerDownloader:
         if not self.pixabay_key:
             logger.warning("⚠️ PIXABAY_API_KEY não encontrada no .env")
         
-        # Mapeamento de ações/emoções PT → EN
-        self.action_mappings = {
-            "pensando": "thinking",
-            "pensar": "thinking",
-            "refletindo": "thinking pondering",
-            "andando": "walking",
-            "andar": "walking",
-            "correndo": "running",
-            "correr": "running fast",
-            "falando": "talking speaking",
-            "falar": "talking",
-            "apontando": "pointing",
-            "apontar": "pointing finger",
-            "dançando": "dancing",
-            "dançar": "dancing happy",
-            "escrevendo": "writing",
-            "escrever": "writing pen",
-            "digitando": "typing keyboard",
-            "digitar": "typing computer",
-            "pulando": "jumping",
-            "pular": "jumping excited",
-            "chorando": "crying sad",
-            "chorar": "crying tears",
-            "rindo": "laughing",
-            "rir": "laughing funny",
-            "gargalhando": "laughing hard lol",
-            "surpreso": "surprised shocked",
-            "surpresa": "surprised wow",
-            "chocado": "shocked omg",
-            "confuso": "confused thinking",
-            "feliz": "happy smiling",
-            "triste": "sad crying",
-            "animado": "excited happy",
-            "nervoso": "nervous anxious",
-            "com medo": "scared afraid",
-            "assustado": "scared frightened",
-            "bravo": "angry mad",
-            "irritado": "angry frustrated",
-            "dormindo": "sleeping zzz",
-            "acordando": "waking up morning",
-            "comendo": "eating food",
-            "bebendo": "drinking",
-            "trabalhando": "working busy",
-            "estudando": "studying reading",
-            "lendo": "reading book",
-            "olhando": "looking watching",
-            "procurando": "searching looking",
-            "esperando": "waiting bored",
-            "comemorando": "celebrating party",
-            "aplaudindo": "clapping applause",
-            "acenando": "waving hello",
-            "explicando": "explaining teaching",
-            "mostrando": "showing presenting",
-            "descobrindo": "discovering eureka",
-            "aprendendo": "learning studying",
-            "perguntando": "asking question",
-            "respondendo": "answering",
-            "concordando": "agreeing nodding yes",
-            "discordando": "disagreeing no",
-            "duvidando": "doubting hmm",
-            "amando": "loving heart",
-            "odiando": "hating angry",
-            "ignorando": "ignoring whatever",
-            "fugindo": "running away escape",
-            "chegando": "arriving coming",
-            "saindo": "leaving bye",
-            "começando": "starting begin",
-            "terminando": "finishing done",
-            "ganhando": "winning victory",
-            "perdendo": "losing fail",
-        }
+        # Respostas de busca reaproveitadas entre jobs (termos comuns se repetem)
+        self.search_cache = SearchCache() if SEARCH_CACHE["enabled"] else None
         
-        # Mapeamento de conceitos/objetos PT → EN
-        self.concept_mappings = {
-            "dinheiro": "money cash",
-            "rico": "rich money",
-            "pobre": "poor broke",
-            "cérebro": "brain smart",
-            "inteligente": "smart genius",
-            "burro": "dumb confused",
-            "coração": "heart love",
-            "amor": "love heart romantic",
-            "ódio": "hate angry",
-            "ideia": "idea lightbulb eureka",
-            "pergunta": "question confused",
-            "resposta": "answer solution",
-            "sucesso": "success winner",
-            "fracasso": "fail loser",
-            "vitória": "victory winning",
-            "derrota": "defeat losing",
-            "tempo": "time clock",
-            "rápido": "fast speed",
-            "devagar": "slow waiting",
-            "universo": "universe space galaxy",
-            "espaço": "space astronaut",
-            "planeta": "planet earth world",
-            "terra": "earth world globe",
-            "sol": "sun sunny bright",
-            "lua": "moon night",
-            "estrela": "star shining",
-            "fogo": "fire burning hot",
-            "água": "water splash",
-            "ar": "wind air blow",
-            "comida": "food eating hungry",
-            "fome": "hungry starving",
-            "casa": "house home",
-            "família": "family together",
-            "carro": "car driving",
-            "avião": "airplane flying",
-            "computador": "computer typing",
-            "celular": "phone texting",
-            "internet": "internet online",
-            "livro": "book reading",
-            "escola": "school studying",
-            "trabalho": "work office busy",
-            "música": "music dancing",
-            "filme": "movie watching",
-            "jogo": "game playing",
-            "esporte": "sports athletic",
-            "animal": "animal cute",
-            "cachorro": "dog puppy",
-            "gato": "cat kitty",
-            "pessoa": "person human",
-            "homem": "man guy",
-            "mulher": "woman girl",
-            "criança": "child kid",
-            "bebê": "baby cute",
-            "velho": "old elderly",
-            "jovem": "young teenager",
-            "amigo": "friend buddy",
-            "inimigo": "enemy rival",
-            "incrível": "amazing wow awesome",
-            "impressionante": "impressive wow",
-            "curioso": "curious wondering",
-            "interessante": "interesting hmm",
-            "chato": "boring bored",
-            "divertido": "funny fun",
-            "perigoso": "danger warning",
-            "seguro": "safe secure",
-            "importante": "important attention",
-            "secreto": "secret mystery shh",
-            "misterioso": "mystery suspicious",
-            "verdade": "true real",
-            "mentira": "lie false",
-            "problema": "problem trouble",
-            "solução": "solution fixed",
-            "começar": "start begin",
-            "fim": "end finish",
-            "primeiro": "first number one",
-            "último": "last final",
-            "maior": "bigger large",
-            "menor": "smaller tiny",
-            "melhor": "better best",
-            "pior": "worse worst",
-        }
+        # Mídias já baixadas em outros jobs (consultada antes de qualquer busca)
+        self.media_library = MediaLibrary() if MEDIA_LIBRARY["enabled"] else None
+        
+        # Mapeamentos PT → EN (ações/emoções e conceitos/objetos), compilados numa regex só
+        self.action_mappings = ACTION_MAPPINGS
+        self.concept_mappings = CONCEPT_MAPPINGS
+        self.keyword_matcher = KeywordMatcher(self.action_mappings, self.concept_mappings)
         
         # Variações para evitar repetição
         self.scene_variations = [
@@ -242,114 +119,11 @@ class StickerDownloader:
             "stickman_comic": "stick figure comic",
         }
     
-    def validate_media_file(self, file_path: str) -> bool:
-        """
-        Valida se o arquivo de mídia está íntegro e pode ser usado
-        
-        Returns:
-            True se válido, False se corrompido
-        """
-        if not os.path.exists(file_path):
-            return False
-        
-        # Verifica tamanho mínimo (arquivos muito pequenos geralmente são inválidos)
-        file_size = os.path.getsize(file_path)
-        if file_size < 1000:  # Menos de 1KB
-            print(f"      ⚠️ Arquivo muito pequeno: {file_size} bytes")
-            return False
-        
-        ext = Path(file_path).suffix.lower()
-        
-        if ext in ['.mp4', '.webm', '.mov']:
-            # Valida vídeo usando ffprobe
-            try:
-                result = subprocess.run([
-                    'ffprobe', '-v', 'error',
-                    '-select_streams', 'v:0',
-                    '-show_entries', 'stream=width,height,duration,nb_frames',
-                    '-of', 'csv=p=0',
-                    file_path
-                ], capture_output=True, text=True, timeout=10)
-                
-                if result.returncode != 0:
-                    print(f"      ⚠️ ffprobe erro: {result.stderr[:100] if result.stderr else 'unknown'}")
-                    return False
-                
-                output = result.stdout.strip()
-                if not output:
-                    print(f"      ⚠️ Sem informações de stream de vídeo")
-                    return False
-                
-                # Verifica se tem dimensões válidas
-                parts = output.split(',')
-                if len(parts) >= 2:
-                    try:
-                        width = int(parts[0]) if parts[0] else 0
-                        height = int(parts[1]) if parts[1] else 0
-                        if width < 10 or height < 10:
-                            print(f"      ⚠️ Dimensões inválidas: {width}x{height}")
-                            return False
-                    except ValueError:
-                        pass
-                
-                return True
-                
-            except subprocess.TimeoutExpired:
-                print(f"      ⚠️ Timeout ao validar vídeo")
-                return False
-            except FileNotFoundError:
-                # ffprobe não encontrado, assume válido
-                logger.warning("ffprobe não encontrado, pulando validação")
-                return True
-            except Exception as e:
-                print(f"      ⚠️ Erro ao validar vídeo: {e}")
-                return False
-        
-        elif ext == '.gif':
-            # Para GIFs, verificação básica com PIL
-            try:
-                from PIL import Image
-                with Image.open(file_path) as img:
-                    # Tenta carregar o primeiro frame
-                    img.load()
-                    # Verifica dimensões
-                    if img.width < 10 or img.height < 10:
-                        print(f"      ⚠️ GIF muito pequeno: {img.width}x{img.height}")
-                        return False
-                return True
-            except Exception as e:
-                print(f"      ⚠️ GIF inválido: {e}")
-                return False
-        
-        elif ext in ['.jpg', '.jpeg', '.png', '.webp']:
-            # Para imagens
-            try:
-                from PIL import Image
-                with Image.open(file_path) as img:
-                    img.load()
-                    if img.width < 10 or img.height < 10:
-                        return False
-                return True
-            except Exception as e:
-                print(f"      ⚠️ Imagem inválida: {e}")
-                return False
-        
-        # Tipo desconhecido, assume válido
-        return True
-    
     def generate_search_term(self, prompt: str, topic: str, style: str = "tenor_sticker", scene_index: int = 0) -> str:
         """Converte o prompt da IA em termo de busca otimizado para Tenor"""
         prompt_lower = prompt.lower()
         
-        found_actions = []
-        for pt_word, en_word in self.action_mappings.items():
-            if pt_word in prompt_lower:
-                found_actions.append(en_word)
-        
-        found_concepts = []
-        for pt_word, en_word in self.concept_mappings.items():
-            if pt_word in prompt_lower:
-                found_concepts.append(en_word)
+        found_actions, found_concepts = self.keyword_matcher.find(prompt_lower)
         
         prefix = self.style_prefixes.get(style, "stick figure")
         search_parts = []
@@ -366,29 +140,16 @@ class StickerDownloader:
             search_parts.append(found_concepts[concept_idx])
         
         if len(search_parts) <= 1:
-            stopwords = [
-                "a", "o", "as", "os", "um", "uma", "de", "da", "do", "das", "dos",
-                "em", "na", "no", "nas", "nos", "para", "por", "com", "sem",
-                "que", "se", "é", "são", "foi", "era", "será", "está", "estão",
-                "muito", "mais", "menos", "bem", "mal", "aqui", "ali", "lá",
-                "isso", "isto", "esse", "este", "essa", "esta", "qual", "quais",
-                "como", "quando", "onde", "porque", "porquê", "scene", "showing",
-                "image", "depicting", "illustration", "about", "the", "and",
-                "cena", "mostrando", "imagem", "sobre", "dramatic", "high", "quality",
-                "parte", "primeiro", "segundo", "terceiro", "número"
-            ]
+            words = relevant_words(prompt_lower)
             
-            words = prompt_lower.split()
-            relevant_words = [w for w in words if w not in stopwords and len(w) > 3]
-            
-            if relevant_words:
-                word_idx = scene_index % max(1, len(relevant_words))
-                search_parts.append(relevant_words[word_idx])
+            if words:
+                word_idx = scene_index % max(1, len(words))
+                search_parts.append(words[word_idx])
                 
-                if len(relevant_words) > 1:
-                    word_idx2 = (scene_index + 1) % len(relevant_words)
+                if len(words) > 1:
+                    word_idx2 = (scene_index + 1) % len(words)
                     if word_idx2 != word_idx:
-                        search_parts.append(relevant_words[word_idx2])
+                        search_parts.append(words[word_idx2])
         
         if len(search_parts) <= 2:
             variation = self.scene_variations[scene_index % len(self.scene_variations)]
@@ -402,352 +163,97 @@ class StickerDownloader:
         
         return " ".join(search_parts)
     
-    def search_tenor(self, query: str, limit: int = 20) -> list:
-        """Busca GIFs/MP4 no Tenor"""
-        if not self.tenor_key:
-            return []
-        
+    def fetch_tenor(self, params: dict) -> list:
+        """Busca síncrona no Tenor (revalidação do SearchCache); None em erro, para não ir ao cache"""
         try:
-            url = "https://tenor.googleapis.com/v2/search"
-            params = {
-                "q": query,
-                "key": self.tenor_key,
-                "limit": limit,
-                "media_filter": "mp4,gif",
-                "contentfilter": "medium"
-            }
-            
-            response = requests.get(url, params=params, timeout=30)
+            response = requests.get(TENOR_SEARCH_URL, params=params, timeout=30)
             
             if response.status_code == 200:
                 return response.json().get("results", [])
             else:
                 logger.error(f"Tenor erro: {response.status_code}")
-                return []
+                return None
                 
         except Exception as e:
             logger.error(f"Tenor exceção: {e}")
-            return []
-    
-    def search_tenor_stickers(self, query: str, limit: int = 20) -> list:
-        """Busca especificamente stickers no Tenor"""
-        if not self.tenor_key:
-            return []
-        
-        try:
-            url = "https://tenor.googleapis.com/v2/search"
-            params = {
-                "q": query,
-                "key": self.tenor_key,
-                "limit": limit,
-                "searchfilter": "sticker",
-                "media_filter": "mp4,gif,tinygif"
-            }
-            
-            response = requests.get(url, params=params, timeout=30)
-            
-            if response.status_code == 200:
-                return response.json().get("results", [])
-            return []
-            
-        except Exception as e:
-            logger.error(f"Erro ao buscar stickers: {e}")
-            return []
+            return None
     
-    def search_pixabay(self, query: str, limit: int = 10, orientation: str = "vertical") -> list:
-        """Busca imagens no Pixabay (fallback)"""
-        if not self.pixabay_key:
-            return []
-        
+    def fetch_pixabay(self, params: dict) -> list:
+        """Busca síncrona no Pixabay (revalidação do SearchCache); None em erro"""
         try:
-            url = "https://pixabay.com/api/"
-            params = {
-                "key": self.pixabay_key,
-                "q": query,
-                "per_page": limit,
-                "orientation": orientation,
-                "image_type": "illustration",
-                "safesearch": "true"
-            }
-            
-            response = requests.get(url, params=params, timeout=30)
+            response = requests.get(PIXABAY_SEARCH_URL, params=params, timeout=30)
             
             if response.status_code == 200:
                 return response.json().get("hits", [])
-            return []
-            
-        except Exception as e:
-            logger.error(f"Pixabay exceção: {e}")
-            return []
-    
-    def download_tenor_media(self, result: dict, output_path: str) -> dict:
-        """
-        Baixa mídia do Tenor COM VALIDAÇÃO
-        Tenta múltiplos formatos se um falhar
-        """
-        try:
-            media_formats = result.get("media_formats", {})
-            
-            # Lista de formatos em ordem de preferência
-            format_priority = [
-                ("mp4", "mp4"),
-                ("gif", "gif"),
-                ("mediumgif", "gif"),
-                ("tinygif", "gif"),
-                ("nanogif", "gif"),
-            ]
-            
-            for format_key, ext in format_priority:
-                if format_key not in media_formats:
-                    continue
-                
-                media_url = media_formats[format_key].get("url")
-                if not media_url:
-                    continue
-                
-                final_path = output_path.rsplit(".", 1)[0] + f".{ext}"
-                
-                try:
-                    response = requests.get(media_url, timeout=60)
-                    
-                    if response.status_code != 200:
-                        continue
-                    
-                    # Verifica se recebeu dados
-                    if len(response.content) < 500:
-                        print(f"      ⚠️ Formato {format_key}: resposta muito pequena")
-                        continue
-                    
-                    # Salva o arquivo
-                    with open(final_path, "wb") as f:
-                        f.write(response.content)
-                    
-                    # VALIDA o arquivo baixado
-                    if self.validate_media_file(final_path):
-                        return {
-                            "path": final_path,
-                            "type": ext,
-                            "id": result.get("id"),
-                            "source": "tenor",
-                            "format_used": format_key
-                        }
-                    else:
-                        # Remove arquivo inválido e tenta próximo formato
-                        print(f"      🗑️ Formato {format_key} inválido, tentando outro...")
-                        try:
-                            os.remove(final_path)
-                        except:
-                            pass
-                        continue
-                        
-                except requests.exceptions.Timeout:
-                    print(f"      ⚠️ Timeout no formato {format_key}")
-                    continue
-                except Exception as e:
-                    print(f"      ⚠️ Erro com formato {format_key}: {e}")
-                    continue
-            
-            # Nenhum formato funcionou
             return None
             
         except Exception as e:
-            logger.error(f"Erro ao baixar do Tenor: {e}")
+            logger.error(f"Pixabay exceção: {e}")
             return None
     
-    def download_pixabay_image(self, result: dict, output_path: str) -> dict:
-        """Baixa imagem do Pixabay com validação"""
-        try:
-            # Tenta diferentes tamanhos
-            url_options = [
-                result.get("largeImageURL"),
-                result.get("webformatURL"),
-                result.get("previewURL"),
-            ]
-            
-            for image_url in url_options:
-                if not image_url:
-                    continue
-                
-                final_path = output_path.rsplit(".", 1)[0] + ".jpg"
-                
-                try:
-                    response = requests.get(image_url, timeout=60)
-                    
-                    if response.status_code != 200:
-                        continue
-                    
-                    with open(final_path, "wb") as f:
-                        f.write(response.content)
-                    
-                    # Valida
-                    if self.validate_media_file(final_path):
-                        return {
-                            "path": final_path,
-                            "type": "image",
-                            "id": result.get("id"),
-                            "source": "pixabay"
-                        }
-                    else:
-                        try:
-                            os.remove(final_path)
-                        except:
-                            pass
-                        continue
-                        
-                except Exception as e:
-                    continue
-            
-            return None
-            
-        except Exception as e:
-            logger.error(f"Erro ao baixar do Pixabay: {e}")
-            return None
+    def start_session(self, topic: str, output_dir: str, style: str = "tenor_sticker",
+                      workers: int = 0, target_size: tuple = None) -> "MediaSession":
+        """Sessão de busca compartilhada (permite prefetch das cenas em paralelo)"""
+        return MediaSession(self, topic, output_dir, style, workers=workers,
+                            target_size=target_size)
+    
+    def _fetch_scene_media(self, i: int, prompt, session: "MediaSession", total: int) -> dict:
+        """Busca e baixa a mídia de UMA cena (prefetch em thread; mesmo motor das demais)"""
+        return MediaAcquisition(self, session, concurrency=1).fetch_scene(i, prompt, total)
     
-    def get_media_for_scenes(
+    async def get_media_for_scenes_async(
         self,
         topic: str,
         prompts: list,
         output_dir: str,
         style: str = "tenor_sticker",
-        send_log_callback=None
+        send_log_callback=None,
+        session: "MediaSession" = None,
+        target_size: tuple = None
     ) -> list:
         """
         Busca e baixa mídias para cada cena do vídeo
         v4.5: Com validação de arquivos baixados
+        
+        As cenas são buscadas em paralelo (MediaAcquisition, limite em
+        PIPELINE_CONFIG["media_concurrency"]) com termos e IDs únicos entre elas.
+        Com uma sessão que já fez prefetch (roteiro em streaming), as cenas
+        prontas são reaproveitadas e só as que faltam são buscadas aqui.
+        
+        Com target_size (largura, altura do vídeo), cada GIF vem na menor
+        rendição do Tenor que ainda cobre a tela (ver rank_tenor_formats).
         """
-        media_files = []
         os.makedirs(output_dir, exist_ok=True)
         
-        used_ids = set()
-        used_search_terms = set()
-        failed_scenes = []
+        if session is None:
+            session = self.start_session(topic, output_dir, style, target_size=target_size)
         
-        for i, prompt in enumerate(prompts):
-            # ===== TRATA DICT OU STRING =====
-            if isinstance(prompt, dict):
-                descricao = prompt.get("descricao", f"Cena {i+1}")
-                search_term = prompt.get("busca_tenor", None)
-                emocao = prompt.get("emocao", "neutral")
-            else:
-                descricao = str(prompt)
-                search_term = None
-                emocao = "neutral"
-            
-            print(f"\n  📍 Cena {i+1}/{len(prompts)}")
-            print(f"    📝 Descrição: {descricao[:60]}...")
-            
-            media_info = None
-            attempts = 0
-            max_attempts = 4  # Aumentado para ter mais chances
-            
-            while media_info is None and attempts < max_attempts:
-                attempts += 1
-                
-                # Primeira tentativa: usa termo da IA
-                # Demais tentativas: gera novos termos
-                if search_term and attempts == 1:
-                    current_search = search_term
-                else:
-                    current_search = self.generate_search_term(
-                        prompt=descricao, 
-                        topic=topic, 
-                        style=style, 
-                        scene_index=i + (attempts - 1) * 10
-                    )
-                
-                # Evita termos repetidos
-                original_term = current_search
-                term_attempt = 0
-                while current_search in used_search_terms and term_attempt < 5:
-                    term_attempt += 1
-                    variation = self.scene_variations[(i + term_attempt) % len(self.scene_variations)]
-                    current_search = f"{original_term} {variation}"
-                
-                used_search_terms.add(current_search)
-                
-                print(f"    🔍 Busca ({attempts}/{max_attempts}): '{current_search}'")
-                
-                # Decide qual tipo de busca fazer
-                use_stickers = style in ["tenor_sticker", "stickman", "stickman_cute"]
-                
-                if use_stickers:
-                    results = self.search_tenor_stickers(current_search, limit=25)
-                else:
-                    results = self.search_tenor(current_search, limit=25)
-                
-                # Filtra IDs já usados
-                available_results = [r for r in results if r.get("id") not in used_ids]
-                
-                print(f"    📊 Resultados: {len(results)} total, {len(available_results)} disponíveis")
-                
-                if not available_results:
-                    if attempts < max_attempts:
-                        print(f"    ⚠️ Sem resultados novos, tentando busca diferente...")
-                        search_term = None  # Força gerar novo termo
-                    continue
-                
-                # Tenta baixar resultados até conseguir um válido
-                for result in available_results:
-                    result_id = result.get("id")
-                    
-                    if result_id in used_ids:
-                        continue
-                    
-                    temp_path = os.path.join(output_dir, f"media_{i+1:02d}")
-                    media_info = self.download_tenor_media(result, temp_path)
-                    
-                    if media_info:
-                        used_ids.add(result_id)
-                        format_used = media_info.get('format_used', media_info['type'])
-                        print(f"    ✅ Baixado: {media_info['type'].upper()} ({format_used}) - ID: {result_id[:8]}...")
-                        break
-                    else:
-                        # Marca ID como usado mesmo se falhou para não tentar de novo
-                        used_ids.add(result_id)
-                
-                if not media_info and attempts < max_attempts:
-                    print(f"    ⚠️ Downloads falharam, tentando nova busca...")
-                    search_term = None
-            
-            # Fallback: Pixabay se Tenor falhou completamente
-            if not media_info and self.pixabay_key:
-                print(f"    🔄 Fallback: Pixabay...")
-                
-                # Usa termo mais genérico para Pixabay
-                pixabay_terms = [
-                    current_search.replace("stick figure", "illustration"),
-                    f"illustration {topic}",
-                    topic,
-                ]
-                
-                for px_term in pixabay_terms:
-                    if media_info:
-                        break
-                        
-                    pixabay_results = self.search_pixabay(px_term, limit=10)
-                    available_pixabay = [r for r in pixabay_results if f"px_{r.get('id')}" not in used_ids]
-                    
-                    for result in available_pixabay:
-                        temp_path = os.path.join(output_dir, f"media_{i+1:02d}")
-                        media_info = self.download_pixabay_image(result, temp_path)
-                        
-                        if media_info:
-                            used_ids.add(f"px_{result.get('id')}")
-                            print(f"    ✅ Pixabay: imagem válida")
-                            break
-            
-            # Resultado final para esta cena
-            if media_info:
-                media_files.append(media_info["path"])
-            else:
-                failed_scenes.append(i + 1)
-                print(f"    ❌ FALHA: Nenhuma mídia válida para cena {i+1}")
+        start_time = datetime.now()
+        engine = MediaAcquisition(self, session)
+        try:
+            results = await engine.run(prompts)
+        finally:
+            session.close()
+        
+        # Ordem das cenas preservada; cenas sem mídia ficam de fora
+        media_files = [info["path"] for info in results if info]
+        failed_scenes = [i + 1 for i, info in enumerate(results) if not info]
         
         # Resumo final
         print(f"\n  {'='*40}")
         print(f"  📊 RESUMO DO DOWNLOAD:")
-        print(f"  ✅ Sucesso: {len(media_files)}/{len(prompts)} mídias")
-        print(f"  🔢 IDs únicos usados: {len(used_ids)}")
+        print(f"  ✅ Sucesso: {len(media_files)}/{len(prompts)} mídias "
+              f"em {(datetime.now() - start_time).total_seconds():.1f}s")
+        print(f"  🔢 IDs únicos usados: {len(session.used_ids)}")
+        if engine.bytes_downloaded:
+            print(f"  📦 Baixado: {engine.bytes_downloaded / 1024 / 1024:.1f}MB")
+        if engine.reused:
+            print(f"  ⚡ Cenas adiantadas durante o roteiro: {engine.reused}")
+        if engine.duplicates:
+            print(f"  ♊ Re-uploads pulados (hash perceptual): {engine.duplicates}")
+        if engine.hedged:
+            print(f"  🔀 Pixabay em paralelo ao Tenor: {engine.hedged} cenas "
+                  f"({engine.hedge_wins} resolvidas pelo Pixabay)")
         
         if failed_scenes:
             print(f"  ❌ Cenas sem mídia: {failed_scenes}")
@@ -755,6 +261,147 @@ class StickerDownloader:
         return media_files
 
 
+class MediaSession:
+    """
+    Estado de uma busca de mídias: termos e IDs já usados + cenas adiantadas
+    
+    Com workers > 0, prefetch(índice, cena) já busca/baixa a mídia em segundo
+    plano enquanto o roteiro ainda está sendo escrito pelo LLM.
+    """
+    
+    def __init__(self, downloader: StickerDownloader, topic: str, output_dir: str,
+                 style: str = "tenor_sticker", workers: int = 0, target_size: tuple = None):
+        self.downloader = downloader
+        self.topic = topic
+        self.output_dir = output_dir
+        self.style = style
+        # (largura, altura) do vídeo: escolhe a rendição do Tenor que basta para a tela
+        self.target_size = target_size
+        os.makedirs(output_dir, exist_ok=True)
+        
+        self.used_ids = set()
+        self.used_search_terms = set()
+        # Hashes perceptuais das mídias já escolhidas (pega re-uploads com outro ID)
+        self.media_hashes = HashSet(MEDIA_DEDUP["threshold"])
+        self._lock = threading.Lock()
+        
+        # índice → (busca_tenor usado, future)
+        self._prefetched = {}
+        self._executor = ThreadPoolExecutor(max_workers=workers) if workers > 0 else None
+    
+    def is_used(self, media_id) -> bool:
+        with self._lock:
+            return media_id in self.used_ids
+    
+    def claim_id(self, media_id) -> bool:
+        """Marca o ID como usado; False se outra cena já pegou"""
+        with self._lock:
+            if media_id in self.used_ids:
+                return False
+            self.used_ids.add(media_id)
+            return True
+    
+    def release_id(self, media_id):
+        """Devolve o ID de uma mídia descartada (outra cena pode usar)"""
+        with self._lock:
+            self.used_ids.discard(media_id)
+    
+    def has_hashes(self) -> bool:
+        """Já há mídia escolhida com hash perceptual (senão nada pode ser duplicata)"""
+        with self._lock:
+            return len(self.media_hashes) > 0
+    
+    def is_duplicate(self, hashes) -> bool:
+        """Hash perceptual parecido com o de uma mídia já escolhida?"""
+        if hashes is None:
+            return False
+        with self._lock:
+            return self.media_hashes.is_near(hashes)
+    
+    def claim_hash(self, hashes) -> bool:
+        """Registra o hash perceptual da mídia; False se parece com uma já escolhida"""
+        if hashes is None:
+            return True
+        with self._lock:
+            if self.media_hashes.is_near(hashes):
+                return False
+            self.media_hashes.add(hashes)
+            return True
+    
+    def release_hash(self, hashes):
+        """Tira o hash perceptual de uma mídia descartada"""
+        if hashes is None:
+            return
+        with self._lock:
+            self.media_hashes.remove(hashes)
+    
+    def claim_search_term(self, term: str, index: int, variations: list) -> str:
+        """Reserva um termo de busca único (adiciona variação se já foi usado)"""
+        with self._lock:
+            original_term = term
+            term_attempt = 0
+            while term in self.used_search_terms and term_attempt < 5:
+                term_attempt += 1
+                variation = variations[(index + term_attempt) % len(variations)]
+                term = f"{original_term} {variation}"
+            self.used_search_terms.add(term)
+            return term
+    
+    @staticmethod
+    def _scene_term(scene):
+        return scene.get("busca_tenor") if isinstance(scene, dict) else str(scene)
+    
+    def prefetch(self, index: int, scene, total: int = None):
+        """Começa a buscar a mídia da cena em segundo plano (thread-safe)"""
+        if self._executor is None:
+            return
+        with self._lock:
+            if index in self._prefetched:
+                return
+            future = self._executor.submit(
+                self.downloader._fetch_scene_media, index, scene, self, total or "?"
+            )
+            self._prefetched[index] = (self._scene_term(scene), future)
+    
+    def is_prefetched(self, index: int) -> bool:
+        with self._lock:
+            return index in self._prefetched
+    
+    def take(self, index: int, scene):
+        """
+        Resultado adiantado da cena, se ainda servir para a cena final
+        
+        Returns:
+            (encontrado, media_info); encontrado=False significa buscar de novo
+        """
+        with self._lock:
+            entry = self._prefetched.pop(index, None)
+        if entry is None:
+            return False, None
+        
+        term, future = entry
+        try:
+            media_info = future.result()
+        except Exception as e:
+            logger.warning(f"Prefetch da cena {index+1} falhou: {e}")
+            return False, None
+        
+        # O termo final mudou (ex.: roteiro refeito sem streaming): descarta
+        if term != self._scene_term(scene):
+            if media_info:
+                try:
+                    os.remove(media_info["path"])
+                except OSError:
+                    pass
+            return False, None
+        
+        return True, media_info
+    
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
 # ===========================================
 # CONFIGURAÇÕES DISPONÍVEIS - v4.5
 # ===========================================
@@ -990,11 +637,32 @@ class VideoBot:
         self.text_gen = TextGenerator(provider="groq")
         self.image_gen = None
         self.audio_gen = AudioGenerator()
+        self.audio_fitter = AudioFitter()
         self.video_gen = VideoGenerator()
+        self.progressive_renderer = ProgressiveRenderer(
+            self.audio_gen, self.video_gen, audio_fitter=self.audio_fitter
+        )
+        
+        # Amostras de voz para o menu /voice
+        # Gerador próprio: a leva de amostras no startup não passa pelos circuit
+        # breakers dos jobs (Edge lento aqui não empurraria os jobs para o gTTS)
+        self.voice_samples = VoiceSampleStore(AudioGenerator(hedge_after=0))
         
         # Sticker Downloader
         self.sticker_downloader = StickerDownloader()
         
+        # Aquecimento das buscas/mídias comuns com o bot ocioso (sem job em andamento)
+        self.cache_warmer = None
+        if (CACHE_WARMER["enabled"] and self.sticker_downloader.tenor_key
+                and self.sticker_downloader.media_library is not None):
+            self.cache_warmer = CacheWarmer(
+                self.sticker_downloader,
+                common_search_terms(self.sticker_downloader.style_prefixes,
+                                    SEARCH_ACTIONS, EMOTION_SEARCH_TERMS),
+                is_idle=lambda: not self.active_jobs,
+                output_dir=str(self.sticker_downloader.media_library.root / "warming"),
+            )
+        
         # YouTube
         self.youtube = YouTubeUploader()
         
@@ -1011,6 +679,12 @@ class VideoBot:
         
         print("✓ VideoBot v4.5 inicializado!\n")
     
+    async def post_init(self, application: Application):
+        """Roda quando o bot sobe: amostras de voz e aquecimento do cache em segundo plano"""
+        self.voice_samples.start_background_build(VOICE_OPTIONS.keys(), SPEED_OPTIONS.keys())
+        if self.cache_warmer is not None:
+            self.cache_warmer.start()
+    
     def _check_dependencies(self):
         """Verifica dependências"""
         try:
@@ -1221,6 +895,7 @@ class VideoBot:
 
 `/video [assunto]` - Gera e faz upload
 `/preview [assunto]` - Gera sem upload
+`/lote tema 1; tema 2; ...` - Prepara roteiros de vários temas
 
 ━━━━━━━━━━━━━━━━━━━━━━
 
@@ -1326,8 +1001,50 @@ quando você muda o formato!
     async def cmd_status(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         chat_id = update.effective_chat.id
         
+        # Latência/erros/tokens por provider de LLM
+        llm_lines = []
+        for provider, info in self.text_gen.router.summary().items():
+            latency = f"p50 {info['p50']:.1f}s / p90 {info['p90']:.1f}s" if "p50" in info else "sem dados"
+            llm_lines.append(
+                f"• {provider}: {info['calls']} chamadas, {info['error_rate']:.0%} erros, "
+                f"{info['invalid']} inválidas, {latency}, {info['completion_tokens']} tokens, "
+                f"hedge {info['hedge_wins']}/{info['hedges']}, "
+                f"fila {info['waits']}x/{info['waited_seconds']:.0f}s, 429 {info['rate_limited']}x "
+                f"({info['state']})"
+            )
+        json_stats = self.text_gen.json_stats
+        llm_lines.append(
+            f"• JSON: {json_stats['ok']} ok, {json_stats['repaired']} reparados, "
+            f"{json_stats['failed']} falhas (reparo {self.text_gen.repair_rate():.0%})"
+        )
+        llm_text = "\n\n🤖 **LLM:**\n" + "\n".join(llm_lines)
+        
+        search_cache = self.sticker_downloader.search_cache
+        if search_cache is not None:
+            stats = search_cache.stats()
+            llm_text += (
+                f"\n\n🔎 **Buscas:** {stats['hits']} do cache, {stats['stale_hits']} antigas (atualizadas em segundo plano), "
+                f"{stats['misses']} na rede ({stats['entries']} termos guardados)"
+            )
+        
+        media_library = self.sticker_downloader.media_library
+        if media_library is not None:
+            stats = media_library.stats()
+            llm_text += (
+                f"\n📚 **Biblioteca:** {stats['assets']} mídias ({stats['bytes'] / 1e6:.0f} MB), "
+                f"{stats['hits']} reaproveitadas"
+            )
+        
+        if self.cache_warmer is not None:
+            stats = self.cache_warmer.stats
+            llm_text += (
+                f"\n🔥 **Aquecimento:** {stats['terms']}/{len(self.cache_warmer.terms)} termos "
+                f"(rodada {stats['passes'] + 1}), {stats['stocked']} mídias novas, "
+                f"{stats['searches']} buscas e {stats['downloads']} downloads da cota"
+            )
+        
         if chat_id not in self.active_jobs:
-            await update.message.reply_text("📊 Nenhum job em andamento.")
+            await update.message.reply_text("📊 Nenhum job em andamento." + llm_text, parse_mode='Markdown')
             return
         
         job = self.active_jobs[chat_id]
@@ -1335,7 +1052,8 @@ quando você muda o formato!
             f"📊 **Job em andamento:**\n\n"
             f"📝 Assunto: {job['topic']}\n"
             f"⏳ Status: {job['status']}\n"
-            f"🕐 Iniciado: {job['started']}",
+            f"🕐 Iniciado: {job['started']}"
+            f"{llm_text}",
             parse_mode='Markdown'
         )
     
@@ -1368,6 +1086,46 @@ quando você muda o formato!
         self.set_user_config(update.effective_chat.id, "upload", False)
         await self.show_config_summary(update.message, update.effective_chat.id, topic)
     
+    async def cmd_batch(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Gera os roteiros de vários temas de uma vez (ficam no cache para /video)"""
+        parts = update.message.text.split(maxsplit=1)
+        raw = parts[1] if len(parts) > 1 else ""
+        topics = [t.strip() for t in raw.replace("\n", ";").split(";") if t.strip()]
+        
+        if not topics:
+            await update.message.reply_text(
+                "📝 Use: `/lote tema 1; tema 2; tema 3`\n(ou um tema por linha)", parse_mode='Markdown'
+            )
+            return
+        
+        topics = topics[:20]
+        chat_id = update.effective_chat.id
+        config = self.get_user_config(chat_id)
+        format_config = VIDEO_FORMATS.get(config['format'], VIDEO_FORMATS["short"])
+        num_scenes = self.get_effective_scenes(chat_id)
+        target_duration = format_config.get('duration', 30)
+        
+        await update.message.reply_text(
+            f"📚 Gerando {len(topics)} roteiros ({format_config['name']}, {num_scenes} cenas)..."
+        )
+        
+        start_time = datetime.now()
+        try:
+            scripts = await asyncio.to_thread(
+                self.text_gen.generate_batch, topics,
+                num_scenes=num_scenes, target_duration=target_duration
+            )
+        except Exception as e:
+            await update.message.reply_text(f"❌ Erro no lote: {str(e)[:200]}")
+            return
+        
+        lines = [f"{i}. {script.get('titulo') or script.get('topic')}" for i, script in enumerate(scripts, 1)]
+        await update.message.reply_text(
+            f"✅ {len(scripts)} roteiros prontos em {(datetime.now() - start_time).seconds}s\n\n"
+            + "\n".join(lines)
+            + "\n\n♻️ Use /video ou /preview com o mesmo tema (e formato) para usar o roteiro pronto."
+        )
+    
     # ===========================================
     # MENUS
     # ===========================================
@@ -1454,18 +1212,52 @@ quando você muda o formato!
         keyboard = []
         for key, value in VOICE_OPTIONS.items():
             marker = " ✓" if key == config['voice'] else ""
-            keyboard.append([InlineKeyboardButton(
-                f"{value['name']}{marker} ({value['gender']})", 
-                callback_data=f"set:voice:{key}"
-            )])
+            keyboard.append([
+                InlineKeyboardButton(
+                    f"{value['name']}{marker} ({value['gender']})", 
+                    callback_data=f"set:voice:{key}"
+                ),
+                InlineKeyboardButton("🔊 Ouvir", callback_data=f"sample:{key}"),
+            ])
         keyboard.append([InlineKeyboardButton("◀️ Voltar", callback_data="menu:back")])
         
         await message.reply_text(
-            "🎤 **VOZ DA NARRAÇÃO**",
+            "🎤 **VOZ DA NARRAÇÃO**\n\n"
+            f"🔊 Toque em *Ouvir* para uma amostra na velocidade atual ({config['speed']}x)",
             reply_markup=InlineKeyboardMarkup(keyboard),
             parse_mode='Markdown'
         )
     
+    async def send_voice_sample(self, message, chat_id: int, voice: str):
+        """Envia a amostra pré-gerada da voz (sem chamar o TTS se já estiver em cache)"""
+        if voice not in VOICE_OPTIONS:
+            return
+        
+        speed = self.get_user_config(chat_id).get("speed", "1.0")
+        name = VOICE_OPTIONS[voice]['name']
+        key = (voice, speed)
+        
+        # Já enviada antes: reaproveita o file_id do Telegram
+        file_id = self.voice_samples.file_ids.get(key)
+        if file_id:
+            await message.reply_audio(audio=file_id, title=f"{name} ({speed}x)")
+            return
+        
+        path = self.voice_samples.get(voice, speed)
+        if not path:
+            # Ainda não está em cache (build em andamento): gera só esta
+            path = await self.voice_samples.ensure(voice, speed)
+        
+        if not path:
+            await message.reply_text("⚠️ Amostra indisponível no momento, tente novamente.")
+            return
+        
+        with open(path, "rb") as f:
+            sent = await message.reply_audio(audio=f, title=f"{name} ({speed}x)")
+        
+        if sent and sent.audio:
+            self.voice_samples.file_ids[key] = sent.audio.file_id
+    
     async def show_speed_menu(self, message, chat_id: int):
         config = self.get_user_config(chat_id)
         
@@ -1670,6 +1462,10 @@ quando você muda o formato!
             
             await query.edit_message_text(f"✅ **{key.title()}:** {name}", parse_mode='Markdown')
         
+        elif data.startswith("sample:"):
+            voice = data.split(":", 1)[1]
+            await self.send_voice_sample(query.message, chat_id, voice)
+        
         elif data.startswith("cfg:"):
             action = data.split(":")[1]
             
@@ -1786,6 +1582,8 @@ quando você muda o formato!
             "started": start_time.strftime("%H:%M:%S")
         }
         
+        media_session = None
+        
         try:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             project_dir = OUTPUT_PROJECTS / timestamp
@@ -1817,11 +1615,29 @@ quando você muda o formato!
                 f"⏱️ Duração alvo: {duration_text}"
             )
             
+            media_dir = project_dir / "media"
+            
+            # Tenor: cada cena que fecha no streaming do roteiro já começa a
+            # ser buscada/baixada em paralelo (útil em vídeos com 36-60 cenas)
+            on_scene = None
+            if use_tenor and PIPELINE_CONFIG["media_prefetch_workers"] > 0:
+                media_session = self.sticker_downloader.start_session(
+                    topic, str(media_dir), style, workers=PIPELINE_CONFIG["media_prefetch_workers"],
+                    target_size=(width, height)
+                )
+                
+                def on_scene(index, scene):
+                    if index < num_scenes:
+                        media_session.prefetch(index, scene, total=num_scenes)
+            
             # ✅ CORREÇÃO PRINCIPAL: Passa target_duration!
-            script = self.text_gen.generate_short_script(
+            script = await asyncio.to_thread(
+                self.text_gen.generate_short_script,
                 topic=topic, 
                 num_scenes=num_scenes,
-                target_duration=target_duration  # ← CORREÇÃO!
+                target_duration=target_duration,  # ← CORREÇÃO!
+                use_cache=config.get("script_cache", True),
+                on_scene=on_scene
             )
             
             narration = script.get("narracao", "")
@@ -1871,7 +1687,6 @@ quando você muda o formato!
             self.active_jobs[chat_id]["status"] = "Buscando mídias..."
             
             media_files = []
-            media_dir = project_dir / "media"
             media_dir.mkdir(parents=True, exist_ok=True)
             
             if use_tenor:
@@ -1882,11 +1697,13 @@ quando você muda o formato!
                     f"⚡ Buscas otimizadas (sem repetição)"
                 )
                 
-                media_files = self.sticker_downloader.get_media_for_scenes(
+                media_files = await self.sticker_downloader.get_media_for_scenes_async(
                     topic=topic,
                     prompts=image_prompts,
                     output_dir=str(media_dir),
-                    style=style
+                    style=style,
+                    session=media_session,
+                    target_size=(width, height)
                 )
                 
                 if len(media_files) > 10:
@@ -1950,71 +1767,152 @@ quando você muda o formato!
             media_type = "GIFs/MP4" if use_tenor else "imagens"
             await send_log(f"✅ **{len(media_files)} {media_type} obtidos!**")
             
-            # ========== 3. ÁUDIO ==========
-            self.active_jobs[chat_id]["status"] = "Gerando áudio..."
-            await send_log(
-                f"🔊 **[3/5] GERANDO NARRAÇÃO...**\n\n"
-                f"🎤 Voz: {VOICE_OPTIONS[voice]['name']}\n"
-                f"⏱️ Velocidade: {speed}x\n"
-                f"📊 Palavras: {word_count}\n"
-                f"⏱️ Duração esperada: ~{estimated_duration:.0f}s"
-            )
+            # ========== 3+4. PROGRESSIVO (ÁUDIO POR TRECHOS + RENDER) ==========
+            progressive = config.get("progressive", PIPELINE_CONFIG["progressive"])
             
-            audio_path_original = str(project_dir / "audio_original.mp3")
+            if progressive:
+                self.active_jobs[chat_id]["status"] = "Narração + render progressivo..."
+                await send_log(
+                    f"⚡ **[3-4/5] NARRAÇÃO + VÍDEO (PROGRESSIVO)...**\n\n"
+                    f"🎤 Voz: {VOICE_OPTIONS[voice]['name']}\n"
+                    f"🖼️ Cenas renderizam assim que o áudio de cada uma fica pronto"
+                )
+                
+                try:
+                    progressive_result = await self.progressive_renderer.render(
+                        narration=narration,
+                        media_files=media_files,
+                        output_dir=str(project_dir),
+                        output_name=timestamp,
+                        width=width,
+                        height=height,
+                        voice=voice,
+                        rate=speed,
+                        send_log=send_log
+                    )
+                    
+                    video_path = progressive_result["video_path"]
+                    audio_path = audio_path_original = progressive_result["audio_path"]
+                    audio_duration = progressive_result["duration"]
+                    
+                    self.active_jobs[chat_id]["tts"] = progressive_result["tts"]
+                    with open(project_dir / "tts.json", "w", encoding="utf-8") as f:
+                        json.dump(progressive_result["tts"], f, ensure_ascii=False, indent=2)
+                    
+                    await send_log(
+                        f"✅ **ÁUDIO + VÍDEO PRONTOS!**\n\n"
+                        f"⏱️ Duração: {audio_duration:.1f}s\n"
+                        f"🖼️ Cenas: {progressive_result['scenes']}"
+                    )
+                except Exception as e:
+                    logger.warning(f"Pipeline progressivo falhou, usando modo sequencial: {e}")
+                    await send_log("⚠️ Modo progressivo falhou, continuando no modo normal...")
+                    progressive = False
             
-            self.audio_gen.generate(
-                text=narration,
-                output_path=audio_path_original,
-                voice=voice,
-                rate=speed
-            )
+            if not progressive:
+                # ========== 3. ÁUDIO ==========
+                self.active_jobs[chat_id]["status"] = "Gerando áudio..."
+                await send_log(
+                    f"🔊 **[3/5] GERANDO NARRAÇÃO...**\n\n"
+                    f"🎤 Voz: {VOICE_OPTIONS[voice]['name']}\n"
+                    f"⏱️ Velocidade: {speed}x\n"
+                    f"📊 Palavras: {word_count}\n"
+                    f"⏱️ Duração esperada: ~{estimated_duration:.0f}s"
+                )
             
-            await send_log("🔧 **Normalizando áudio...**")
+                audio_path_original = str(project_dir / "audio_original.mp3")
             
-            audio_path = normalize_audio(audio_path_original, target_sample_rate=44100)
-            audio_duration = get_audio_duration(audio_path)
+                tts_info = {}
+                generated = self.audio_gen.generate(
+                    text=narration,
+                    output_path=audio_path_original,
+                    voice=voice,
+                    rate=speed,
+                    job_info=tts_info
+                )
             
-            secs_per_scene = audio_duration / len(media_files)
+                # Registra engine e latência do TTS neste job
+                self.active_jobs[chat_id]["tts"] = tts_info
+                with open(project_dir / "tts.json", "w", encoding="utf-8") as f:
+                    json.dump(tts_info, f, ensure_ascii=False, indent=2)
             
-            await send_log(
-                f"✅ **ÁUDIO GERADO!**\n\n"
-                f"⏱️ Duração: {audio_duration:.1f}s\n"
-                f"🖼️ Por cena: ~{secs_per_scene:.1f}s"
-            )
+                if not generated:
+                    await send_log("❌ **Falha ao gerar narração** (Edge-TTS e gTTS indisponíveis)")
+                    return
             
-            # ========== 4. VÍDEO ==========
-            self.active_jobs[chat_id]["status"] = "Montando vídeo..."
-            await send_log(
-                f"🎬 **[4/5] MONTANDO VÍDEO...**\n\n"
-                f"🖼️ Mídias: {len(media_files)}\n"
-                f"🔊 Áudio: {audio_duration:.1f}s\n"
-                f"📐 Resolução: {width}x{height}\n"
-                f"🎯 Tipo: {'Short' if is_short else 'Vídeo Longo'}"
-            )
+                engine_text = "Edge-TTS" if tts_info.get("engine") == "edge" else "gTTS (fallback)"
+                hedge_text = " ⏱️ hedge" if tts_info.get("hedged") else ""
+            
+                await send_log("🔧 **Ajustando duração e normalizando áudio...**")
             
-            # ✅ CORREÇÃO: Usa o formato correto para o VideoGenerator
-            if is_short:
-                video_path = self.video_gen.create_short(
-                    images=media_files,
-                    audio_path=audio_path,
-                    output_name=timestamp,
-                    subtitle_text=narration
+                # Corta silêncios e ajusta o ritmo para a duração do formato,
+                # já convertendo para 44.1 kHz no mesmo passo (sem re-sintetizar)
+                fit_text = ""
+                try:
+                    fit_info = self.audio_fitter.fit(
+                        audio_path_original,
+                        str(project_dir / "audio.mp3"),
+                        target_duration=target_duration
+                    )
+                    audio_path = fit_info["path"]
+                    audio_duration = fit_info["duration"]
+                    fit_text = (
+                        f"✂️ Ajuste: {fit_info['original_duration']:.1f}s → {audio_duration:.1f}s "
+                        f"(ritmo {fit_info['tempo']:.2f}x)\n"
+                    )
+                    if fit_info.get("loudness") is not None:
+                        fit_text += (
+                            f"🔈 Loudness: {fit_info['loudness']:.1f} LUFS "
+                            f"(ganho {fit_info['gain_db']:+.1f} dB)\n"
+                        )
+                except Exception as e:
+                    logger.warning(f"Ajuste de duração falhou, usando normalização simples: {e}")
+                    audio_path = normalize_audio(audio_path_original, target_sample_rate=44100)
+                    audio_duration = get_audio_duration(audio_path)
+            
+                secs_per_scene = audio_duration / len(media_files)
+            
+                await send_log(
+                    f"✅ **ÁUDIO GERADO!**\n\n"
+                    f"🎙️ Engine: {engine_text}{hedge_text} ({tts_info.get('latency', 0):.1f}s)\n"
+                    f"{fit_text}"
+                    f"⏱️ Duração: {audio_duration:.1f}s\n"
+                    f"🖼️ Por cena: ~{secs_per_scene:.1f}s"
                 )
-            else:
-                # Para vídeos longos, usa create_slideshow com formato correto
-                # Mapeia o formato do bot para o formato do VideoGenerator
-                vg_format = "youtube" if width > height else "youtube_vertical"
-                if width == height:
-                    vg_format = "square"
-                
-                video_path = self.video_gen.create_slideshow(
-                    images=media_files,
-                    audio_path=audio_path,
-                    output_name=timestamp,
-                    format=vg_format,  # ← Passa formato correto
-                    subtitle_text=narration
+            
+                # ========== 4. VÍDEO ==========
+                self.active_jobs[chat_id]["status"] = "Montando vídeo..."
+                await send_log(
+                    f"🎬 **[4/5] MONTANDO VÍDEO...**\n\n"
+                    f"🖼️ Mídias: {len(media_files)}\n"
+                    f"🔊 Áudio: {audio_duration:.1f}s\n"
+                    f"📐 Resolução: {width}x{height}\n"
+                    f"🎯 Tipo: {'Short' if is_short else 'Vídeo Longo'}"
                 )
             
+                # ✅ CORREÇÃO: Usa o formato correto para o VideoGenerator
+                if is_short:
+                    video_path = self.video_gen.create_short(
+                        images=media_files,
+                        audio_path=audio_path,
+                        output_name=timestamp,
+                        subtitle_text=narration
+                    )
+                else:
+                    # Para vídeos longos, usa create_slideshow com formato correto
+                    # Mapeia o formato do bot para o formato do VideoGenerator
+                    vg_format = "youtube" if width > height else "youtube_vertical"
+                    if width == height:
+                        vg_format = "square"
+                
+                    video_path = self.video_gen.create_slideshow(
+                        images=media_files,
+                        audio_path=audio_path,
+                        output_name=timestamp,
+                        format=vg_format,  # ← Passa formato correto
+                        subtitle_text=narration
+                    )
+            
             video_size_mb = Path(video_path).stat().st_size / (1024 * 1024)
             
             await send_log(f"✅ **VÍDEO RENDERIZADO!** ({video_size_mb:.1f} MB)")
@@ -2098,6 +1996,9 @@ quando você muda o formato!
             await send_log(f"❌ **ERRO:** `{str(e)[:200]}`")
         
         finally:
+            # Prefetch de mídias ainda rodando (ex.: erro antes da etapa 2)
+            if media_session is not None:
+                media_session.close()
             if chat_id in self.active_jobs:
                 del self.active_jobs[chat_id]
 
@@ -2146,7 +2047,7 @@ def main():
         print(f"  • {config['name']}: {duration}s, {scenes} cenas, {resolution} ({type_text})")
     
     bot = VideoBot()
-    app = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    app = Application.builder().token(TELEGRAM_BOT_TOKEN).post_init(bot.post_init).build()
     
     # Comandos
     app.add_handler(CommandHandler("start", bot.cmd_start))
@@ -2162,6 +2063,7 @@ def main():
     app.add_handler(CommandHandler("auth", bot.cmd_auth))
     app.add_handler(CommandHandler("video", bot.cmd_video))
     app.add_handler(CommandHandler("preview", bot.cmd_preview))
+    app.add_handler(CommandHandler("lote", bot.cmd_batch))
     
     # Callbacks e mensagens
     app.add_handler(CallbackQueryHandler(bot.handle_callback))
@@ -27,8 +27,17 @@ OUTPUT_SHORTS = OUTPUT_DIR / "shorts"
 OUTPUT_PROJECTS = OUTPUT_DIR / "projects"
 OUTPUT_LOGS = OUTPUT_DIR / "logs"
 
+# Caches persistentes (compartilhados entre jobs)
+CACHE_DIR = OUTPUT_DIR / "cache"
+VOICE_SAMPLES_DIR = CACHE_DIR / "voice_samples"
+SCRIPT_CACHE_DIR = CACHE_DIR / "scripts"
+SEARCH_CACHE_DIR = CACHE_DIR / "searches"
+MEDIA_LIBRARY_DIR = CACHE_DIR / "media_library"
+
 # Cria pastas se não existirem
-for folder in [OUTPUT_IMAGES, OUTPUT_AUDIO, OUTPUT_VIDEOS, OUTPUT_SHORTS, OUTPUT_PROJECTS, OUTPUT_LOGS]:
+for folder in [OUTPUT_IMAGES, OUTPUT_AUDIO, OUTPUT_VIDEOS, OUTPUT_SHORTS, OUTPUT_PROJECTS, OUTPUT_LOGS,
+               CACHE_DIR, VOICE_SAMPLES_DIR, SCRIPT_CACHE_DIR, SEARCH_CACHE_DIR,
+               MEDIA_LIBRARY_DIR]:
     folder.mkdir(parents=True, exist_ok=True)
 
 # ===========================================
@@ -47,6 +56,11 @@ HF_TOKEN = os.getenv("HF_TOKEN", "")
 # Groq
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
 
+# Endpoints alternativos dos LLMs (vazio = API oficial). Aponte para o
+# servidor local src/utils/llm_standin.py para medir o pipeline sem gastar cota
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "")
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "")
+
 # YouTube
 YOUTUBE_CLIENT_SECRETS = os.getenv("YOUTUBE_CLIENT_SECRETS", "config/client_secrets.json")
 YOUTUBE_CREDENTIALS_PATH = CONFIG_DIR / "youtube_credentials.pickle"
@@ -177,3 +191,210 @@ TTS_CONFIG = {
 
 
 
+
+# Failover entre engines de TTS (circuit breaker + requisição "hedged")
+TTS_FAILOVER = {
+    "failure_threshold": int(os.getenv("TTS_FAILURE_THRESHOLD", "3")),    # Falhas seguidas para abrir o circuito
+    "recovery_timeout": float(os.getenv("TTS_RECOVERY_TIMEOUT", "60")),   # Segundos até testar o Edge de novo
+    "hedge_after": float(os.getenv("TTS_HEDGE_AFTER", "8")),              # Inicia gTTS se o Edge não entregar bytes nesse tempo (0 = desliga)
+}
+
+# Ajuste de duração da narração (cortes de silêncio + ritmo)
+AUDIO_FIT = {
+    "max_pause": 0.45,          # Pausas maiores que isso (s) são encurtadas
+    "min_pause": 0.25,          # Pausa mínima quando ainda precisa encurtar
+    "max_tempo_change": 0.12,   # Mudança máxima de ritmo (±12%)
+    "tolerance": 0.08,          # Janela aceitável em torno da duração do formato (±8%)
+}
+
+# Normalização de loudness da narração (medição EBU R128 / BS.1770)
+# -16 LUFS é o alvo usual para voz em plataformas web (R128 de broadcast usa -23)
+AUDIO_LOUDNESS = {
+    "enabled": os.getenv("AUDIO_LOUDNESS_ENABLED", "true").lower() == "true",
+    "target_lufs": float(os.getenv("AUDIO_TARGET_LUFS", "-16")),
+    "max_peak_db": -1.0,        # Pico máximo depois do ganho (dBFS)
+}
+
+# ===========================================
+# LLM
+# ===========================================
+
+# Chamadas simultâneas por provider (respeita os limites dos planos gratuitos)
+LLM_CONCURRENCY = {
+    "groq": int(os.getenv("GROQ_MAX_CONCURRENCY", "4")),
+    "gemini": int(os.getenv("GEMINI_MAX_CONCURRENCY", "2")),
+}
+
+# Limite de taxa por conta (token bucket de requisições e tokens por minuto).
+# Pedidos esperam na fila em vez de tomar 429; com vários processos do bot na
+# mesma chave, LLM_WORKERS divide a cota entre eles
+LLM_RATE_LIMITS = {
+    "groq": {
+        "rpm": float(os.getenv("GROQ_RPM", "30")),
+        "tpm": float(os.getenv("GROQ_TPM", "12000")),
+    },
+    "gemini": {
+        "rpm": float(os.getenv("GEMINI_RPM", "15")),
+        "tpm": float(os.getenv("GEMINI_TPM", "1000000")),
+    },
+    "workers": int(os.getenv("LLM_WORKERS", "1")),
+    "max_retries": 4,            # Retries após 429 antes de desistir do provider
+    "backoff_base": 1.0,         # Segundos (dobra a cada tentativa, com jitter)
+    "backoff_cap": 30.0,
+}
+
+# Hedge entre providers: se o primário demorar mais que o percentil das
+# latências recentes, o mesmo pedido vai para o outro provider
+LLM_ROUTER = {
+    "hedge": os.getenv("LLM_HEDGE", "true").lower() == "true",
+    "hedge_percentile": 90,
+    "hedge_default_delay": float(os.getenv("LLM_HEDGE_DELAY", "8")),   # Até ter amostras suficientes
+    "hedge_min_delay": 2.0,
+    "hedge_max_delay": 20.0,
+    "min_samples": 5,
+    "window": 50,                # Latências recentes consideradas por provider
+    "failure_threshold": 3,      # Falhas seguidas para tirar o provider da frente
+    "recovery_timeout": 60.0,
+}
+
+# Servidor local que imita Groq/Gemini (python -m src.utils.llm_standin)
+LLM_STANDIN = {
+    "host": os.getenv("LLM_STANDIN_HOST", "127.0.0.1"),
+    "port": int(os.getenv("LLM_STANDIN_PORT", "8808")),
+    "fixtures_dir": DATA_DIR / "llm_fixtures",   # Respostas gravadas, uma por hash do prompt
+    "latency": float(os.getenv("LLM_STANDIN_LATENCY", "0.5")),               # Segundos até responder
+    "tokens_per_second": float(os.getenv("LLM_STANDIN_TOKENS_PER_SECOND", "250")),  # 0 = instantâneo
+    "error_rate": float(os.getenv("LLM_STANDIN_ERROR_RATE", "0")),
+    "error_status": int(os.getenv("LLM_STANDIN_ERROR_STATUS", "429")),
+    "retry_after": 1,
+}
+
+# Formato do JSON pedido ao LLM: "verbose" (chaves completas) ou "compact"
+# (chaves curtas, cenas como listas e códigos de emoção; menos tokens de saída)
+SCRIPT_SCHEMA = os.getenv("SCRIPT_SCHEMA", "verbose")
+
+# Lote de roteiros curtos: vários temas num pedido só (generate_batch / /lote)
+SCRIPT_BATCH = {
+    "enabled": os.getenv("SCRIPT_BATCH_ENABLED", "true").lower() == "true",
+    "max_topics": int(os.getenv("SCRIPT_BATCH_MAX_TOPICS", "5")),   # Temas por pedido
+    "max_tokens": 8000,          # Saída máxima de um pedido (limita o tamanho do lote)
+    "max_duration": 60,          # Só shorts; vídeos maiores vão tema a tema
+    "retries": 1,                # Novos lotes só com os temas que falharam
+    "parallel": 3,               # Lotes simultâneos
+}
+
+# Vídeos longos: esboço + seções geradas em paralelo
+LONG_FORM = {
+    "enabled": os.getenv("LONG_FORM_SECTIONS", "true").lower() == "true",
+    "min_duration": int(os.getenv("LONG_FORM_MIN_DURATION", "240")),   # youtube_5min (300s) usa
+    "seconds_per_section": 60,
+    "min_sections": 3,
+    "max_sections": 8,
+}
+
+# ===========================================
+# CACHE DE ROTEIROS
+# ===========================================
+
+SCRIPT_CACHE = {
+    "enabled": os.getenv("SCRIPT_CACHE_ENABLED", "true").lower() == "true",
+    "ttl_hours": float(os.getenv("SCRIPT_CACHE_TTL_HOURS", "168")),   # 7 dias
+    "max_entries": int(os.getenv("SCRIPT_CACHE_MAX_ENTRIES", "500")),
+    "max_mb": 20,
+}
+
+# ===========================================
+# CACHE DE BUSCAS (TENOR / PIXABAY)
+# ===========================================
+
+# fresh: usa direto; stale: usa e atualiza em segundo plano; depois disso, busca de novo.
+# O Pixabay pede que resultados não sejam guardados por mais de 24h
+SEARCH_CACHE = {
+    "enabled": os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true",
+    "providers": {
+        "tenor": {
+            "fresh_hours": float(os.getenv("SEARCH_CACHE_FRESH_HOURS", "24")),
+            "stale_hours": float(os.getenv("SEARCH_CACHE_STALE_HOURS", "168")),
+        },
+        "pixabay": {"fresh_hours": 12, "stale_hours": 24},
+    },
+    "max_entries": int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "5000")),
+    "max_mb": 50,
+}
+
+# Biblioteca de mídias baixadas (por hash do conteúdo), reaproveitada entre
+# jobs via hardlink; passando do orçamento, sai a usada há mais tempo
+MEDIA_LIBRARY = {
+    "enabled": os.getenv("MEDIA_LIBRARY_ENABLED", "true").lower() == "true",
+    "max_mb": int(os.getenv("MEDIA_LIBRARY_MAX_MB", "2048")),
+}
+
+# Aquecimento do cache com o bot ocioso: buscas comuns (prefixos de estilo ×
+# ações × emoções) renovadas e as primeiras mídias já baixadas na biblioteca,
+# dentro de uma cota por hora (as chamadas contam na cota da API do Tenor)
+CACHE_WARMER = {
+    "enabled": os.getenv("CACHE_WARMER_ENABLED", "false").lower() == "true",
+    "idle_seconds": int(os.getenv("CACHE_WARMER_IDLE_SECONDS", "120")),  # Sem job há pelo menos isso
+    "searches_per_hour": int(os.getenv("CACHE_WARMER_SEARCHES_PER_HOUR", "60")),
+    "downloads_per_hour": int(os.getenv("CACHE_WARMER_DOWNLOADS_PER_HOUR", "120")),
+    "results_per_term": 3,      # Mídias por termo na biblioteca (alternativas para repetição)
+    "max_terms": 400,
+    "pass_interval_hours": 6,   # Nova rodada: renova as buscas que ficaram velhas
+}
+
+# Rendição do Tenor escolhida pelo tamanho na tela: a menor (dims) que cobre o
+# quadro do vídeo com até "max_upscale" de ampliação; MP4 antes de GIF no empate.
+# O Tenor raramente passa de ~500px, então 1080p sempre amplia um pouco
+TENOR_RENDITION = {
+    "enabled": os.getenv("TENOR_RENDITION_ENABLED", "true").lower() == "true",
+    "max_upscale": float(os.getenv("TENOR_MAX_UPSCALE", "2.5")),
+}
+
+# Mesma animação com outro ID (re-upload): hash perceptual dos quadros.
+# Distância de até "threshold" bits (de 64) conta como repetida no vídeo
+MEDIA_DEDUP = {
+    "enabled": os.getenv("MEDIA_DEDUP_ENABLED", "true").lower() == "true",
+    "threshold": int(os.getenv("MEDIA_DEDUP_THRESHOLD", "10")),
+    "frames": 4,                 # Quadros amostrados por mídia
+}
+
+# ===========================================
+# PIPELINE
+# ===========================================
+
+PIPELINE_CONFIG = {
+    # Renderiza cenas enquanto o TTS ainda sintetiza (narração por trechos)
+    "progressive": os.getenv("PROGRESSIVE_RENDER", "false").lower() == "true",
+    "render_workers": int(os.getenv("PROGRESSIVE_RENDER_WORKERS", "2")),
+    "tts_concurrency": int(os.getenv("PROGRESSIVE_TTS_CONCURRENCY", "2")),
+    # Buscas/downloads de mídia adiantados enquanto o roteiro chega em streaming (0 = desliga)
+    "media_prefetch_workers": int(os.getenv("MEDIA_PREFETCH_WORKERS", "3")),
+    # Cenas buscadas/baixadas ao mesmo tempo na etapa de mídias (asyncio + httpx)
+    "media_concurrency": int(os.getenv("MEDIA_CONCURRENCY", "8")),
+    "media_search_timeout": 15,
+    "media_download_timeout": 60,
+}
+
+# Pixabay em paralelo ao Tenor (hedge): começa quando uma tentativa do Tenor
+# passa do orçamento de tempo ou traz poucos resultados; vale a primeira
+# mídia válida e a outra busca é cancelada. Cena nunca passa do prazo total.
+MEDIA_HEDGE = {
+    "enabled": os.getenv("MEDIA_HEDGE_ENABLED", "true").lower() == "true",
+    "tenor_budget_seconds": float(os.getenv("MEDIA_HEDGE_TENOR_BUDGET", "8")),
+    "min_results": 3,           # Tentativa do Tenor com menos disponíveis que isso já dispara
+    "scene_deadline_seconds": float(os.getenv("MEDIA_SCENE_DEADLINE", "45")),
+}
+
+# Downloads em streaming (src/utils/http_download.py): abortam cedo em vez
+# de segurar um worker por até 60s ou carregar um arquivo enorme na memória
+DOWNLOAD_LIMITS = {
+    "media_max_mb": int(os.getenv("DOWNLOAD_MEDIA_MAX_MB", "20")),     # GIF/MP4 do Tenor
+    "image_max_mb": int(os.getenv("DOWNLOAD_IMAGE_MAX_MB", "15")),     # Pixabay/Pollinations
+    "preview_max_kb": 512,
+    # Vazão mínima depois do primeiro byte (medida após grace_seconds)
+    "min_kbps": int(os.getenv("DOWNLOAD_MIN_KBPS", "32")),
+    "grace_seconds": 5,
+    "connect_timeout": 10,
+    "read_timeout": 20,         # Silêncio máximo entre dois pedaços
+    "chunk_kb": 64,
+}
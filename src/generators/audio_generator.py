@@ -4,12 +4,18 @@ CORRIGIDO: Funciona corretamente com bot async do Telegram
 """
 import edge_tts
 import asyncio
+import concurrent.futures
+import os
+import time
 from pathlib import Path
 from gtts import gTTS
 import sys
 
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
+from config.settings import TTS_FAILOVER
+from src.utils.circuit_breaker import CircuitBreaker
+
 # Vozes disponíveis em PT-BR
 EDGE_VOICES = {
     # Chaves simplificadas (compatibilidade)
@@ -40,13 +46,30 @@ EDGE_VOICES = {
 class AudioGenerator:
     """Gera narração em áudio usando TTS gratuito"""
     
-    def __init__(self, engine: str = "edge"):
+    def __init__(self, engine: str = "edge", hedge_after: float = None):
         """
         Args:
             engine: "edge" (melhor qualidade) ou "gtts" (backup)
+            hedge_after: Segundos sem receber bytes do Edge até iniciar o gTTS
+                         em paralelo (0 desliga; None usa TTS_FAILOVER)
         """
         self.engine = engine
         self.voices = EDGE_VOICES
+        self.hedge_after = TTS_FAILOVER["hedge_after"] if hedge_after is None else hedge_after
+        
+        # Um circuit breaker por engine: uma falha isolada não troca a engine
+        # para sempre, o Edge volta a ser testado depois do recovery_timeout
+        self.breakers = {
+            name: CircuitBreaker(
+                name=f"tts:{name}",
+                failure_threshold=TTS_FAILOVER["failure_threshold"],
+                recovery_timeout=TTS_FAILOVER["recovery_timeout"],
+            )
+            for name in ("edge", "gtts")
+        }
+        
+        # Informações do último job (engine usada, latência, hedge...)
+        self.last_job = {}
     
     def _parse_voice(self, voice: str) -> str:
         """Converte o nome da voz para o formato do Edge-TTS"""
@@ -104,8 +127,9 @@ class AudioGenerator:
                                     text: str,
                                     output_path: str,
                                     voice: str,
-                                    rate: str) -> str:
-        """Gera áudio usando Edge-TTS (método async interno)"""
+                                    rate: str,
+                                    first_bytes: asyncio.Event = None) -> str:
+        """Gera áudio usando Edge-TTS (método async interno, em streaming)"""
         
         communicate = edge_tts.Communicate(
             text=text,
@@ -113,24 +137,211 @@ class AudioGenerator:
             rate=rate
         )
         
-        await communicate.save(output_path)
+        received = 0
+        try:
+            with open(output_path, "wb") as f:
+                async for chunk in communicate.stream():
+                    if chunk.get("type") != "audio":
+                        continue
+                    f.write(chunk["data"])
+                    received += len(chunk["data"])
+                    if first_bytes is not None and not first_bytes.is_set():
+                        first_bytes.set()
+        except BaseException:
+            self._remove_quietly(output_path)
+            raise
+        
+        if received == 0:
+            self._remove_quietly(output_path)
+            raise RuntimeError("Edge-TTS não retornou áudio")
+        
         return output_path
     
-    def generate(self,
-                 text: str,
-                 output_path: str,
-                 voice: str = "br_feminina",
-                 rate = 1.0) -> str:
+    async def generate_edge_async(self, text: str, output_path: str, voice: str = "br_feminina",
+                                  rate=1.0) -> str:
         """
-        Gera áudio de narração (versão síncrona)
+        Só o Edge-TTS, sem circuit breaker nem hedge (amostras de voz do /voice)
         
-        Args:
-            text: Texto para converter em fala
-            output_path: Caminho do arquivo de saída (.mp3)
-            voice: Tipo de voz
-            rate: Velocidade (1.0 = normal, 1.2 = 20% mais rápido)
+        Não mexe no estado dos breakers: Edge lento nesse uso não derruba os jobs para o gTTS.
+        
+        Raises:
+            Exception do Edge-TTS (sem fallback)
         """
         Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        return await self._generate_edge_async(
+            text.strip(), output_path, self._parse_voice(voice), self._parse_rate(rate)
+        )
+    
+    def _generate_gtts(self, text: str, output_path: str) -> str:
+        """Gera áudio usando gTTS (síncrono)"""
+        tts = gTTS(text=text, lang='pt-br')
+        tts.save(output_path)
+        return output_path
+    
+    @staticmethod
+    def _remove_quietly(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    
+    def _engine_order(self) -> list:
+        """
+        Ordem de tentativa: circuitos abertos por último
+        
+        Só consulta o estado; a sonda do meio-aberto (allow_request) é
+        reservada na hora de rodar a engine, senão a engine que não chega
+        a ser tentada fica com a sonda presa.
+        """
+        order = ["edge", "gtts"] if self.engine == "edge" else ["gtts", "edge"]
+        return sorted(order, key=lambda name: self.breakers[name].state == CircuitBreaker.OPEN)
+    
+    async def _run_edge(self, text: str, output_path: str, voice_name: str,
+                        rate_str: str, job_info: dict) -> bool:
+        """Edge-TTS com hedge: se não vierem bytes a tempo, dispara gTTS em paralelo"""
+        started = time.monotonic()
+        
+        job_info["attempts"].append("edge")
+        hedge = self.hedge_after > 0 and self.breakers["gtts"].state != CircuitBreaker.OPEN
+        if not hedge:
+            try:
+                await self._generate_edge_async(text, output_path, voice_name, rate_str)
+                self.breakers["edge"].record_success()
+                job_info["engine"] = "edge"
+                return True
+            except Exception as e:
+                print(f"⚠️ Edge-TTS falhou: {e}")
+                self.breakers["edge"].record_failure()
+                job_info["errors"].append(f"edge: {e}")
+                return False
+        
+        base = output_path.rsplit(".", 1)[0]
+        edge_path = f"{base}.edge.mp3"
+        gtts_path = f"{base}.gtts.mp3"
+        
+        first_bytes = asyncio.Event()
+        edge_task = asyncio.create_task(
+            self._generate_edge_async(text, edge_path, voice_name, rate_str, first_bytes)
+        )
+        waiter = asyncio.create_task(first_bytes.wait())
+        
+        await asyncio.wait({edge_task, waiter}, timeout=self.hedge_after,
+                           return_when=asyncio.FIRST_COMPLETED)
+        waiter.cancel()
+        
+        tasks = {edge_task: "edge"}
+        if first_bytes.is_set():
+            job_info["first_byte"] = round(time.monotonic() - started, 3)
+        elif not edge_task.done() and self.breakers["gtts"].allow_request():
+            # Edge lento: inicia o gTTS e fica com quem terminar primeiro
+            print(f"⏱️ Edge sem resposta em {self.hedge_after:.1f}s, iniciando gTTS em paralelo...")
+            job_info["hedged"] = True
+            job_info["attempts"].append("gtts")
+            gtts_task = asyncio.create_task(asyncio.to_thread(self._generate_gtts, text, gtts_path))
+            tasks[gtts_task] = "gtts"
+        
+        winner = None
+        pending = set(tasks)
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                name = tasks[task]
+                if task.exception() is None:
+                    winner = winner or name
+                    self.breakers[name].record_success()
+                else:
+                    print(f"⚠️ {name} falhou: {task.exception()}")
+                    self.breakers[name].record_failure()
+                    job_info["errors"].append(f"{name}: {task.exception()}")
+        
+        # Cancela o perdedor e limpa os arquivos temporários
+        for task in pending:
+            name = tasks[task]
+            task.cancel()
+            if name == "edge":
+                # Perdeu sem nunca entregar bytes: conta como falha do Edge
+                if not first_bytes.is_set():
+                    self.breakers["edge"].record_failure()
+                try:
+                    await task
+                except BaseException:
+                    pass
+            else:
+                # Thread do gTTS não pode ser interrompida: remove o arquivo quando acabar
+                task.add_done_callback(lambda _t, p=gtts_path: self._remove_quietly(p))
+        
+        if first_bytes.is_set() and job_info["first_byte"] is None:
+            job_info["first_byte"] = round(time.monotonic() - started, 3)
+        
+        if winner is None:
+            return False
+        
+        os.replace(edge_path if winner == "edge" else gtts_path, output_path)
+        job_info["engine"] = winner
+        return True
+    
+    async def _run_engine(self, name: str, text: str, output_path: str, voice_name: str,
+                          rate_str: str, job_info: dict) -> bool:
+        if name == "edge":
+            return await self._run_edge(text, output_path, voice_name, rate_str, job_info)
+        
+        job_info["attempts"].append("gtts")
+        try:
+            await asyncio.to_thread(self._generate_gtts, text, output_path)
+            self.breakers["gtts"].record_success()
+            job_info["engine"] = "gtts"
+            return True
+        except Exception as e:
+            print(f"❌ gTTS falhou: {e}")
+            self.breakers["gtts"].record_failure()
+            job_info["errors"].append(f"gtts: {e}")
+            return False
+    
+    async def _synthesize_async(self, text: str, output_path: str,
+                                voice_name: str, rate_str: str) -> dict:
+        """Tenta as engines na ordem dos circuit breakers e registra o resultado"""
+        started = time.monotonic()
+        job_info = {
+            "engine": None,
+            "voice": voice_name,
+            "rate": rate_str,
+            "hedged": False,
+            "first_byte": None,
+            "latency": None,
+            "attempts": [],
+            "errors": [],
+        }
+        
+        blocked = []
+        for name in self._engine_order():
+            if name in job_info["attempts"]:
+                continue
+            if not self.breakers[name].allow_request():
+                blocked.append(name)
+                continue
+            if await self._run_engine(name, text, output_path, voice_name, rate_str, job_info):
+                break
+            print("   Tentando próxima engine...")
+        
+        # Nenhuma engine liberada pelos circuitos: tenta mesmo assim em vez de falhar o job
+        if not job_info["attempts"]:
+            for name in blocked:
+                if await self._run_engine(name, text, output_path, voice_name, rate_str, job_info):
+                    break
+        
+        job_info["latency"] = round(time.monotonic() - started, 3)
+        job_info["breakers"] = {name: b.state for name, b in self.breakers.items()}
+        self.last_job = job_info
+        
+        if job_info["engine"]:
+            label = " (gTTS)" if job_info["engine"] == "gtts" else ""
+            print(f"✅ Áudio salvo{label}: {output_path} [{job_info['latency']:.1f}s]")
+        
+        return job_info
+    
+    def _prepare(self, text: str, output_path: str, voice: str, rate):
+        """Valida o texto e converte voz/velocidade (comum às versões sync e async)"""
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
         
         text = text.strip()
         if not text:
@@ -145,84 +356,73 @@ class AudioGenerator:
         print(f"   Voz: {voice_name}")
         print(f"   Velocidade: {rate_str}")
         
-        if self.engine == "edge":
-            try:
-                # Verifica se já existe um event loop rodando
-                try:
-                    loop = asyncio.get_running_loop()
-                    # Se chegou aqui, já tem um loop rodando (contexto async)
-                    # Usa run_until_complete em um novo loop
-                    import concurrent.futures
-                    with concurrent.futures.ThreadPoolExecutor() as executor:
-                        future = executor.submit(
-                            asyncio.run,
-                            self._generate_edge_async(text, output_path, voice_name, rate_str)
-                        )
-                        future.result(timeout=120)
-                except RuntimeError:
-                    # Não tem loop rodando, pode usar asyncio.run normalmente
-                    asyncio.run(
-                        self._generate_edge_async(text, output_path, voice_name, rate_str)
-                    )
-                
-                print(f"✅ Áudio salvo: {output_path}")
-                return output_path
-                
-            except Exception as e:
-                print(f"⚠️ Edge-TTS falhou: {e}")
-                print("   Tentando gTTS...")
-                self.engine = "gtts"
+        return text, voice_name, rate_str
+    
+    def generate(self,
+                 text: str,
+                 output_path: str,
+                 voice: str = "br_feminina",
+                 rate = 1.0,
+                 job_info: dict = None) -> str:
+        """
+        Gera áudio de narração (versão síncrona)
         
-        if self.engine == "gtts":
-            try:
-                tts = gTTS(text=text, lang='pt-br')
-                tts.save(output_path)
-                print(f"✅ Áudio salvo (gTTS): {output_path}")
-                return output_path
-            except Exception as e:
-                print(f"❌ gTTS falhou: {e}")
-                return None
+        Args:
+            text: Texto para converter em fala
+            output_path: Caminho do arquivo de saída (.mp3)
+            voice: Tipo de voz
+            rate: Velocidade (1.0 = normal, 1.2 = 20% mais rápido)
+            job_info: Dict opcional preenchido com engine, latência e hedge do job
+        """
+        prepared = self._prepare(text, output_path, voice, rate)
+        if not prepared:
+            return None
+        text, voice_name, rate_str = prepared
+        
+        def run():
+            return asyncio.run(self._synthesize_async(text, output_path, voice_name, rate_str))
+        
+        try:
+            # Verifica se já existe um event loop rodando
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Não tem loop rodando, pode usar asyncio.run normalmente
+            info = run()
+        else:
+            # Já tem um loop rodando (contexto async): roda em outra thread
+            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+                info = executor.submit(run).result(timeout=180)
+        
+        if job_info is not None:
+            job_info.update(info)
+        
+        return output_path if info["engine"] else None
     
     async def generate_async(self,
                              text: str,
                              output_path: str,
                              voice: str = "br_feminina",
-                             rate = 1.0) -> str:
+                             rate = 1.0,
+                             job_info: dict = None) -> str:
         """
         Gera áudio de narração (versão assíncrona)
         USE ESTA VERSÃO NO BOT DO TELEGRAM!
         """
-        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
-        
-        text = text.strip()
-        if not text:
-            print("⚠️ Texto vazio")
+        prepared = self._prepare(text, output_path, voice, rate)
+        if not prepared:
             return None
+        text, voice_name, rate_str = prepared
         
-        # Parse dos parâmetros
-        voice_name = self._parse_voice(voice)
-        rate_str = self._parse_rate(rate)
+        info = await self._synthesize_async(text, output_path, voice_name, rate_str)
         
-        print(f"🎤 Gerando narração ({len(text)} caracteres)...")
-        print(f"   Voz: {voice_name}")
-        print(f"   Velocidade: {rate_str}")
+        if job_info is not None:
+            job_info.update(info)
         
-        try:
-            await self._generate_edge_async(text, output_path, voice_name, rate_str)
-            print(f"✅ Áudio salvo: {output_path}")
-            return output_path
-            
-        except Exception as e:
-            print(f"⚠️ Edge-TTS falhou: {e}")
-            # Fallback para gTTS (síncrono)
-            try:
-                tts = gTTS(text=text, lang='pt-br')
-                tts.save(output_path)
-                print(f"✅ Áudio salvo (gTTS): {output_path}")
-                return output_path
-            except Exception as e2:
-                print(f"❌ gTTS também falhou: {e2}")
-                return None
+        return output_path if info["engine"] else None
+    
+    def engine_status(self) -> dict:
+        """Estado dos circuit breakers de cada engine"""
+        return {name: b.stats() for name, b in self.breakers.items()}
     
     @staticmethod
     def list_voices() -> dict:
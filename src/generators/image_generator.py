@@ -3,7 +3,6 @@ Gerador de imagens usando Pollinations.ai
 100% GRATUITO - Otimizado para STICKMAN
 VERSÃO CORRIGIDA - Melhor tratamento de erros
 """
-import requests
 from pathlib import Path
 from PIL import Image
 import io
@@ -14,6 +13,12 @@ import random
 import hashlib
 
 sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from config.settings import DOWNLOAD_LIMITS
+from src.utils.http_download import DownloadError, download_bytes
+
+IMAGE_FORMATS = ("png", "jpeg", "webp")
 
 try:
     from utils.watermark_remover import WatermarkRemover
@@ -232,36 +237,30 @@ class ImageGenerator:
             try:
                 print(f"   Tentativa {attempt + 1}/3...")
                 
-                # Faz requisição
-                resp = requests.get(url, timeout=120, headers=headers)
-                
-                print(f"   Status: {resp.status_code}")
-                print(f"   Content-Type: {resp.headers.get('content-type', 'N/A')}")
-                print(f"   Content-Length: {len(resp.content)} bytes")
-                
-                # Verifica status
-                if resp.status_code != 200:
-                    print(f"   ❌ Status não é 200")
+                # Faz requisição em streaming: status, Content-Type, tamanho e
+                # assinatura conferidos antes de baixar o resto. A geração leva
+                # tempo até o primeiro byte, por isso a leitura tolera 120s
+                try:
+                    content = download_bytes(
+                        url, expected=IMAGE_FORMATS, headers=headers, read_timeout=120,
+                        max_bytes=DOWNLOAD_LIMITS["image_max_mb"] * 1024 * 1024
+                    )
+                except DownloadError as e:
+                    print(f"   ❌ {e}")
                     time.sleep(5)
                     continue
                 
-                # Verifica content-type
-                content_type = resp.headers.get('content-type', '').lower()
-                if 'image' not in content_type:
-                    print(f"   ❌ Resposta não é imagem: {content_type}")
-                    print(f"   Conteúdo: {resp.text[:200]}...")
-                    time.sleep(5)
-                    continue
+                print(f"   Content-Length: {len(content)} bytes")
                 
                 # Verifica tamanho mínimo (imagens válidas têm mais de 1KB)
-                if len(resp.content) < 1000:
-                    print(f"   ❌ Resposta muito pequena: {len(resp.content)} bytes")
+                if len(content) < 1000:
+                    print(f"   ❌ Resposta muito pequena: {len(content)} bytes")
                     time.sleep(5)
                     continue
                 
                 # Tenta abrir como imagem
                 try:
-                    img = Image.open(io.BytesIO(resp.content))
+                    img = Image.open(io.BytesIO(content))
                     print(f"   ✓ Imagem válida: {img.size}, modo: {img.mode}")
                 except Exception as img_err:
                     print(f"   ❌ Erro ao abrir imagem: {img_err}")
@@ -309,12 +308,6 @@ class ImageGenerator:
                 
                 return img
                 
-            except requests.exceptions.Timeout:
-                print(f"   ⚠️ Timeout na tentativa {attempt + 1}")
-                time.sleep(5)
-            except requests.exceptions.RequestException as e:
-                print(f"   ⚠️ Erro de requisição: {e}")
-                time.sleep(5)
             except Exception as e:
                 print(f"   ⚠️ Erro: {type(e).__name__}: {e}")
                 time.sleep(5)
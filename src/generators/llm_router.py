@@ -0,0 +1,476 @@
+"""
+Roteador de LLM entre Groq e Gemini
+
+Mantém os dois clientes e manda cada pedido para o provider primário. Se ele
+não responder dentro do atraso aprendido (percentil das latências recentes),
+dispara o mesmo pedido no secundário e usa a primeira resposta válida.
+Também guarda latência, taxa de erro e tokens por provider. Toda chamada
+passa pelo limite de taxa do provider (src/utils/rate_limiter.py).
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import threading
+import time
+from pathlib import Path
+import sys
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+try:
+    from google import genai
+    GENAI_AVAILABLE = True
+except ImportError:
+    GENAI_AVAILABLE = False
+    print("⚠️ google-genai não instalado. Use: pip install google-genai")
+
+try:
+    from groq import Groq
+    GROQ_AVAILABLE = True
+except ImportError:
+    GROQ_AVAILABLE = False
+    print("⚠️ groq não instalado. Use: pip install groq")
+
+from config.settings import (
+    GEMINI_API_KEY, GROQ_API_KEY, GEMINI_BASE_URL, GROQ_BASE_URL,
+    LLM_CONCURRENCY, LLM_ROUTER, LLM_RATE_LIMITS,
+)
+from src.utils.circuit_breaker import CircuitBreaker
+from src.utils.rate_limiter import (
+    get_limiter, is_rate_limit_error, retry_after_from_error, backoff_delay,
+)
+
+MODELS = {
+    "gemini": "gemini-2.0-flash",
+    "groq": "llama-3.3-70b-versatile",
+}
+
+# Chamadas simultâneas por provider (compartilhado entre instâncias)
+_PROVIDER_SLOTS = {
+    provider: threading.BoundedSemaphore(max(1, limit))
+    for provider, limit in LLM_CONCURRENCY.items()
+}
+
+# Threads das chamadas com hedge (a perdedora termina em segundo plano)
+_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm")
+
+
+class InvalidResponse(ValueError):
+    """O provider respondeu, mas o texto não passou no validate"""
+
+
+class ProviderStats:
+    """Latências recentes, erros e tokens de um provider"""
+
+    def __init__(self, window: int):
+        # Latências separadas por tamanho de resposta (título ≠ roteiro completo)
+        self.latencies = {"short": deque(maxlen=window), "long": deque(maxlen=window)}
+        self.calls = 0
+        self.errors = 0
+        self.invalid = 0        # Respostas que chegaram mas não passaram no validate (JSON irreparável)
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+
+    def record(self, bucket: str, latency: float, ok: bool, usage: dict = None,
+               invalid: bool = False):
+        with self._lock:
+            self.calls += 1
+            if invalid:
+                self.invalid += 1
+            elif ok:
+                self.latencies[bucket].append(latency)
+            else:
+                self.errors += 1
+            if usage:
+                self.prompt_tokens += usage.get("prompt_tokens", 0)
+                self.completion_tokens += usage.get("completion_tokens", 0)
+
+    def percentile(self, bucket: str, q: float, min_samples: int):
+        with self._lock:
+            samples = list(self.latencies[bucket])
+        if len(samples) < min_samples:
+            return None
+        return float(np.percentile(samples, q))
+
+    def summary(self) -> dict:
+        with self._lock:
+            all_latencies = list(self.latencies["short"]) + list(self.latencies["long"])
+            calls, errors = self.calls, self.errors
+            summary = {
+                "calls": calls,
+                "errors": errors,
+                "error_rate": round(errors / calls, 3) if calls else 0.0,
+                "invalid": self.invalid,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+            }
+        if all_latencies:
+            summary["p50"] = round(float(np.percentile(all_latencies, 50)), 2)
+            summary["p90"] = round(float(np.percentile(all_latencies, 90)), 2)
+        return summary
+
+
+class LLMRouter:
+    """Envia pedidos ao provider primário com hedge no secundário"""
+
+    def __init__(self, primary: str = "groq", hedge: bool = None):
+        """
+        Args:
+            primary: "groq" ou "gemini"
+            hedge: Liga/desliga o hedge (padrão: LLM_ROUTER["hedge"])
+        """
+        self.primary = primary.lower()
+        self.hedge = LLM_ROUTER["hedge"] if hedge is None else hedge
+        self.clients = {}
+
+        # O primário é obrigatório (mesmos erros de antes); o secundário é opcional
+        self.clients[self.primary] = self._create_client(self.primary)
+        print(f"✓ LLM: {self.primary} ({MODELS[self.primary]})")
+        if GROQ_BASE_URL or GEMINI_BASE_URL:
+            print(f"   🧪 Endpoints alternativos: groq={GROQ_BASE_URL or '-'} gemini={GEMINI_BASE_URL or '-'}")
+
+        for provider in MODELS:
+            if provider == self.primary:
+                continue
+            try:
+                self.clients[provider] = self._create_client(provider)
+                print(f"✓ LLM reserva: {provider} ({MODELS[provider]})")
+            except (ImportError, ValueError) as e:
+                print(f"   ℹ️ Sem provider reserva {provider}: {e}")
+
+        self.stats = {p: ProviderStats(LLM_ROUTER["window"]) for p in self.clients}
+        self.breakers = {
+            p: CircuitBreaker(
+                f"LLM {p}",
+                failure_threshold=LLM_ROUTER["failure_threshold"],
+                recovery_timeout=LLM_ROUTER["recovery_timeout"],
+            )
+            for p in self.clients
+        }
+
+    @staticmethod
+    def _create_client(provider: str):
+        if provider == "gemini":
+            if not GENAI_AVAILABLE:
+                raise ImportError("google-genai não instalado. Use: pip install google-genai")
+            if not GEMINI_API_KEY:
+                raise ValueError("GEMINI_API_KEY não configurada no .env")
+            if GEMINI_BASE_URL:
+                return genai.Client(api_key=GEMINI_API_KEY, http_options={"base_url": GEMINI_BASE_URL})
+            return genai.Client(api_key=GEMINI_API_KEY)
+
+        if provider == "groq":
+            if not GROQ_AVAILABLE:
+                raise ImportError("groq não instalado. Use: pip install groq")
+            if not GROQ_API_KEY:
+                raise ValueError("GROQ_API_KEY não configurada no .env")
+            return Groq(api_key=GROQ_API_KEY, base_url=GROQ_BASE_URL or None)
+
+        raise ValueError(f"Provider '{provider}' não suportado. Use 'gemini' ou 'groq'")
+
+    # ===========================================
+    # CHAMADA A UM PROVIDER
+    # ===========================================
+
+    def _complete(self, provider: str, prompt: str, temperature: float, max_tokens: int):
+        """Chama a API do provider e retorna (texto, uso de tokens)"""
+        client = self.clients[provider]
+
+        if provider == "gemini":
+            response = client.models.generate_content(model=MODELS[provider], contents=prompt)
+            meta = getattr(response, "usage_metadata", None)
+            usage = {
+                "prompt_tokens": getattr(meta, "prompt_token_count", 0) or 0,
+                "completion_tokens": getattr(meta, "candidates_token_count", 0) or 0,
+            }
+            return response.text, usage
+
+        # Resposta crua para ler os cabeçalhos x-ratelimit-* antes do parse
+        raw = client.chat.completions.with_raw_response.create(
+            model=MODELS[provider],
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        get_limiter(provider).update_from_headers(raw.headers)
+        response = raw.parse()
+        usage = getattr(response, "usage", None)
+        usage = {
+            "prompt_tokens": getattr(usage, "prompt_tokens", 0) or 0,
+            "completion_tokens": getattr(usage, "completion_tokens", 0) or 0,
+        }
+        return response.choices[0].message.content, usage
+
+    @staticmethod
+    def _estimate_tokens(prompt: str, max_tokens: int) -> int:
+        """Tokens reservados no balde antes da chamada (~4 caracteres por token)"""
+        return len(prompt) // 4 + max_tokens
+
+    @staticmethod
+    def _rate_limit_pause(provider: str, error: Exception, attempt: int) -> bool:
+        """
+        Trata um 429: pausa o provider inteiro pelo retry-after (ou backoff)
+
+        Returns:
+            True se ainda vale tentar de novo
+        """
+        if not is_rate_limit_error(error) or attempt >= LLM_RATE_LIMITS["max_retries"]:
+            return False
+        delay = retry_after_from_error(error) or backoff_delay(
+            attempt, LLM_RATE_LIMITS["backoff_base"], LLM_RATE_LIMITS["backoff_cap"]
+        )
+        get_limiter(provider).penalize(delay)
+        return True
+
+    def _call(self, provider: str, prompt: str, temperature: float, max_tokens: int,
+              validate=None) -> str:
+        """Uma tentativa num provider, com limite de taxa, concorrência e estatísticas"""
+        bucket = "short" if max_tokens <= 500 else "long"
+        slots = _PROVIDER_SLOTS.get(provider)
+        limiter = get_limiter(provider)
+        estimated = self._estimate_tokens(prompt, max_tokens)
+        attempt = 0
+
+        start = time.perf_counter()
+        try:
+            while True:
+                limiter.acquire(estimated)
+                try:
+                    if slots is not None:
+                        with slots:
+                            text, usage = self._complete(provider, prompt, temperature, max_tokens)
+                    else:
+                        text, usage = self._complete(provider, prompt, temperature, max_tokens)
+                    break
+                except Exception as e:
+                    # Tentativa sem resposta não gastou tokens: devolve a reserva.
+                    # 429 espera na fila e tenta de novo; outros erros sobem
+                    limiter.refund(estimated)
+                    if not self._rate_limit_pause(provider, e, attempt):
+                        raise
+                    attempt += 1
+        except Exception:
+            self.stats[provider].record(bucket, time.perf_counter() - start, ok=False)
+            self.breakers[provider].record_failure()
+            raise
+
+        limiter.settle(estimated, usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0))
+
+        # O provider respondeu: JSON irreparável é problema da resposta, não do
+        # provider, e fica fora do circuito (senão abriria com o serviço no ar)
+        if validate is not None and not validate(text):
+            self.stats[provider].record(bucket, time.perf_counter() - start, ok=False,
+                                        usage=usage, invalid=True)
+            self.breakers[provider].record_success()
+            raise InvalidResponse(f"resposta inválida de {provider}")
+
+        self.stats[provider].record(bucket, time.perf_counter() - start, ok=True, usage=usage)
+        self.breakers[provider].record_success()
+        return text
+
+    def _stream_chunks(self, provider: str, prompt: str, temperature: float,
+                       max_tokens: int, usage: dict):
+        """Gera os pedaços de texto da resposta em streaming (preenche usage no fim)"""
+        client = self.clients[provider]
+
+        if provider == "gemini":
+            for chunk in client.models.generate_content_stream(model=MODELS[provider], contents=prompt):
+                meta = getattr(chunk, "usage_metadata", None)
+                if meta is not None:
+                    usage["prompt_tokens"] = getattr(meta, "prompt_token_count", 0) or 0
+                    usage["completion_tokens"] = getattr(meta, "candidates_token_count", 0) or 0
+                if chunk.text:
+                    yield chunk.text
+            return
+
+        stream = client.chat.completions.create(
+            model=MODELS[provider],
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True
+        )
+        for chunk in stream:
+            # Groq manda o uso de tokens em x_groq no último pedaço
+            chunk_usage = getattr(getattr(chunk, "x_groq", None), "usage", None)
+            if chunk_usage is not None:
+                usage["prompt_tokens"] = getattr(chunk_usage, "prompt_tokens", 0) or 0
+                usage["completion_tokens"] = getattr(chunk_usage, "completion_tokens", 0) or 0
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+    # ===========================================
+    # ROTEAMENTO
+    # ===========================================
+
+    def _order(self) -> list:
+        """Primário primeiro; providers com circuito aberto vão para o fim"""
+        providers = [self.primary] + [p for p in self.clients if p != self.primary]
+        allowed = [p for p in providers if self.breakers[p].state != CircuitBreaker.OPEN]
+        return allowed + [p for p in providers if p not in allowed]
+
+    def hedge_delay(self, provider: str, max_tokens: int) -> float:
+        """Atraso até o hedge: percentil das latências recentes, limitado"""
+        bucket = "short" if max_tokens <= 500 else "long"
+        learned = self.stats[provider].percentile(
+            bucket, LLM_ROUTER["hedge_percentile"], LLM_ROUTER["min_samples"]
+        )
+        if learned is None:
+            return LLM_ROUTER["hedge_default_delay"]
+        return min(LLM_ROUTER["hedge_max_delay"], max(LLM_ROUTER["hedge_min_delay"], learned))
+
+    def generate(self, prompt: str, temperature: float = 0.7, max_tokens: int = 4000,
+                 validate=None) -> str:
+        """
+        Gera texto com hedge entre providers
+
+        Args:
+            validate: Função texto → bool; resposta inválida (ex.: JSON que não
+                      faz parse) libera o hedge e conta nas estatísticas, não no circuito
+
+        Returns:
+            Texto da primeira resposta válida (levanta a última exceção se todas falharem)
+        """
+        order = self._order()
+        primary, backups = order[0], order[1:]
+
+        if not self.hedge or not backups:
+            last_error = None
+            for provider in order:
+                try:
+                    return self._call(provider, prompt, temperature, max_tokens, validate)
+                except Exception as e:
+                    last_error = e
+                    print(f"   ⚠️ LLM {provider} falhou: {e}")
+            raise last_error
+
+        futures = {
+            _EXECUTOR.submit(self._call, primary, prompt, temperature, max_tokens, validate): primary
+        }
+        pending = set(futures)
+        delay = self.hedge_delay(primary, max_tokens)
+        last_error = None
+
+        while True:
+            timeout = delay if backups else None
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                provider = futures[future]
+                try:
+                    text = future.result()
+                except Exception as e:
+                    last_error = e
+                    print(f"   ⚠️ LLM {provider} falhou: {e}")
+                    continue
+                if provider != primary:
+                    self.stats[provider].hedge_wins += 1
+                return text
+
+            # Primário lento (timeout) ou falhou: dispara o próximo provider já
+            if backups:
+                backup = backups.pop(0)
+                if not done:
+                    print(f"   ⏱️ {primary} sem resposta em {delay:.1f}s, hedge para {backup}")
+                self.stats[backup].hedges += 1
+                future = _EXECUTOR.submit(self._call, backup, prompt, temperature, max_tokens, validate)
+                futures[future] = backup
+                pending.add(future)
+            elif not pending:
+                raise last_error
+
+    def stream(self, prompt: str, on_text, temperature: float = 0.7,
+               max_tokens: int = 4000, validate=None) -> str:
+        """
+        Gera texto em streaming, chamando on_text(pedaço) conforme chega
+
+        Sem hedge (a resposta já começa a ser usada); se um provider falhar antes
+        do primeiro pedaço, tenta o próximo. Falha no meio do stream levanta a
+        exceção para quem chamou decidir (ex.: refazer sem streaming).
+
+        Returns:
+            Texto completo
+        """
+        last_error = None
+
+        for provider in self._order():
+            bucket = "short" if max_tokens <= 500 else "long"
+            slots = _PROVIDER_SLOTS.get(provider)
+            limiter = get_limiter(provider)
+            estimated = self._estimate_tokens(prompt, max_tokens)
+            attempt = 0
+            start = time.perf_counter()
+
+            while True:
+                usage = {}
+                parts = []
+                limiter.acquire(estimated)
+                try:
+                    if slots is not None:
+                        slots.acquire()
+                    try:
+                        for piece in self._stream_chunks(provider, prompt, temperature, max_tokens, usage):
+                            parts.append(piece)
+                            on_text(piece)
+                    finally:
+                        if slots is not None:
+                            slots.release()
+                except Exception as e:
+                    # Nada chegou: a reserva volta ao balde. Com pedaços, acerta pelo
+                    # uso informado (se houver) e mantém a estimativa no resto
+                    if not parts:
+                        limiter.refund(estimated)
+                    else:
+                        limiter.settle(estimated, usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0))
+
+                    # 429 antes do primeiro pedaço: espera na fila e repete
+                    if not parts and self._rate_limit_pause(provider, e, attempt):
+                        attempt += 1
+                        continue
+                    self.stats[provider].record(bucket, time.perf_counter() - start, ok=False)
+                    self.breakers[provider].record_failure()
+                    if parts:
+                        raise
+                    last_error = e
+                    print(f"   ⚠️ LLM {provider} falhou (stream): {e}")
+                    break
+
+                text = "".join(parts)
+                limiter.settle(estimated, usage.get("prompt_tokens", 0) + usage.get("completion_tokens", 0))
+
+                # Texto já foi entregue a on_text: resposta inválida sobe para quem
+                # chamou, conta nas estatísticas e não abre o circuito
+                if validate is not None and not validate(text):
+                    self.stats[provider].record(bucket, time.perf_counter() - start, ok=False,
+                                                usage=usage, invalid=True)
+                    self.breakers[provider].record_success()
+                    last_error = InvalidResponse(f"resposta inválida de {provider}")
+                    if parts:
+                        raise last_error
+                    print(f"   ⚠️ LLM {provider} falhou (stream): {last_error}")
+                    break
+
+                self.stats[provider].record(bucket, time.perf_counter() - start, ok=True, usage=usage)
+                self.breakers[provider].record_success()
+                return text
+
+        raise last_error
+
+    def model_name(self, provider: str = None) -> str:
+        return MODELS[provider or self.primary]
+
+    def summary(self) -> dict:
+        return {
+            p: {
+                **self.stats[p].summary(),
+                **get_limiter(p).stats(),
+                "state": self.breakers[p].state,
+            }
+            for p in self.clients
+        }
@@ -0,0 +1,206 @@
+"""
+Pipeline progressivo: renderiza as cenas enquanto o TTS ainda está sintetizando
+
+A narração é dividida em trechos (um por cena, respeitando frases). Cada trecho
+é sintetizado separadamente e, assim que seu áudio fica pronto, a duração da
+cena é conhecida e o segmento de vídeo começa a renderizar em paralelo.
+A montagem final só espera o último trecho.
+"""
+import asyncio
+import math
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import sys
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from config.settings import PIPELINE_CONFIG
+from src.utils.audio_fitter import AudioFitter
+
+
+def split_sentences(text: str) -> list:
+    """Divide o texto em frases"""
+    text = " ".join(text.split())
+    sentences = re.split(r'(?<=[.!?…])\s+', text)
+    return [s for s in sentences if s.strip()]
+
+
+def assign_to_scenes(sentences: list, num_scenes: int) -> list:
+    """
+    Agrupa frases consecutivas em num_scenes trechos com quantidade parecida de palavras
+
+    Se houver menos frases que cenas, as frases mais longas são quebradas ao meio.
+    """
+    pieces = list(sentences)
+
+    while len(pieces) < num_scenes:
+        longest = max(range(len(pieces)), key=lambda i: len(pieces[i].split()))
+        words = pieces[longest].split()
+        if len(words) < 2:
+            break
+        mid = len(words) // 2
+        pieces[longest:longest + 1] = [" ".join(words[:mid]), " ".join(words[mid:])]
+
+    total_words = sum(len(p.split()) for p in pieces)
+    groups = []
+    current = []
+    cumulative = 0
+
+    for i, piece in enumerate(pieces):
+        current.append(piece)
+        cumulative += len(piece.split())
+
+        remaining_groups = num_scenes - len(groups) - 1
+        if remaining_groups <= 0:
+            continue
+
+        remaining_pieces = len(pieces) - i - 1
+        if cumulative >= total_words * (len(groups) + 1) / num_scenes or remaining_pieces == remaining_groups:
+            groups.append(" ".join(current))
+            current = []
+
+    if current:
+        groups.append(" ".join(current))
+
+    return groups
+
+
+class ProgressiveRenderer:
+    """Sobrepõe síntese de áudio e renderização de cenas"""
+
+    def __init__(self, audio_gen, video_gen, audio_fitter: AudioFitter = None,
+                 render_workers: int = None, tts_concurrency: int = None):
+        """
+        Args:
+            audio_gen: AudioGenerator compartilhado
+            video_gen: VideoGenerator compartilhado
+            audio_fitter: AudioFitter usado para decodificar/cortar cada trecho
+            render_workers: Segmentos renderizando ao mesmo tempo
+            tts_concurrency: Trechos sintetizando ao mesmo tempo
+        """
+        self.audio_gen = audio_gen
+        self.video_gen = video_gen
+        self.fitter = audio_fitter or AudioFitter()
+        self.render_workers = render_workers or PIPELINE_CONFIG["render_workers"]
+        self.tts_concurrency = tts_concurrency or PIPELINE_CONFIG["tts_concurrency"]
+
+    def _prepare_chunk(self, audio_path: str, fps: int) -> np.ndarray:
+        """Decodifica o trecho, corta silêncio das pontas e completa até o próximo frame"""
+        samples = self.fitter.decode(audio_path)
+        samples, _ = self.fitter.process(samples, target_duration=None, allow_tempo=False)
+
+        # Duração múltipla exata de 1/fps: áudio e vídeo não se desalinham na junção
+        sr = self.fitter.sample_rate
+        frames = max(1, math.ceil(len(samples) / sr * fps))
+        target_len = int(round(frames / fps * sr))
+        if len(samples) < target_len:
+            samples = np.concatenate((samples, np.zeros(target_len - len(samples), dtype=samples.dtype)))
+        return samples[:target_len]
+
+    async def render(self, narration: str, media_files: list, output_dir: str,
+                     output_name: str, width: int, height: int, voice: str,
+                     rate=1.0, fps: int = 30, add_subtitles: bool = True,
+                     send_log=None) -> dict:
+        """
+        Gera narração e vídeo de forma progressiva
+
+        Returns:
+            Dict com video_path, audio_path, duration, scenes, tts (info por trecho)
+            e loudness (medição e ganho aplicado na narração)
+        """
+        output_dir = Path(output_dir)
+        chunks_dir = output_dir / "audio_chunks"
+        segments_dir = output_dir / "segments"
+        chunks_dir.mkdir(parents=True, exist_ok=True)
+        segments_dir.mkdir(parents=True, exist_ok=True)
+
+        texts = assign_to_scenes(split_sentences(narration), len(media_files))
+        media_files = media_files[:len(texts)]
+
+        print(f"\n⚡ Pipeline progressivo: {len(texts)} cenas, "
+              f"{self.tts_concurrency} TTS / {self.render_workers} renders em paralelo")
+
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=self.render_workers)
+        tts_slots = asyncio.Semaphore(self.tts_concurrency)
+        rendered = 0
+
+        async def scene_task(index: int, text: str):
+            chunk_path = str(chunks_dir / f"chunk_{index+1:02d}.mp3")
+            tts_info = {}
+            async with tts_slots:
+                ok = await self.audio_gen.generate_async(
+                    text=text, output_path=chunk_path, voice=voice, rate=rate, job_info=tts_info
+                )
+            if not ok:
+                raise RuntimeError(f"TTS falhou no trecho {index+1}")
+
+            samples = await asyncio.to_thread(self._prepare_chunk, chunk_path, fps)
+            duration = len(samples) / self.fitter.sample_rate
+
+            # A duração da cena já é conhecida: começa a renderizar agora
+            segment_path = str(segments_dir / f"segment_{index+1:02d}.mp4")
+            render = loop.run_in_executor(
+                executor,
+                self.video_gen.render_segment,
+                media_files[index], duration, segment_path, width, height, fps,
+                text if add_subtitles else None
+            )
+
+            def on_rendered(_future):
+                nonlocal rendered
+                rendered += 1
+
+            render.add_done_callback(on_rendered)
+            return samples, duration, tts_info, render
+
+        tasks = [asyncio.create_task(scene_task(i, t)) for i, t in enumerate(texts)]
+        try:
+            results = await asyncio.gather(*tasks)
+
+            # Todo o áudio pronto: codifica a narração enquanto os últimos segmentos terminam
+            audio_path = str(output_dir / "audio.mp3")
+            pcm = np.concatenate([r[0] for r in results])
+            loudness = self.fitter.loudness_gain(pcm)
+            await asyncio.to_thread(self.fitter.encode, pcm, audio_path, 1.0, loudness["gain_db"])
+
+            if send_log:
+                await send_log(f"🎧 Narração pronta ({len(pcm) / self.fitter.sample_rate:.1f}s), "
+                               f"{rendered}/{len(texts)} cenas já renderizadas")
+
+            segment_paths = await asyncio.gather(*(r[3] for r in results))
+        except BaseException:
+            # Um trecho falhou: os outros TTS não podem seguir rodando em paralelo ao fallback
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        finally:
+            # Renders na fila são descartados; os que já rodam terminam antes de
+            # sair (ninguém continua gravando em segments_dir). Fora do event loop.
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+        # Legendas com offset de cada trecho (alinhadas ao áudio real de cada cena)
+        timings = []
+        offset = 0.0
+        for text, (_, duration, _, _) in zip(texts, results):
+            for t in self.video_gen.srt_gen.calculate_timings(text, duration):
+                timings.append({"text": t["text"], "start": t["start"] + offset, "end": t["end"] + offset})
+            offset += duration
+
+        video_path = await asyncio.to_thread(
+            self.video_gen.concat_segments, segment_paths, audio_path, output_name,
+            timings if add_subtitles else None
+        )
+
+        return {
+            "video_path": video_path,
+            "audio_path": audio_path,
+            "duration": round(offset, 3),
+            "scenes": len(texts),
+            "tts": [r[2] for r in results],
+            "loudness": loudness,
+        }
@@ -6,25 +6,17 @@ from pathlib import Path
 import sys
 import re
 import json
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 sys.path.append(str(Path(__file__).parent.parent.parent))
 
-# Tenta importar as bibliotecas
-try:
-    from google import genai
-    GENAI_AVAILABLE = True
-except ImportError:
-    GENAI_AVAILABLE = False
-    print("⚠️ google-genai não instalado. Use: pip install google-genai")
-
-try:
-    from groq import Groq
-    GROQ_AVAILABLE = True
-except ImportError:
-    GROQ_AVAILABLE = False
-    print("⚠️ groq não instalado. Use: pip install groq")
-
-from config.settings import GEMINI_API_KEY, GROQ_API_KEY
+from config.settings import SCRIPT_CACHE, LONG_FORM, SCRIPT_SCHEMA, SCRIPT_BATCH
+from src.generators.llm_router import LLMRouter
+from src.utils.json_repair import repair_json
+from src.utils.json_stream import SceneStreamParser
+from src.utils.script_cache import ScriptCache
 
 
 # ============================================
@@ -153,6 +145,58 @@ REGRAS CRÍTICAS:
 5. Retorne APENAS JSON válido, sem markdown
 """
 
+# Formato longo, passo 1: esboço compacto (seções + cenas), sem o texto narrado
+OUTLINE_TEMPLATE = """
+{system_prompt}
+
+Crie o ESBOÇO de um vídeo sobre: {topic}
+Duração: {duration_formatted}. O texto narrado será escrito depois, seção por seção.
+
+RESPONDA APENAS COM JSON VÁLIDO:
+
+{{
+    "titulo": "título chamativo com emoji (máx 60 chars)",
+    "hook": "ESCREVA ~{hook_words} PALAVRAS - frase impactante para prender atenção",
+    "cta": "ESCREVA ~{cta_words} PALAVRAS - chamada para ação final",
+    "descricao": "descrição para YouTube com emojis (2-3 linhas)",
+    "hashtags": ["#hashtag1", "#hashtag2", "#hashtag3", "#hashtag4", "#hashtag5"],
+    "secoes": [
+        {{
+            "titulo": "título curto da seção",
+            "pontos": "1-2 frases com o que a seção explica",
+            "cenas": [
+                {{"descricao": "o que acontece na cena", "busca_tenor": "termo em inglês", "emocao": "emoção"}}
+            ]
+        }}
+    ]
+}}
+
+REGRAS:
+1. Exatamente {num_sections} seções, em ordem lógica
+2. Quantidade de cenas em cada seção, na ordem: {scenes_per_section}
+3. Cada "busca_tenor" deve ser ÚNICO
+4. Retorne APENAS JSON válido, sem markdown
+"""
+
+# Formato longo, passo 2: texto de uma seção (todas em paralelo)
+SECTION_TEMPLATE = """
+Você está escrevendo a narração de um vídeo sobre: {topic}
+
+ESTRUTURA DO VÍDEO:
+{outline}
+
+Escreva APENAS a seção {index}/{total}: "{section_title}"
+Conteúdo da seção: {section_points}
+
+REQUISITOS:
+- Aproximadamente {words} palavras
+- Tom conversacional e envolvente, com exemplos práticos
+- {position_rule}
+- Não repita o que as outras seções cobrem
+
+Escreva APENAS o texto narrado, sem títulos, formatação ou marcadores.
+"""
+
 
 # Lista de emoções e termos de busca
 EMOTION_SEARCH_TERMS = {
@@ -186,70 +230,179 @@ SEARCH_ACTIONS = [
 ]
 
 
+# ============================================
+# FORMATO COMPACTO (menos tokens de saída)
+# ============================================
+
+# Código curto de cada emoção (2 letras, derivado de EMOTION_SEARCH_TERMS)
+EMOTION_CODES = {}
+for _emotion in EMOTION_SEARCH_TERMS:
+    _code = _emotion[:2]
+    _extra = 2
+    while _code in EMOTION_CODES:
+        _code = _emotion[0] + _emotion[_extra]
+        _extra += 1
+    EMOTION_CODES[_code] = _emotion
+
+EMOTION_CODE_TABLE = ", ".join(f"{code}={emotion}" for code, emotion in EMOTION_CODES.items())
+
+SYSTEM_PROMPT_COMPACT = """
+Você é um roteirista de vídeos virais com animação de STICK FIGURES (bonecos de palito).
+Cada cena mostra stick figures simples (máx 2-3), com uma AÇÃO ou EMOÇÃO básica.
+"""
+
+# Chaves: t=título h=hook r=roteiro c=cta d=descrição g=hashtags s=cenas
+# Cena: [descrição, ação em inglês para a busca, código da emoção]
+SCRIPT_TEMPLATE_COMPACT = """
+{system_prompt}
+Crie um roteiro sobre: {topic}
+DURAÇÃO: {duration_formatted} (~{total_words} palavras narradas no total)
+
+Responda APENAS com JSON compacto (chaves curtas, cenas como listas):
+{{"t":"título com emoji (máx 60)","h":"abertura ~{hook_words} palavras","r":"conteúdo principal ~{roteiro_words} palavras, conversacional, com exemplos","c":"chamada final ~{cta_words} palavras","d":"descrição YouTube (1-2 linhas)","g":["hashtag","sem","cerquilha"],"s":[["descrição da cena","thinking","cu"]]}}
+
+"s" tem EXATAMENTE {num_scenes} cenas: [descrição em português (máx 8 palavras), ação em inglês para busca (1-3 palavras, ÚNICA, sem "stick figure"), código da emoção]
+Códigos de emoção: {emotion_codes}
+"""
+
+# Esboço do formato longo no mesmo estilo (x=seções: t=título p=pontos s=cenas)
+OUTLINE_TEMPLATE_COMPACT = """
+{system_prompt}
+Crie o ESBOÇO de um vídeo sobre: {topic}
+Duração: {duration_formatted}. O texto narrado será escrito depois, seção por seção.
+
+Responda APENAS com JSON compacto (chaves curtas, cenas como listas):
+{{"t":"título com emoji (máx 60)","h":"abertura ~{hook_words} palavras","c":"chamada final ~{cta_words} palavras","d":"descrição YouTube (1-2 linhas)","g":["hashtag","sem","cerquilha"],"x":[{{"t":"título da seção","p":"1-2 frases com o que a seção explica","s":[["descrição da cena","thinking","cu"]]}}]}}
+
+"x" tem EXATAMENTE {num_sections} seções; cenas por seção, na ordem: {scenes_per_section}
+Cena: [descrição em português (máx 8 palavras), ação em inglês para busca (1-3 palavras, ÚNICA, sem "stick figure"), código da emoção]
+Códigos de emoção: {emotion_codes}
+"""
+
+# Vários temas curtos num pedido só (o prompt do sistema vai uma vez).
+# "i" é o número do tema, para separar as respostas mesmo fora de ordem
+BATCH_TEMPLATE_COMPACT = """
+{system_prompt}
+Crie {count} roteiros INDEPENDENTES, um para cada tema abaixo.
+DURAÇÃO de cada roteiro: {duration_formatted} (~{total_words} palavras narradas)
+
+TEMAS:
+{topics}
+
+Responda APENAS com JSON compacto (chaves curtas, cenas como listas), um item por tema:
+{{"v":[{{"i":1,"t":"título com emoji (máx 60)","h":"abertura ~{hook_words} palavras","r":"conteúdo principal ~{roteiro_words} palavras, conversacional, com exemplos","c":"chamada final ~{cta_words} palavras","d":"descrição YouTube (1-2 linhas)","g":["hashtag","sem","cerquilha"],"s":[["descrição da cena","thinking","cu"]]}}]}}
+
+Cada "s" tem EXATAMENTE {num_scenes} cenas: [descrição em português (máx 8 palavras), ação em inglês para busca (1-3 palavras, ÚNICA, sem "stick figure"), código da emoção]
+Códigos de emoção: {emotion_codes}
+"""
+
+_COMPACT_KEYS = {"t": "titulo", "h": "hook", "r": "roteiro", "c": "cta", "d": "descricao",
+                 "g": "hashtags", "s": "cenas", "x": "secoes", "p": "pontos"}
+
+
+def expand_compact_scene(scene, index: int = 0):
+    """[descrição, ação, código] → dict de cena no formato normal"""
+    if not isinstance(scene, list):
+        return scene
+    
+    descricao = str(scene[0]) if len(scene) > 0 else ""
+    action = str(scene[1]).strip() if len(scene) > 1 else ""
+    code = str(scene[2]).strip().lower() if len(scene) > 2 else ""
+    
+    busca = ""
+    if action:
+        # O prefixo vem daqui, não do LLM (alternando como nos templates)
+        prefix = "stick figure" if index % 2 == 0 else "stickman"
+        busca = action if "stick" in action.lower() else f"{prefix} {action}"
+    
+    return {
+        "descricao": descricao,
+        "busca_tenor": busca,
+        "emocao": EMOTION_CODES.get(code, code if code in EMOTION_SEARCH_TERMS else ""),
+    }
+
+
+def expand_compact(data):
+    """Converte a resposta compacta para o dict normal do roteiro (chaves longas já existentes ficam)"""
+    if isinstance(data, list):
+        return [expand_compact(item) for item in data]
+    if not isinstance(data, dict):
+        return data
+    
+    result = {}
+    for key, value in data.items():
+        long_key = _COMPACT_KEYS.get(key, key)
+        if long_key == "cenas" and isinstance(value, list):
+            value = [expand_compact_scene(scene, i) for i, scene in enumerate(value)]
+        elif long_key == "secoes" and isinstance(value, list):
+            value = [expand_compact(section) for section in value]
+        elif long_key == "hashtags" and isinstance(value, list):
+            value = [tag if str(tag).startswith("#") else f"#{tag}" for tag in value]
+        result.setdefault(long_key, value)
+    
+    return result
+
+
+# Versão dos prompts: entra na chave do cache de roteiros.
+# Mudanças nos templates já invalidam o cache pelo hash; suba a versão quando
+# mudar o pós-processamento (cenas, termos de busca, narração).
+PROMPT_VERSION = "v3-" + hashlib.sha1(
+    (SYSTEM_PROMPT_STICKMAN + SCRIPT_TEMPLATE_SHORT + SCRIPT_TEMPLATE_LONG
+     + OUTLINE_TEMPLATE + SECTION_TEMPLATE + SYSTEM_PROMPT_COMPACT
+     + SCRIPT_TEMPLATE_COMPACT + OUTLINE_TEMPLATE_COMPACT
+     + BATCH_TEMPLATE_COMPACT).encode("utf-8")
+).hexdigest()[:8]
+
+
 class TextGenerator:
     """Gera roteiros e textos usando IA - v3 com controle de duração"""
     
-    def __init__(self, provider: str = "gemini"):
+    def __init__(self, provider: str = "gemini", schema: str = None):
         """
         Args:
             provider: "gemini" ou "groq"
+            schema: "verbose" (JSON completo) ou "compact" (chaves curtas, menos tokens)
         """
         self.provider = provider.lower()
+        self.schema = (schema or SCRIPT_SCHEMA).lower()
         self._setup_client()
         self._used_search_terms = set()
+
+        # Falhas de API (roteiro com fallback não vai para o cache)
+        self.error_count = 0
+        
+        # JSON do roteiro: direto, reparado localmente ou sem salvação
+        self.json_stats = {"ok": 0, "repaired": 0, "failed": 0}
+        self.script_cache = ScriptCache() if SCRIPT_CACHE["enabled"] else None
     
     def _setup_client(self):
-        """Configura o cliente da API"""
+        """Configura o roteador (provider escolhido + o outro como reserva)"""
         
-        if self.provider == "gemini":
-            if not GENAI_AVAILABLE:
-                raise ImportError("google-genai não instalado. Use: pip install google-genai")
-            if not GEMINI_API_KEY:
-                raise ValueError("GEMINI_API_KEY não configurada no .env")
-            
-            self.client = genai.Client(api_key=GEMINI_API_KEY)
-            self.model_name = "gemini-2.0-flash"
-            print(f"✓ TextGenerator: Gemini ({self.model_name})")
-        
-        elif self.provider == "groq":
-            if not GROQ_AVAILABLE:
-                raise ImportError("groq não instalado. Use: pip install groq")
-            if not GROQ_API_KEY:
-                raise ValueError("GROQ_API_KEY não configurada no .env")
-            
-            self.client = Groq(api_key=GROQ_API_KEY)
-            self.model_name = "llama-3.3-70b-versatile"
-            print(f"✓ TextGenerator: Groq ({self.model_name})")
-        
-        else:
-            raise ValueError(f"Provider '{self.provider}' não suportado. Use 'gemini' ou 'groq'")
+        self.router = LLMRouter(primary=self.provider)
+        self.client = self.router.clients[self.provider]
+        self.model_name = self.router.model_name()
+        print(f"✓ TextGenerator: {self.provider.title()} ({self.model_name})")
     
-    def generate(self, prompt: str, temperature: float = 0.7, max_tokens: int = 4000) -> str:
-        """Gera texto baseado em um prompt"""
+    def generate(self, prompt: str, temperature: float = 0.7, max_tokens: int = 4000,
+                 validate=None) -> str:
+        """
+        Gera texto baseado em um prompt
+        
+        Args:
+            validate: Função texto → bool; resposta inválida dispara o provider reserva
+        """
         
         try:
-            if self.provider == "gemini":
-                response = self.client.models.generate_content(
-                    model=self.model_name,
-                    contents=prompt
-                )
-                return response.text
-            
-            elif self.provider == "groq":
-                response = self.client.chat.completions.create(
-                    model=self.model_name,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=temperature,
-                    max_tokens=max_tokens
-                )
-                return response.choices[0].message.content
-                
+            return self.router.generate(prompt, temperature=temperature,
+                                        max_tokens=max_tokens, validate=validate)
         except Exception as e:
+            self.error_count += 1
             print(f"❌ Erro ao gerar texto: {e}")
             raise
     
     def generate_short_script(self, topic: str, num_scenes: int = 6, 
-                              target_duration: int = 30) -> dict:
+                              target_duration: int = 30, use_cache: bool = True,
+                              on_scene=None) -> dict:
         """
         Gera roteiro completo com duração controlada
         
@@ -257,10 +410,29 @@ class TextGenerator:
             topic: Tema do vídeo
             num_scenes: Número de cenas
             target_duration: Duração alvo em segundos (NOVO!)
+            use_cache: False força um roteiro novo (o resultado ainda atualiza o cache)
+            on_scene: Callback (índice, cena) chamado assim que cada cena fica pronta
+                      no streaming (as cenas finais continuam no retorno)
             
         Returns:
             Dict com título, roteiro, cenas, etc.
         """
+        cache_key = self._script_cache_key(topic, num_scenes, target_duration)
+        if cache_key is not None:
+            if use_cache:
+                start = time.perf_counter()
+                cached = self.script_cache.get_script(cache_key)
+                if cached is not None:
+                    elapsed_us = (time.perf_counter() - start) * 1e6
+                    print(f"\n♻️ Roteiro em cache: {topic} ({elapsed_us:.0f} µs)")
+                    cached["topic"] = topic
+                    if on_scene:
+                        for index, scene in enumerate(cached.get("cenas", [])):
+                            on_scene(index, scene)
+                    return cached
+        
+        errors_before = self.error_count
+        
         # Reseta termos usados
         self._used_search_terms = set()
         
@@ -275,34 +447,224 @@ class TextGenerator:
         print(f"   📊 Palavras alvo: ~{word_config['total']}")
         print(f"   🎬 Cenas: {num_scenes}")
         
-        # Gera template de cenas
-        cenas_template = self._generate_cenas_template(num_scenes)
-        
-        # Escolhe template baseado na duração
-        if target_duration <= 60:
-            template = SCRIPT_TEMPLATE_SHORT
+        if LONG_FORM["enabled"] and target_duration >= LONG_FORM["min_duration"]:
+            # Vídeo longo: esboço + seções em paralelo (latência da maior seção)
+            result = self._generate_long_form(
+                topic, num_scenes, target_duration, word_config, duration_formatted, on_scene
+            )
+        elif self.schema == "compact":
+            # Formato compacto: sem exemplo por cena, chaves curtas e cenas como listas
+            prompt = SCRIPT_TEMPLATE_COMPACT.format(
+                system_prompt=SYSTEM_PROMPT_COMPACT,
+                topic=topic,
+                duration_formatted=duration_formatted,
+                total_words=word_config['total'],
+                hook_words=word_config['hook'],
+                roteiro_words=word_config['roteiro'],
+                cta_words=word_config['cta'],
+                num_scenes=num_scenes,
+                emotion_codes=EMOTION_CODE_TABLE
+            )
+            max_tokens = max(1500, min(8000, int(word_config['total'] * 2.2) + num_scenes * 20))
+            
+            if on_scene:
+                result = self._generate_and_parse_streaming(prompt, max_tokens, on_scene, compact=True)
+            else:
+                result = self._generate_and_parse(prompt, max_tokens, compact=True)
         else:
-            template = SCRIPT_TEMPLATE_LONG
+            # Gera template de cenas
+            cenas_template = self._generate_cenas_template(num_scenes)
+            
+            # Escolhe template baseado na duração
+            if target_duration <= 60:
+                template = SCRIPT_TEMPLATE_SHORT
+            else:
+                template = SCRIPT_TEMPLATE_LONG
+            
+            # Monta o prompt
+            prompt = template.format(
+                system_prompt=SYSTEM_PROMPT_STICKMAN,
+                topic=topic,
+                duration_seconds=target_duration,
+                duration_formatted=duration_formatted,
+                total_words=word_config['total'],
+                hook_words=word_config['hook'],
+                roteiro_words=word_config['roteiro'],
+                cta_words=word_config['cta'],
+                num_scenes=num_scenes,
+                cenas_template=cenas_template
+            )
+            
+            # Ajusta max_tokens baseado na duração
+            max_tokens = max(2000, min(8000, word_config['total'] * 3))
+            
+            # Gera o roteiro (em streaming quando alguém quer as cenas antes)
+            if on_scene:
+                result = self._generate_and_parse_streaming(prompt, max_tokens, on_scene)
+            else:
+                result = self._generate_and_parse(prompt, max_tokens)
         
-        # Monta o prompt
-        prompt = template.format(
-            system_prompt=SYSTEM_PROMPT_STICKMAN,
-            topic=topic,
-            duration_seconds=target_duration,
+        result = self._finalize_script(result, topic, num_scenes, target_duration,
+                                       word_config, duration_formatted)
+        
+        # Só guarda roteiros sem fallback por erro de API
+        if cache_key is not None and self.error_count == errors_before:
+            try:
+                self.script_cache.set_script(cache_key, result)
+            except Exception as e:
+                print(f"   ⚠️ Não foi possível salvar o roteiro em cache: {e}")
+        
+        return result
+    
+    def generate_batch(self, topics: list, num_scenes: int = 6, target_duration: int = 30,
+                       use_cache: bool = True) -> list:
+        """
+        Gera roteiros curtos de vários temas com poucos pedidos ao LLM
+        
+        Os temas sem cache vão em lotes (JSON com um item por tema); cada item
+        é validado sozinho e só os temas que falharam são pedidos de novo.
+        Vídeos longos (ou lote desligado) caem no generate_short_script tema a tema.
+        
+        Returns:
+            Lista de roteiros na mesma ordem dos temas
+        """
+        if (not SCRIPT_BATCH["enabled"] or len(topics) < 2
+                or target_duration > SCRIPT_BATCH["max_duration"]):
+            return [
+                self.generate_short_script(topic, num_scenes=num_scenes,
+                                           target_duration=target_duration, use_cache=use_cache)
+                for topic in topics
+            ]
+        
+        results = [None] * len(topics)
+        keys = [self._script_cache_key(topic, num_scenes, target_duration) for topic in topics]
+        
+        if use_cache:
+            for index, key in enumerate(keys):
+                if key is not None:
+                    cached = self.script_cache.get_script(key)
+                    if cached is not None:
+                        cached["topic"] = topics[index]
+                        results[index] = cached
+        
+        pending = [i for i, result in enumerate(results) if result is None]
+        word_config = calculate_word_count(target_duration)
+        duration_formatted = self._format_duration(target_duration)
+        
+        # Tamanho do lote limitado pelos tokens de saída de um pedido
+        per_topic = int(word_config['total'] * 2.2) + num_scenes * 20 + 60
+        batch_size = max(1, min(SCRIPT_BATCH["max_topics"], SCRIPT_BATCH["max_tokens"] // per_topic))
+        
+        print(f"\n📚 Lote de roteiros: {len(topics)} temas, {len(topics) - len(pending)} em cache, "
+              f"{len(pending)} para gerar (até {batch_size} por pedido)")
+        
+        start = time.perf_counter()
+        generated = {}
+        for attempt in range(SCRIPT_BATCH["retries"] + 1):
+            missing = [i for i in pending if i not in generated]
+            if not missing:
+                break
+            if attempt:
+                print(f"   🔁 Pedindo de novo {len(missing)} tema(s) que falharam")
+            
+            batches = [missing[k:k + batch_size] for k in range(0, len(missing), batch_size)]
+            with ThreadPoolExecutor(max_workers=min(len(batches), SCRIPT_BATCH["parallel"])) as executor:
+                outputs = executor.map(
+                    lambda batch: self._generate_batch_items(
+                        [topics[i] for i in batch], num_scenes, word_config, duration_formatted, per_topic
+                    ),
+                    batches,
+                )
+                for batch, items in zip(batches, outputs):
+                    for position, item in items.items():
+                        generated[batch[position]] = item
+        
+        if pending:
+            print(f"   📚 {len(generated)}/{len(pending)} roteiros do lote em {time.perf_counter() - start:.1f}s")
+        
+        for index in pending:
+            topic = topics[index]
+            if index not in generated:
+                # Não veio no lote nem na repetição: caminho normal, tema a tema
+                results[index] = self.generate_short_script(
+                    topic, num_scenes=num_scenes, target_duration=target_duration, use_cache=False
+                )
+                continue
+            
+            errors_before = self.error_count
+            self._used_search_terms = set()
+            result = self._finalize_script(generated[index], topic, num_scenes, target_duration,
+                                           word_config, duration_formatted)
+            if keys[index] is not None and self.error_count == errors_before:
+                try:
+                    self.script_cache.set_script(keys[index], result)
+                except Exception as e:
+                    print(f"   ⚠️ Não foi possível salvar o roteiro em cache: {e}")
+            results[index] = result
+        
+        return results
+    
+    def _generate_batch_items(self, batch_topics: list, num_scenes: int, word_config: dict,
+                              duration_formatted: str, per_topic: int) -> dict:
+        """Um pedido com vários temas → {posição no lote: roteiro válido}"""
+        prompt = BATCH_TEMPLATE_COMPACT.format(
+            system_prompt=SYSTEM_PROMPT_COMPACT,
+            count=len(batch_topics),
+            topics="\n".join(f"{n}. {topic}" for n, topic in enumerate(batch_topics, 1)),
             duration_formatted=duration_formatted,
             total_words=word_config['total'],
             hook_words=word_config['hook'],
             roteiro_words=word_config['roteiro'],
             cta_words=word_config['cta'],
             num_scenes=num_scenes,
-            cenas_template=cenas_template
+            emotion_codes=EMOTION_CODE_TABLE
         )
+        max_tokens = min(SCRIPT_BATCH["max_tokens"], per_topic * len(batch_topics) + 200)
         
-        # Ajusta max_tokens baseado na duração
-        max_tokens = max(2000, min(8000, word_config['total'] * 3))
+        data = self._generate_and_parse(prompt, max_tokens, required=("v",))
+        items = data.get("v") if isinstance(data, dict) else None
+        if not isinstance(items, list):
+            return {}
         
-        # Gera o roteiro
-        result = self._generate_and_parse(prompt, max_tokens)
+        valid = {}
+        for position, item in enumerate(items):
+            if not isinstance(item, dict):
+                continue
+            # "i" (1..n) manda; sem ele, vale a posição na lista
+            try:
+                slot = int(item.get("i", position + 1)) - 1
+            except (TypeError, ValueError):
+                slot = position
+            if not 0 <= slot < len(batch_topics) or slot in valid:
+                continue
+            
+            script = expand_compact(item)
+            script.pop("i", None)
+            roteiro = script.get("roteiro")
+            if (isinstance(roteiro, str) and roteiro.strip()
+                    and isinstance(script.get("cenas"), list) and script["cenas"]):
+                valid[slot] = script
+        
+        if len(valid) < len(batch_topics):
+            print(f"   ⚠️ Lote: {len(batch_topics) - len(valid)} de {len(batch_topics)} roteiros inválidos")
+        return valid
+    
+    def _script_cache_key(self, topic: str, num_scenes: int, target_duration: int) -> str:
+        """Chave do roteiro no cache (None com o cache desligado)"""
+        if self.script_cache is None:
+            return None
+        return ScriptCache.make_key(
+            topic, target_duration, num_scenes, self.provider, self.model_name,
+            f"{PROMPT_VERSION}-{self.schema}"
+        )
+    
+    def _finalize_script(self, result: dict, topic: str, num_scenes: int, target_duration: int,
+                         word_config: dict, duration_formatted: str) -> dict:
+        """Pós-processamento comum: campos faltantes, tamanho, cenas, termos e narração"""
+        
+        # JSON salvo em parte (reparo): pede ao LLM só os campos que faltam
+        if result:
+            result = self._fill_missing_fields(result, topic, word_config, duration_formatted)
         
         # Se falhou ou ficou muito curto, tenta método alternativo
         if not result or not result.get("roteiro"):
@@ -368,20 +730,88 @@ class TextGenerator:
         
         return ",\n".join(cenas)
     
-    def _generate_and_parse(self, prompt: str, max_tokens: int) -> dict:
-        """Gera e faz parse do JSON"""
+    def _generate_and_parse(self, prompt: str, max_tokens: int,
+                            required: tuple = ("roteiro", "cenas"), compact: bool = False) -> dict:
+        """Gera e faz parse do JSON (com reparo local antes de desistir)"""
+        if compact:
+            # Aceita as chaves curtas na validação (t/h/r/c/s/x)
+            required = tuple(k for k, v in _COMPACT_KEYS.items() if v in required) + required
         try:
-            response = self.generate(prompt, temperature=0.7, max_tokens=max_tokens)
-            json_str = self._extract_json(response)
-            result = json.loads(json_str)
-            return result
-        except json.JSONDecodeError as e:
+            response = self.generate(prompt, temperature=0.7, max_tokens=max_tokens,
+                                     validate=lambda text: self._is_valid_json(text, required))
+            result = self._parse_script_json(response)
+            return expand_compact(result) if compact else result
+        except ValueError as e:
+            self.json_stats["failed"] += 1
             print(f"   ⚠️ Erro ao parsear JSON: {e}")
             return {}
         except Exception as e:
             print(f"   ⚠️ Erro na geração: {e}")
             return {}
     
+    def _generate_and_parse_streaming(self, prompt: str, max_tokens: int, on_scene,
+                                      compact: bool = False) -> dict:
+        """Como _generate_and_parse, mas emite cada cena assim que ela fecha no stream"""
+        parser = SceneStreamParser(key="s" if compact else "cenas")
+        required = ("r", "s") if compact else ("roteiro", "cenas")
+        
+        def on_text(piece: str):
+            for scene in parser.feed(piece):
+                index = parser.count - 1
+                try:
+                    on_scene(index, expand_compact_scene(scene, index) if compact else scene)
+                except Exception as e:
+                    print(f"   ⚠️ Callback de cena falhou: {e}")
+        
+        try:
+            start = time.perf_counter()
+            response = self.router.stream(prompt, on_text, temperature=0.7, max_tokens=max_tokens,
+                                          validate=lambda text: self._is_valid_json(text, required))
+            print(f"   📡 Stream: {parser.count} cenas emitidas em {time.perf_counter() - start:.1f}s")
+            result = self._parse_script_json(response)
+            return expand_compact(result) if compact else result
+        except Exception as e:
+            print(f"   ⚠️ Streaming falhou ({e}), gerando sem streaming...")
+            return self._generate_and_parse(prompt, max_tokens, compact=compact)
+    
+    def _parse_script_json(self, response: str, count: bool = True) -> dict:
+        """
+        JSON do roteiro: parse direto, senão reparo local (vírgulas, aspas, corte...)
+        
+        Raises:
+            ValueError se nem o reparo resolver
+        """
+        try:
+            result = json.loads(self._extract_json(response))
+            if not isinstance(result, dict):
+                raise ValueError("JSON não é um objeto")
+            if count:
+                self.json_stats["ok"] += 1
+            return result
+        except (ValueError, TypeError):
+            pass
+        
+        result, repairs = repair_json(response)
+        if not isinstance(result, dict):
+            raise ValueError("JSON reparado não é um objeto")
+        if count:
+            self.json_stats["repaired"] += 1
+            print(f"   🔧 JSON reparado localmente: {', '.join(repairs) or 'ok'}")
+        return result
+    
+    def _is_valid_json(self, response: str, required: tuple = ("roteiro", "cenas")) -> bool:
+        """Resposta tem um objeto JSON (direto ou reparável) com algum dos campos pedidos"""
+        try:
+            result = self._parse_script_json(response, count=False)
+        except (ValueError, TypeError):
+            return False
+        return any(result.get(key) for key in required)
+    
+    def repair_rate(self) -> float:
+        """Fração das respostas com JSON quebrado que o reparo local salvou"""
+        broken = self.json_stats["repaired"] + self.json_stats["failed"]
+        return self.json_stats["repaired"] / broken if broken else 0.0
+    
     def _extract_json(self, response: str) -> str:
         """Extrai JSON da resposta"""
         # Remove blocos de código markdown
@@ -396,37 +826,12 @@ class TextGenerator:
         
         return response.strip()
     
-    def _generate_with_expansion(self, topic: str, num_scenes: int, 
-                                  word_config: dict, duration_formatted: str) -> dict:
-        """Gera roteiro em partes quando JSON falha"""
+    def _section_specs(self, topic: str, word_config: dict, duration_formatted: str) -> dict:
+        """Prompt, temperature, max_tokens, remove aspas e fallback de cada parte do roteiro"""
         
-        result = {
-            "titulo": "",
-            "hook": "",
-            "roteiro": "",
-            "cta": "",
-            "descricao": "",
-            "hashtags": [],
-            "cenas": []
-        }
-        
-        # Gera título
-        try:
-            title_prompt = f"Crie um título chamativo com emoji (máximo 60 caracteres) para um vídeo sobre: {topic}\n\nResponda APENAS com o título, nada mais."
-            result["titulo"] = self.generate(title_prompt, temperature=0.8, max_tokens=100).strip().strip('"')
-        except:
-            result["titulo"] = f"🔥 {topic.title()}"
-        
-        # Gera hook
-        try:
-            hook_prompt = f"Crie uma frase de abertura impactante ({word_config['hook']} palavras) para um vídeo sobre: {topic}\n\nResponda APENAS com a frase, nada mais."
-            result["hook"] = self.generate(hook_prompt, temperature=0.8, max_tokens=200).strip().strip('"')
-        except:
-            result["hook"] = f"Você sabia que {topic}? Isso vai mudar sua perspectiva!"
-        
-        # Gera conteúdo principal (parte mais importante)
-        try:
-            roteiro_prompt = f"""
+        title_prompt = f"Crie um título chamativo com emoji (máximo 60 caracteres) para um vídeo sobre: {topic}\n\nResponda APENAS com o título, nada mais."
+        hook_prompt = f"Crie uma frase de abertura impactante ({word_config['hook']} palavras) para um vídeo sobre: {topic}\n\nResponda APENAS com a frase, nada mais."
+        roteiro_prompt = f"""
 Escreva o conteúdo principal de um vídeo sobre: {topic}
 
 REQUISITOS:
@@ -439,17 +844,178 @@ REQUISITOS:
 
 Escreva APENAS o texto, sem formatação ou marcadores.
 """
-            result["roteiro"] = self.generate(roteiro_prompt, temperature=0.7, max_tokens=4000).strip()
-        except Exception as e:
-            print(f"   ⚠️ Erro ao gerar roteiro: {e}")
-            result["roteiro"] = f"Vamos falar sobre {topic}. Este é um tema muito interessante que merece nossa atenção."
+        cta_prompt = f"Crie uma chamada para ação final ({word_config['cta']} palavras) convidando a curtir, comentar e seguir. Faça uma pergunta para engajamento.\n\nResponda APENAS com o texto, nada mais."
         
-        # Gera CTA
-        try:
-            cta_prompt = f"Crie uma chamada para ação final ({word_config['cta']} palavras) convidando a curtir, comentar e seguir. Faça uma pergunta para engajamento.\n\nResponda APENAS com o texto, nada mais."
-            result["cta"] = self.generate(cta_prompt, temperature=0.8, max_tokens=200).strip().strip('"')
-        except:
-            result["cta"] = "Gostou desse conteúdo? Deixa seu like, comenta aqui embaixo o que você achou, e se inscreve no canal para mais vídeos como esse!"
+        return {
+            "titulo": (title_prompt, 0.8, 100, True, f"🔥 {topic.title()}"),
+            "hook": (hook_prompt, 0.8, 200, True, f"Você sabia que {topic}? Isso vai mudar sua perspectiva!"),
+            "roteiro": (roteiro_prompt, 0.7, 4000, False,
+                        f"Vamos falar sobre {topic}. Este é um tema muito interessante que merece nossa atenção."),
+            "cta": (cta_prompt, 0.8, 200, True,
+                    "Gostou desse conteúdo? Deixa seu like, comenta aqui embaixo o que você achou, e se inscreve no canal para mais vídeos como esse!"),
+        }
+    
+    def _generate_sections(self, keys: list, specs: dict) -> dict:
+        """Gera as partes pedidas em paralelo (generate respeita o limite do provider)"""
+        
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, len(keys))) as executor:
+            futures = {
+                key: executor.submit(self.generate, specs[key][0], temperature=specs[key][1],
+                                     max_tokens=specs[key][2])
+                for key in keys
+            }
+        
+        sections = {}
+        for key in keys:
+            _, _, _, strip_quotes, fallback = specs[key]
+            try:
+                text = futures[key].result().strip()
+                sections[key] = text.strip('"') if strip_quotes else text
+            except Exception as e:
+                if key == "roteiro":
+                    print(f"   ⚠️ Erro ao gerar roteiro: {e}")
+                sections[key] = fallback
+        
+        print(f"   ⚡ {len(keys)} parte(s) gerada(s) em paralelo em {time.perf_counter() - start:.1f}s")
+        return sections
+    
+    def _generate_long_form(self, topic: str, num_scenes: int, target_duration: int,
+                            word_config: dict, duration_formatted: str, on_scene=None) -> dict:
+        """
+        Roteiro longo em duas etapas: esboço compacto e depois as seções em paralelo
+        
+        Cada seção recebe sua parte do orçamento de palavras do roteiro, então a
+        latência acompanha a maior seção e não o texto inteiro.
+        
+        Returns:
+            Dict no formato normal (titulo, hook, roteiro, cta, cenas...) ou {} se o esboço falhar
+        """
+        num_sections = max(LONG_FORM["min_sections"],
+                           min(LONG_FORM["max_sections"], round(target_duration / LONG_FORM["seconds_per_section"])))
+        num_sections = min(num_sections, num_scenes)
+        
+        base, extra = divmod(num_scenes, num_sections)
+        scenes_per_section = [base + (1 if i < extra else 0) for i in range(num_sections)]
+        
+        base, extra = divmod(word_config['roteiro'], num_sections)
+        words_per_section = [base + (1 if i < extra else 0) for i in range(num_sections)]
+        
+        print(f"   🧭 Formato longo: {num_sections} seções ({', '.join(map(str, words_per_section))} palavras)")
+        
+        # ===== 1. ESBOÇO =====
+        compact = self.schema == "compact"
+        prompt = (OUTLINE_TEMPLATE_COMPACT if compact else OUTLINE_TEMPLATE).format(
+            system_prompt=SYSTEM_PROMPT_COMPACT if compact else SYSTEM_PROMPT_STICKMAN,
+            topic=topic,
+            duration_formatted=duration_formatted,
+            hook_words=word_config['hook'],
+            cta_words=word_config['cta'],
+            num_sections=num_sections,
+            scenes_per_section=", ".join(map(str, scenes_per_section)),
+            emotion_codes=EMOTION_CODE_TABLE
+        )
+        scene_tokens = 30 if compact else 60
+        outline = self._generate_and_parse(prompt, max_tokens=max(1500, min(6000, num_scenes * scene_tokens + 800)),
+                                           required=("secoes",), compact=compact)
+        
+        sections = [s for s in outline.get("secoes", []) if isinstance(s, dict)] if outline else []
+        if not sections:
+            print("   ⚠️ Esboço sem seções, voltando ao roteiro em uma chamada só")
+            return {}
+        sections = sections[:num_sections]
+        
+        # Cenas do esboço já estão prontas: quem faz prefetch de mídia começa agora
+        cenas = []
+        for section in sections:
+            for scene in section.get("cenas", []) or []:
+                cenas.append(scene)
+                if on_scene:
+                    try:
+                        on_scene(len(cenas) - 1, scene)
+                    except Exception as e:
+                        print(f"   ⚠️ Callback de cena falhou: {e}")
+        
+        # ===== 2. SEÇÕES EM PARALELO =====
+        outline_text = "\n".join(
+            f"{i + 1}. {s.get('titulo', f'Parte {i + 1}')}: {s.get('pontos', '')}"
+            for i, s in enumerate(sections)
+        )
+        specs = {}
+        for i, section in enumerate(sections):
+            if i == 0:
+                position_rule = "Comece direto no assunto (a frase de abertura já foi dita)"
+            elif i == len(sections) - 1:
+                position_rule = "Feche o raciocínio do vídeo (a chamada para ação vem logo depois)"
+            else:
+                position_rule = "Faça uma transição natural a partir da seção anterior"
+            
+            words = words_per_section[min(i, len(words_per_section) - 1)]
+            section_prompt = SECTION_TEMPLATE.format(
+                topic=topic,
+                outline=outline_text,
+                index=i + 1,
+                total=len(sections),
+                section_title=section.get("titulo", f"Parte {i + 1}"),
+                section_points=section.get("pontos", ""),
+                words=words,
+                position_rule=position_rule
+            )
+            # Fallback: os pontos do esboço (a expansão completa o tamanho depois)
+            specs[f"secao_{i + 1}"] = (section_prompt, 0.7, max(600, min(4000, words * 3)), False,
+                                       section.get("pontos", ""))
+        
+        texts = self._generate_sections(list(specs), specs)
+        
+        return {
+            "titulo": outline.get("titulo", ""),
+            "hook": outline.get("hook", ""),
+            "roteiro": "\n\n".join(t for t in (texts[k] for k in specs) if t),
+            "cta": outline.get("cta", ""),
+            "descricao": outline.get("descricao", ""),
+            "hashtags": outline.get("hashtags", []),
+            "cenas": cenas,
+        }
+    
+    def _fill_missing_fields(self, result: dict, topic: str,
+                             word_config: dict, duration_formatted: str) -> dict:
+        """Completa só os campos de texto que faltaram (ex.: JSON cortado e reparado)"""
+        
+        missing = [key for key in ("titulo", "hook", "roteiro", "cta")
+                   if not isinstance(result.get(key), str) or not result.get(key).strip()]
+        if not missing:
+            return result
+        
+        print(f"   🧩 Completando campos faltantes: {', '.join(missing)}")
+        specs = self._section_specs(topic, word_config, duration_formatted)
+        result.update(self._generate_sections(missing, specs))
+        
+        if not result.get("descricao"):
+            result["descricao"] = f"🎬 {topic}\n\n📌 Neste vídeo você vai aprender tudo sobre {topic}!\n\n👆 Ative o sininho para não perder nenhum conteúdo!"
+        if not result.get("hashtags"):
+            topic_words = topic.lower().split()[:3]
+            result["hashtags"] = [f"#{w}" for w in topic_words] + ["#shorts", "#viral", "#dicasúteis", "#aprendizado"]
+        
+        return result
+    
+    def _generate_with_expansion(self, topic: str, num_scenes: int, 
+                                  word_config: dict, duration_formatted: str) -> dict:
+        """Gera roteiro em partes quando JSON falha (partes em paralelo)"""
+        
+        specs = self._section_specs(topic, word_config, duration_formatted)
+        
+        result = {
+            "titulo": "",
+            "hook": "",
+            "roteiro": "",
+            "cta": "",
+            "descricao": "",
+            "hashtags": [],
+            "cenas": []
+        }
+        
+        # As partes não dependem umas das outras: dispara todas juntas
+        result.update(self._generate_sections(list(specs), specs))
         
         # Gera descrição
         result["descricao"] = f"🎬 {topic}\n\n📌 Neste vídeo você vai aprender tudo sobre {topic}!\n\n👆 Ative o sininho para não perder nenhum conteúdo!"
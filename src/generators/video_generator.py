@@ -18,6 +18,9 @@ from moviepy.editor import (
 from moviepy.video.fx.all import fadein, fadeout
 
 sys.path.append(str(Path(__file__).parent.parent))
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from src.utils.media_validator import lookup as validated_media
 
 # Tenta importar SRTGenerator
 try:
@@ -148,6 +151,9 @@ class VideoGenerator:
             return 'unknown'
     
     def _validate_video_file(self, file_path: str) -> bool:
+        # Já validado no download (dimensões e duração conhecidas): sem ffprobe
+        if validated_media(file_path):
+            return True
         try:
             result = subprocess.run([
                 'ffprobe', '-v', 'error',
@@ -743,6 +749,96 @@ class VideoGenerator:
         
         return str(output_path)
 
+    
+    # ===========================================
+    # SEGMENTOS (pipeline progressivo)
+    # ===========================================
+    
+    def render_segment(self, media_path: str, duration: float, output_path: str,
+                       width: int, height: int, fps: int = 30,
+                       subtitle_text: str = None) -> str:
+        """
+        Renderiza uma única cena (sem áudio) com a duração exata do seu trecho de narração
+        
+        Todos os segmentos usam os mesmos parâmetros de codificação para que
+        concat_segments possa juntá-los sem re-encode.
+        """
+        media_type = self._get_media_type(media_path)
+        crossfade = 0.3
+        
+        clip = self._load_media_as_clip(
+            file_path=media_path,
+            duration=duration,
+            width=width,
+            height=height,
+            apply_effect=(media_type == 'image')
+        )
+        clip = fadein(clip, crossfade)
+        clip = fadeout(clip, crossfade)
+        
+        if subtitle_text:
+            clip = self._create_video_with_subtitles(clip, subtitle_text, duration, width, height)
+        
+        clip = clip.set_duration(duration)
+        clip.write_videofile(
+            output_path,
+            fps=fps,
+            codec='libx264',
+            audio=False,
+            preset='medium',
+            threads=2,
+            ffmpeg_params=['-pix_fmt', 'yuv420p'],
+            logger=None
+        )
+        clip.close()
+        
+        return output_path
+    
+    def concat_segments(self, segment_paths: list, audio_path: str, output_name: str,
+                        subtitle_timings: list = None) -> str:
+        """Junta os segmentos (stream copy) e adiciona a narração em um único passo do ffmpeg"""
+        output_path = self.output_dir / f"{output_name}.mp4"
+        list_path = self.output_dir / f"{output_name}_segments.txt"
+        
+        with open(list_path, "w", encoding="utf-8") as f:
+            for path in segment_paths:
+                safe_path = str(Path(path).resolve()).replace("'", "'\\''")
+                f.write(f"file '{safe_path}'\n")
+        
+        result = subprocess.run([
+            'ffmpeg', '-y', '-v', 'error',
+            '-f', 'concat', '-safe', '0', '-i', str(list_path),
+            '-i', audio_path,
+            '-map', '0:v', '-map', '1:a',
+            '-c:v', 'copy',
+            '-c:a', 'aac', '-b:a', '192k',
+            '-shortest',
+            '-movflags', '+faststart',
+            str(output_path)
+        ], capture_output=True, text=True)
+        
+        try:
+            os.remove(list_path)
+        except OSError:
+            pass
+        
+        if result.returncode != 0:
+            raise RuntimeError(f"Erro ao juntar segmentos: {result.stderr[:300]}")
+        
+        if subtitle_timings:
+            srt_path = self.output_dir / f"{output_name}.srt"
+            # SRTGenerator real usa format_time_srt; o fallback local usa _format_time
+            format_time = getattr(self.srt_gen, "format_time_srt", None) or self.srt_gen._format_time
+            with open(srt_path, "w", encoding="utf-8") as f:
+                for i, t in enumerate(subtitle_timings):
+                    f.write(f"{i+1}\n{format_time(t['start'])} --> {format_time(t['end'])}\n"
+                            f"{t['text'].upper()}\n\n")
+            print(f"    SRT salvo: {srt_path}")
+        
+        print(f"\n✅ Video salvo: {output_path}")
+        
+        return str(output_path)
+
 
 if __name__ == "__main__":
     print("="*50)
@@ -0,0 +1,379 @@
+"""
+Ajuste de duração da narração sem re-sintetizar
+
+Decodifica o áudio do TTS para NumPy uma única vez e:
+- corta silêncio no início e no fim
+- encurta pausas longas entre frases (gate por RMS vetorizado)
+- aplica uma pequena mudança de ritmo (atempo) para cair na janela de duração
+
+O resultado é codificado em um único passo do ffmpeg, que também faz o
+resample para 44.1 kHz estéreo (substitui o normalize_audio do bot).
+A loudness (EBU R128 / ITU-R BS.1770) é medida no próprio PCM decodificado
+e o ganho entra como filtro nesse mesmo passo de codificação.
+"""
+import subprocess
+from pathlib import Path
+import sys
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from config.settings import AUDIO_FIT, AUDIO_LOUDNESS
+
+
+class AudioFitter:
+    """Ajusta a duração da narração em milissegundos, sem novas chamadas de rede"""
+
+    def __init__(self, sample_rate: int = 44100, frame_ms: int = 20,
+                 max_pause: float = None, min_pause: float = None,
+                 edge_pad: float = 0.08, max_tempo_change: float = None):
+        """
+        Args:
+            sample_rate: Taxa usada na decodificação e na saída
+            frame_ms: Tamanho do frame de análise RMS
+            max_pause: Pausas maiores que isso (s) são encurtadas
+            min_pause: Pausa mínima mantida quando precisa encurtar mais
+            edge_pad: Silêncio mantido no início/fim (s)
+            max_tempo_change: Mudança máxima de ritmo (0.12 = ±12%)
+        """
+        self.sample_rate = sample_rate
+        self.frame_len = int(sample_rate * frame_ms / 1000)
+        self.max_pause = AUDIO_FIT["max_pause"] if max_pause is None else max_pause
+        self.min_pause = AUDIO_FIT["min_pause"] if min_pause is None else min_pause
+        self.edge_pad = edge_pad
+        self.max_tempo_change = (AUDIO_FIT["max_tempo_change"]
+                                 if max_tempo_change is None else max_tempo_change)
+
+    # ===========================================
+    # DECODE / ENCODE
+    # ===========================================
+
+    def decode(self, audio_path: str) -> np.ndarray:
+        """Decodifica qualquer áudio para float32 mono na taxa de trabalho"""
+        result = subprocess.run([
+            'ffmpeg', '-v', 'error',
+            '-i', audio_path,
+            '-f', 's16le', '-acodec', 'pcm_s16le',
+            '-ac', '1', '-ar', str(self.sample_rate),
+            'pipe:1'
+        ], capture_output=True, timeout=120)
+
+        if result.returncode != 0 or not result.stdout:
+            raise RuntimeError(f"ffmpeg não decodificou {audio_path}: {result.stderr[:200]!r}")
+
+        pcm = np.frombuffer(result.stdout, dtype=np.int16)
+        return pcm.astype(np.float32) / 32768.0
+
+    def encode(self, samples: np.ndarray, output_path: str, tempo: float = 1.0,
+               gain_db: float = 0.0, filters: list = None) -> str:
+        """Codifica para MP3 44.1 kHz estéreo, aplicando ganho/ritmo/filtros no mesmo passo"""
+        pcm = (np.clip(samples, -1.0, 1.0) * 32767.0).astype(np.int16)
+
+        audio_filters = list(filters or [])
+        if abs(gain_db) > 0.05:
+            # Depois da conversão para int16 o ganho vai no ffmpeg (sem clipar o PCM antes)
+            audio_filters.append(f"volume={gain_db:.2f}dB")
+        if abs(tempo - 1.0) > 1e-3:
+            audio_filters.append(f"atempo={tempo:.4f}")
+
+        cmd = [
+            'ffmpeg', '-y', '-v', 'error',
+            '-f', 's16le', '-ar', str(self.sample_rate), '-ac', '1',
+            '-i', 'pipe:0',
+        ]
+        if audio_filters:
+            cmd += ['-af', ",".join(audio_filters)]
+        cmd += [
+            '-ar', '44100',
+            '-ac', '2',
+            '-b:a', '192k',
+            '-acodec', 'libmp3lame',
+            output_path
+        ]
+
+        result = subprocess.run(cmd, input=pcm.tobytes(), capture_output=True, timeout=120)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg não codificou {output_path}: {result.stderr[:200]!r}")
+
+        return output_path
+
+    # ===========================================
+    # ANÁLISE (VETORIZADA)
+    # ===========================================
+
+    def _frame_levels(self, samples: np.ndarray) -> np.ndarray:
+        """Nível RMS (dBFS) de cada frame"""
+        n_frames = len(samples) // self.frame_len
+        if n_frames == 0:
+            return np.zeros(0, dtype=np.float32)
+
+        frames = samples[:n_frames * self.frame_len].reshape(n_frames, self.frame_len)
+        rms = np.sqrt(np.mean(frames * frames, axis=1))
+        return 20.0 * np.log10(rms + 1e-9)
+
+    def _silence_mask(self, levels: np.ndarray) -> np.ndarray:
+        """Frames considerados silêncio (limiar relativo ao nível da fala)"""
+        if len(levels) == 0:
+            return np.zeros(0, dtype=bool)
+
+        speech_level = np.percentile(levels, 95)
+        threshold = max(-55.0, speech_level - 30.0)
+        return levels < threshold
+
+    @staticmethod
+    def _runs(mask: np.ndarray):
+        """Início e fim (exclusivo) de cada sequência de True"""
+        padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+        edges = np.diff(padded)
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        return starts, ends
+
+    def _keep_mask(self, silent: np.ndarray, max_pause: float) -> np.ndarray:
+        """Frames mantidos: corta as pontas e encurta pausas maiores que max_pause"""
+        keep = np.ones(len(silent), dtype=bool)
+        voiced = np.flatnonzero(~silent)
+        if len(voiced) == 0:
+            return keep
+
+        frame_s = self.frame_len / self.sample_rate
+        pad = int(round(self.edge_pad / frame_s))
+        first = max(0, voiced[0] - pad)
+        last = min(len(silent), voiced[-1] + 1 + pad)
+        keep[:first] = False
+        keep[last:] = False
+
+        max_frames = max(1, int(round(max_pause / frame_s)))
+        half = max_frames // 2
+
+        starts, ends = self._runs(silent[first:last])
+        starts += first
+        ends += first
+        long_runs = (ends - starts) > max_frames
+
+        # Mantém metade da pausa em cada ponta e descarta o meio
+        for start, end in zip(starts[long_runs], ends[long_runs]):
+            keep[start + half:end - (max_frames - half)] = False
+
+        return keep
+
+    def _apply_keep(self, samples: np.ndarray, keep: np.ndarray) -> np.ndarray:
+        n_frames = len(keep)
+        sample_keep = np.repeat(keep, self.frame_len)
+        head = samples[:n_frames * self.frame_len][sample_keep]
+        # Resto que não fechou um frame inteiro acompanha o último frame
+        tail = samples[n_frames * self.frame_len:] if (n_frames == 0 or keep[-1]) else samples[:0]
+        return np.concatenate((head, tail))
+
+    # ===========================================
+    # LOUDNESS (EBU R128 / BS.1770)
+    # ===========================================
+
+    def _k_weighting_response(self, n_fft: int) -> np.ndarray:
+        """Resposta em frequência do filtro K (shelf + passa-alta) para a taxa atual"""
+        fs = self.sample_rate
+
+        # Estágio 1: high shelf (coeficientes derivados para qualquer fs)
+        gain_db, fc, q = 3.999843853973347, 1681.974450955533, 0.7071752369554196
+        k = np.tan(np.pi * fc / fs)
+        vh = 10 ** (gain_db / 20)
+        vb = vh ** 0.4996667741545416
+        a0 = 1 + k / q + k * k
+        shelf_b = np.array([(vh + vb * k / q + k * k), 2 * (k * k - vh), (vh - vb * k / q + k * k)]) / a0
+        shelf_a = np.array([a0, 2 * (k * k - 1), (1 - k / q + k * k)]) / a0
+
+        # Estágio 2: passa-alta (RLB)
+        fc, q = 38.13547087602444, 0.5003270373238773
+        k = np.tan(np.pi * fc / fs)
+        a0 = 1 + k / q + k * k
+        hp_b = np.array([1.0, -2.0, 1.0])
+        hp_a = np.array([a0, 2 * (k * k - 1), (1 - k / q + k * k)]) / a0
+
+        z = np.exp(-1j * np.pi * np.linspace(0, 1, n_fft // 2 + 1))
+        z_powers = np.stack([np.ones_like(z), z, z * z])
+
+        response = (shelf_b @ z_powers) / (shelf_a @ z_powers)
+        response *= (hp_b @ z_powers) / (hp_a @ z_powers)
+        return response
+
+    def measure_loudness(self, samples: np.ndarray, channels: int = 2) -> float:
+        """
+        Loudness integrada (LUFS) do PCM mono, como ficará na saída
+
+        Args:
+            samples: PCM float32 mono
+            channels: Canais da saída (mono duplicado em estéreo soma +3 dB)
+
+        Returns:
+            LUFS, ou None se o áudio for silêncio
+        """
+        sr = self.sample_rate
+        block = int(0.4 * sr)
+        step = int(0.1 * sr)
+        if len(samples) < block:
+            return None
+
+        # Filtro K aplicado no domínio da frequência (vetorizado, sem lfilter)
+        n_fft = 1 << int(np.ceil(np.log2(len(samples) + sr)))
+        spectrum = np.fft.rfft(samples.astype(np.float64), n_fft)
+        weighted = np.fft.irfft(spectrum * self._k_weighting_response(n_fft), n_fft)[:len(samples)]
+
+        # Energia média de blocos de 400 ms com 75% de sobreposição
+        energy = np.concatenate(([0.0], np.cumsum(weighted * weighted)))
+        starts = np.arange(0, len(samples) - block + 1, step)
+        block_power = (energy[starts + block] - energy[starts]) / block * channels
+        block_loudness = -0.691 + 10 * np.log10(block_power + 1e-12)
+
+        # Gate absoluto (-70 LUFS) e gate relativo (-10 LU)
+        gated = block_power[block_loudness > -70.0]
+        if len(gated) == 0:
+            return None
+        relative = -0.691 + 10 * np.log10(gated.mean()) - 10.0
+        gated = block_power[block_loudness > max(-70.0, relative)]
+        if len(gated) == 0:
+            return None
+
+        return float(-0.691 + 10 * np.log10(gated.mean()))
+
+    def loudness_gain(self, samples: np.ndarray) -> dict:
+        """
+        Ganho para levar a narração ao alvo de loudness sem passar do pico máximo
+
+        Returns:
+            Dict com loudness medida, gain_db e pico
+        """
+        if not AUDIO_LOUDNESS["enabled"] or len(samples) == 0:
+            return {"loudness": None, "gain_db": 0.0, "peak_db": None}
+
+        loudness = self.measure_loudness(samples)
+        peak = float(np.max(np.abs(samples)))
+        peak_db = 20 * np.log10(peak) if peak > 0 else None
+
+        if loudness is None:
+            return {"loudness": None, "gain_db": 0.0, "peak_db": peak_db}
+
+        gain_db = AUDIO_LOUDNESS["target_lufs"] - loudness
+        if peak_db is not None:
+            gain_db = min(gain_db, AUDIO_LOUDNESS["max_peak_db"] - peak_db)
+
+        return {
+            "loudness": round(loudness, 2),
+            "gain_db": round(gain_db, 2),
+            "peak_db": round(peak_db, 2) if peak_db is not None else None,
+        }
+
+    # ===========================================
+    # AJUSTE
+    # ===========================================
+
+    def process(self, samples: np.ndarray, target_duration: float = None,
+                tolerance: float = None, allow_tempo: bool = True) -> tuple:
+        """
+        Processa o PCM já decodificado
+
+        Returns:
+            (samples processados, info dict com durações e ritmo)
+        """
+        tolerance = AUDIO_FIT["tolerance"] if tolerance is None else tolerance
+        sr = self.sample_rate
+        original = len(samples) / sr
+
+        levels = self._frame_levels(samples)
+        silent = self._silence_mask(levels)
+
+        keep = self._keep_mask(silent, self.max_pause)
+        fitted = self._apply_keep(samples, keep)
+
+        upper = target_duration * (1 + tolerance) if target_duration else None
+        lower = target_duration * (1 - tolerance) if target_duration else None
+
+        # Ainda longo: encurta as pausas até o mínimo antes de mexer no ritmo
+        if upper and len(fitted) / sr > upper and self.min_pause < self.max_pause:
+            keep = self._keep_mask(silent, self.min_pause)
+            fitted = self._apply_keep(samples, keep)
+
+        duration = len(fitted) / sr
+        tempo = 1.0
+        if allow_tempo and target_duration and duration > 0:
+            if duration > upper:
+                tempo = min(duration / upper, 1.0 + self.max_tempo_change)
+            elif duration < lower:
+                tempo = max(duration / lower, 1.0 - self.max_tempo_change)
+
+        info = {
+            "original_duration": round(original, 3),
+            "trimmed_duration": round(duration, 3),
+            "duration": round(duration / tempo, 3),
+            "tempo": round(tempo, 4),
+            "removed": round(original - duration, 3),
+            "target_duration": target_duration,
+        }
+        return fitted, info
+
+    def fit(self, input_path: str, output_path: str, target_duration: float = None,
+            tolerance: float = None, allow_tempo: bool = True) -> dict:
+        """
+        Decodifica, ajusta e codifica a narração
+
+        Args:
+            input_path: Áudio gerado pelo TTS
+            output_path: MP3 final (44.1 kHz estéreo)
+            target_duration: Duração alvo do formato (None = só corta silêncios)
+            tolerance: Janela aceitável em torno do alvo (0.1 = ±10%)
+            allow_tempo: Permite mudar o ritmo para entrar na janela
+
+        Returns:
+            Dict com path, duration, tempo, etc.
+        """
+        samples = self.decode(input_path)
+        fitted, info = self.process(samples, target_duration, tolerance, allow_tempo)
+
+        # Mede no PCM já decodificado; o ganho vai no mesmo encode do resample
+        info.update(self.loudness_gain(fitted))
+        self.encode(fitted, output_path, tempo=info["tempo"], gain_db=info["gain_db"])
+
+        info["path"] = output_path
+
+        print(f"  ✂️ Áudio: {info['original_duration']:.1f}s → {info['duration']:.1f}s "
+              f"(silêncio -{info['removed']:.1f}s, ritmo {info['tempo']:.2f}x)")
+        if info["loudness"] is not None:
+            print(f"  🔈 Loudness: {info['loudness']:.1f} LUFS → ganho {info['gain_db']:+.1f} dB")
+
+        return info
+
+
+# ===========================================
+# TESTE
+# ===========================================
+
+if __name__ == "__main__":
+    import time
+
+    fitter = AudioFitter()
+    sr = fitter.sample_rate
+
+    # Sinal sintético: 1s silêncio + 3 "frases" de 2s com pausas de 1.5s + 1s silêncio
+    rng = np.random.default_rng(0)
+    speech = lambda s: (0.3 * rng.standard_normal(int(s * sr))).astype(np.float32)
+    silence = lambda s: (0.0005 * rng.standard_normal(int(s * sr))).astype(np.float32)
+    signal = np.concatenate([silence(1), speech(2), silence(1.5), speech(2),
+                             silence(1.5), speech(2), silence(1)])
+
+    start = time.perf_counter()
+    _, info = fitter.process(signal, target_duration=6.0)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    print(f"Original: {info['original_duration']}s")
+    print(f"Sem silêncios: {info['trimmed_duration']}s")
+    print(f"Final (ritmo {info['tempo']}x): {info['duration']}s")
+    print(f"Tempo de processamento: {elapsed:.1f} ms")
+
+    # Loudness: seno de 1 kHz com pico -20 dBFS (RMS -23 dB) mede -23 LUFS em mono
+    t = np.arange(int(5 * sr)) / sr
+    tone = (0.1 * np.sin(2 * np.pi * 1000 * t)).astype(np.float32)
+    start = time.perf_counter()
+    loudness = fitter.measure_loudness(tone, channels=1)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"Loudness seno 1 kHz (mono): {loudness:.2f} LUFS em {elapsed:.1f} ms")
+    print(f"Ganho para o alvo: {fitter.loudness_gain(tone)}")
@@ -0,0 +1,181 @@
+"""
+Aquecimento do cache de mídias com o bot ocioso
+
+Quase todo job busca as mesmas poucas centenas de termos (prefixo do estilo
+× ação/emoção: "stick figure thinking", "stickman happy"...). Sem job em
+andamento, uma tarefa do próprio processo do bot renova essas buscas no
+SearchCache e deixa as primeiras mídias de cada termo já baixadas, validadas
+e registradas na biblioteca local: a primeira cena de um job novo sai da
+biblioteca, sem ir à rede.
+
+Buscas e downloads gastam de dois baldes por hora (a cota da API do Tenor é
+a mesma dos jobs). Um job que começa pausa o aquecimento antes da próxima
+ida à rede.
+"""
+import asyncio
+import os
+import time
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from config.settings import CACHE_WARMER
+from src.utils.rate_limiter import TokenBucket
+from src.utils.media_acquisition import MediaAcquisition, STICKER_STYLES
+
+PRIMARY_PREFIXES = ("stick figure", "stickman")     # Os do roteiro padrão (text_generator)
+IDLE_POLL_SECONDS = 5
+
+
+def common_search_terms(style_prefixes: dict, actions: list, emotion_terms: dict,
+                        max_terms: int = None) -> list:
+    """
+    Termos mais prováveis nos roteiros, os mais comuns primeiro
+
+    Ordem: prefixos do roteiro padrão × ações, × termos das emoções,
+    depois os prefixos dos outros estilos
+
+    Args:
+        style_prefixes: Estilo → prefixo (StickerDownloader.style_prefixes)
+        actions: SEARCH_ACTIONS
+        emotion_terms: EMOTION_SEARCH_TERMS
+
+    Returns:
+        [(termo, stickers)] — stickers como na busca da cena desse estilo
+    """
+    sticker_prefixes = set(PRIMARY_PREFIXES)
+    prefixes = list(PRIMARY_PREFIXES)
+    for style, prefix in style_prefixes.items():
+        if not prefix:
+            continue
+        if style in STICKER_STYLES:
+            sticker_prefixes.add(prefix)
+        if prefix not in prefixes:
+            prefixes.append(prefix)
+
+    emotion_words = []
+    for words in emotion_terms.values():
+        for word in words:
+            if word not in actions and word not in emotion_words:
+                emotion_words.append(word)
+
+    tiers = [
+        (PRIMARY_PREFIXES, actions),
+        (PRIMARY_PREFIXES, emotion_words),
+        (prefixes[len(PRIMARY_PREFIXES):], list(actions) + emotion_words),
+    ]
+    terms = []
+    for tier_prefixes, words in tiers:
+        for word in words:
+            for prefix in tier_prefixes:
+                terms.append((f"{prefix} {word}", prefix in sticker_prefixes))
+    return terms[:max_terms] if max_terms else terms
+
+
+class CacheWarmer:
+    """Tarefa de fundo que aquece buscas e mídias comuns dentro de uma cota"""
+
+    def __init__(self, downloader, terms: list, is_idle, output_dir: str,
+                 target_size: tuple = (1080, 1920), config: dict = None):
+        """
+        Args:
+            downloader: StickerDownloader (chaves, cache de buscas e biblioteca)
+            terms: [(termo, stickers)] na ordem de prioridade (common_search_terms)
+            is_idle: Função sem argumentos → True se não há job em andamento
+            output_dir: Pasta dos downloads temporários (o arquivo final fica na biblioteca)
+            target_size: Resolução usada na escolha da rendição do Tenor
+        """
+        self.config = dict(CACHE_WARMER, **(config or {}))
+        self.downloader = downloader
+        self.terms = terms[:self.config["max_terms"]]
+        self.is_idle = is_idle
+        self.output_dir = output_dir
+        self.target_size = target_size
+
+        self.search_bucket = TokenBucket(self.config["searches_per_hour"] / 60)
+        self.download_bucket = TokenBucket(self.config["downloads_per_hour"] / 60)
+        self.stats = {"passes": 0, "terms": 0, "searches": 0, "downloads": 0, "stocked": 0,
+                      "failed": 0}
+        self._idle_since = None
+        self._task = None
+
+    def start(self):
+        """Agenda o aquecimento no event loop atual (uma vez por processo)"""
+        if self.config["searches_per_hour"] <= 0:
+            print("🔥 Aquecimento do cache: cota de buscas 0, desligado")
+            return None
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+        return self._task
+
+    async def run(self):
+        print(f"🔥 Aquecimento do cache: {len(self.terms)} termos "
+              f"(ocioso há {self.config['idle_seconds']}s, "
+              f"{self.config['searches_per_hour']} buscas/h, "
+              f"{self.config['downloads_per_hour']} downloads/h)")
+        while True:
+            await self.warm_pass()
+            self.stats["passes"] += 1
+            print(f"🔥 Aquecimento: rodada {self.stats['passes']} concluída "
+                  f"({self.stats['stocked']} mídias novas, {self.stats['searches']} buscas)")
+            await asyncio.sleep(self.config["pass_interval_hours"] * 3600)
+
+    async def warm_pass(self):
+        """Uma rodada por todos os termos (sessão nova: hashes/IDs não acumulam entre rodadas)"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        session = self.downloader.start_session("aquecimento", self.output_dir,
+                                                target_size=self.target_size)
+        engine = MediaAcquisition(self.downloader, session, concurrency=1)
+        # Cota de downloads 0: só renova as buscas
+        count = self.config["results_per_term"] if self.config["downloads_per_hour"] > 0 else 0
+        self.stats["terms"] = 0
+
+        for term, stickers in self.terms:
+            await self._wait_idle()
+            try:
+                stocked = await engine.stock_term(term, stickers, count,
+                                                  self._before_search, self._before_download)
+            except Exception as e:
+                self.stats["failed"] += 1
+                print(f"   ⚠️ Aquecimento '{term}': {e}")
+                continue
+            self.stats["terms"] += 1
+            self.stats["stocked"] += stocked
+
+    # ===========================================
+    # COTA E OCIOSIDADE
+    # ===========================================
+
+    async def _before_search(self):
+        await self._wait_idle()
+        await self._spend(self.search_bucket)
+        self.stats["searches"] += 1
+
+    async def _before_download(self):
+        await self._wait_idle()
+        await self._spend(self.download_bucket)
+        self.stats["downloads"] += 1
+
+    async def _spend(self, bucket: TokenBucket):
+        """Espera saldo no balde (conferindo a ociosidade de novo depois de esperar)"""
+        while True:
+            wait = bucket.wait_time(1, time.monotonic())
+            if wait <= 0:
+                bucket.take(1)
+                return
+            await asyncio.sleep(wait)
+            await self._wait_idle()
+
+    async def _wait_idle(self):
+        """Retorna quando o bot está sem job há pelo menos idle_seconds"""
+        while True:
+            now = time.monotonic()
+            if not self.is_idle():
+                self._idle_since = None
+            else:
+                if self._idle_since is None:
+                    self._idle_since = now
+                if now - self._idle_since >= self.config["idle_seconds"]:
+                    return
+            await asyncio.sleep(IDLE_POLL_SECONDS)
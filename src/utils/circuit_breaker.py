@@ -0,0 +1,111 @@
+"""
+Circuit breaker simples por engine/provider
+
+Estados:
+- closed: tudo normal, requisições passam
+- open: muitas falhas seguidas, requisições bloqueadas até o timeout
+- half_open: timeout expirou, deixa passar uma sonda para testar a recuperação
+"""
+import threading
+import time
+
+
+class CircuitBreaker:
+    """Conta falhas de uma engine e decide se ela pode ser usada"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 3,
+                 recovery_timeout: float = 60.0, half_open_max_calls: int = 1):
+        """
+        Args:
+            name: Nome da engine (só para logs)
+            failure_threshold: Falhas seguidas para abrir o circuito
+            recovery_timeout: Segundos em aberto antes de permitir uma sonda
+            half_open_max_calls: Sondas simultâneas permitidas no estado meio-aberto
+        """
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = max(1, half_open_max_calls)
+
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._lock = threading.Lock()
+
+        # Contadores acumulados
+        self.total_successes = 0
+        self.total_failures = 0
+        self.times_opened = 0
+
+    def _refresh_state(self):
+        """Passa de aberto para meio-aberto quando o timeout expira (chamar com lock)"""
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._half_open_calls = 0
+            print(f"🔌 [{self.name}] circuito meio-aberto, testando recuperação...")
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh_state()
+            return self._state
+
+    def allow_request(self) -> bool:
+        """Retorna True se a engine pode ser usada agora"""
+        with self._lock:
+            self._refresh_state()
+
+            if self._state == self.CLOSED:
+                return True
+
+            if self._state == self.HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return True
+
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.total_successes += 1
+            if self._state != self.CLOSED:
+                print(f"🔌 [{self.name}] recuperado, circuito fechado")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._half_open_calls = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.total_failures += 1
+            self._failures += 1
+
+            # Sonda falhou ou limite atingido: abre (de novo)
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                    print(f"🔌 [{self.name}] circuito aberto por {self.recovery_timeout:.0f}s "
+                          f"({self._failures} falhas seguidas)")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._half_open_calls = 0
+
+    def reset(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._half_open_calls = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refresh_state()
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "successes": self.total_successes,
+                "failures": self.total_failures,
+                "times_opened": self.times_opened,
+            }
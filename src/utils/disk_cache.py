@@ -0,0 +1,255 @@
+"""
+Cache persistente em disco com camada LRU em memória
+
+Cada entrada é um arquivo JSON (nome = sha1 da chave) dentro da pasta do cache.
+- TTL: entradas mais velhas que isso são ignoradas e removidas
+- LRU: leituras atualizam o mtime do arquivo; a evicção remove os mais antigos
+  quando passa do limite de entradas ou de bytes (contagem mantida em memória;
+  a pasta só é varrida quando um limite estoura ou a cada SCAN_EVERY escritas)
+- Memória: as entradas mais usadas ficam num OrderedDict (hit em microssegundos)
+"""
+from collections import OrderedDict
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from config.settings import CACHE_DIR
+
+SCAN_EVERY = 200        # Escritas entre varreduras completas (expirados, outros processos)
+EVICT_TO = 0.9          # Evicção desce até 90% do limite: o cache cheio não varre a cada escrita
+
+
+class DiskCache:
+    """Cache chave → valor (JSON) persistido em disco"""
+
+    def __init__(self, name: str, cache_dir: str = None, ttl: float = None,
+                 max_entries: int = None, max_bytes: int = None, memory_entries: int = 128):
+        """
+        Args:
+            name: Nome do cache (pasta dentro de CACHE_DIR)
+            cache_dir: Pasta alternativa
+            ttl: Validade das entradas em segundos (None = não expira)
+            max_entries: Máximo de entradas em disco (None = sem limite)
+            max_bytes: Tamanho máximo em disco (None = sem limite)
+            memory_entries: Entradas mantidas também em memória
+        """
+        self.name = name
+        self.cache_dir = Path(cache_dir or CACHE_DIR / name)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.memory_entries = memory_entries
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Totais em disco sem varrer a pasta a cada escrita (None = ainda não varrida)
+        self._entries = None
+        self._bytes = 0
+        self._writes = 0
+
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # ===========================================
+    # LEITURA
+    # ===========================================
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.json"
+
+    def _remember(self, key: str, entry: dict):
+        """Guarda na LRU em memória (chamar com lock)"""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def get_entry(self, key: str) -> dict:
+        """
+        Entrada crua, sem checar TTL
+
+        Returns:
+            Dict com value e created (timestamp), ou None
+        """
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return entry
+
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # Colisão de hash ou arquivo de outra versão
+        if entry.get("key") != key:
+            return None
+
+        try:
+            os.utime(path)  # LRU: marca como usado
+        except OSError:
+            pass
+
+        with self._lock:
+            self._remember(key, entry)
+        return entry
+
+    def get(self, key: str, default=None, max_age: float = None):
+        """
+        Valor da chave, se existir e estiver dentro do TTL
+
+        Args:
+            max_age: Substitui o TTL do cache nesta leitura
+        """
+        entry = self.get_entry(key)
+        limit = self.ttl if max_age is None else max_age
+
+        if entry is None:
+            self.misses += 1
+            return default
+
+        if limit is not None and time.time() - entry["created"] > limit:
+            self.misses += 1
+            self.delete(key)
+            return default
+
+        self.hits += 1
+        return entry["value"]
+
+    # ===========================================
+    # ESCRITA
+    # ===========================================
+
+    def set(self, key: str, value):
+        """Grava a entrada (escrita atômica) e aplica os limites"""
+        entry = {"key": key, "created": time.time(), "value": value}
+        path = self._path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        size = os.path.getsize(tmp_path)
+        old_size = self._size(path)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._remember(key, entry)
+            if self._entries is not None:
+                self._entries += old_size is None
+                self._bytes += size - (old_size or 0)
+            self._writes += 1
+
+        self._evict()
+
+    def delete(self, key: str):
+        path = self._path(key)
+        with self._lock:
+            self._memory.pop(key, None)
+        size = self._size(path)
+        try:
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            if self._entries is not None and size is not None:
+                self._entries -= 1
+                self._bytes -= size
+
+    @staticmethod
+    def _size(path: Path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return None
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._entries = None
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _over_limits(self) -> bool:
+        return ((self.max_entries is not None and self._entries > self.max_entries) or
+                (self.max_bytes is not None and self._bytes > self.max_bytes))
+
+    def _evict(self):
+        """
+        Remove expirados e, se ainda passar dos limites, os menos usados
+
+        Varre a pasta só quando os totais em memória passam de um limite, na
+        primeira escrita e a cada SCAN_EVERY escritas (expirados e arquivos de
+        outros processos que dividem a pasta)
+        """
+        if self.ttl is None and self.max_entries is None and self.max_bytes is None:
+            return
+        with self._lock:
+            if (self._entries is not None and self._writes < SCAN_EVERY
+                    and not self._over_limits()):
+                return
+            self._writes = 0
+
+        files = []
+        for path in self.cache_dir.glob("*.json"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+
+        now = time.time()
+        files.sort()  # mais antigo (menos usado) primeiro
+        total_bytes = sum(size for _, size, _ in files)
+        remaining = len(files)
+
+        for mtime, size, path in files:
+            # mtime >= created, então mtime velho demais garante entrada expirada
+            expired = self.ttl is not None and now - mtime > self.ttl
+            over_entries = (self.max_entries is not None and
+                            remaining > int(self.max_entries * EVICT_TO))
+            over_bytes = self.max_bytes is not None and total_bytes > self.max_bytes * EVICT_TO
+            if not (expired or over_entries or over_bytes):
+                continue
+
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            remaining -= 1
+            total_bytes -= size
+            self.evictions += 1
+
+        # A LRU em memória pode apontar para arquivos removidos: mantém só o que existe
+        with self._lock:
+            self._entries, self._bytes = remaining, total_bytes
+            for key in [k for k in self._memory if not self._path(k).exists()]:
+                del self._memory[key]
+
+    def stats(self) -> dict:
+        files = list(self.cache_dir.glob("*.json"))
+        return {
+            "entries": len(files),
+            "bytes": sum(p.stat().st_size for p in files if p.exists()),
+            "memory_entries": len(self._memory),
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,202 @@
+"""
+Downloads em streaming com limites e aborto antecipado
+
+`requests.get(url, timeout=60).content` carregava o corpo inteiro na memória
+antes de qualquer verificação: arquivo errado ou enorme gastava banda e RAM,
+e servidor lento segurava o worker por até 60s. Aqui o corpo vem em pedaços e
+o download para assim que algo não bate:
+- status diferente de 200 ou Content-Type de texto (página de erro, JSON)
+- Content-Length (ou bytes recebidos) acima do máximo
+- assinatura (magic bytes) do primeiro pedaço fora dos formatos esperados
+- vazão abaixo do mínimo depois de alguns segundos de corpo
+- corpo parado além do read_timeout ou menor que o Content-Length
+
+Versões síncrona (requests) e assíncrona (httpx.AsyncClient do motor de mídias).
+"""
+import os
+import time
+from pathlib import Path
+import sys
+
+import requests
+import urllib3
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from config.settings import DOWNLOAD_LIMITS
+from src.utils.media_validator import sniff_format
+
+MB = 1024 * 1024
+SNIFF_BYTES = 16            # Suficiente para todas as assinaturas de sniff_format
+
+# raw.read1 levanta os erros do urllib3 direto (servidor parado no meio do
+# corpo: ReadTimeoutError; conexão fechada antes do fim: ProtocolError),
+# sem passar pelas exceções do requests
+NETWORK_ERRORS = (requests.RequestException, urllib3.exceptions.HTTPError, OSError)
+
+
+class DownloadError(Exception):
+    """Download abortado (motivo curto na mensagem, para o log)"""
+
+
+class _Guard:
+    """Verificações feitas a cada pedaço (mesmas para requests e httpx)"""
+
+    def __init__(self, url: str, expected=None, max_bytes: int = None, min_rate: float = None,
+                 grace: float = None):
+        self.url = url
+        self.expected = tuple(expected) if expected else None
+        self.max_bytes = max_bytes or DOWNLOAD_LIMITS["media_max_mb"] * MB
+        self.min_rate = (min_rate if min_rate is not None
+                         else DOWNLOAD_LIMITS["min_kbps"] * 1024)
+        self.grace = grace if grace is not None else DOWNLOAD_LIMITS["grace_seconds"]
+        self.received = 0
+        self.head = b""
+        self.started = None
+        self.length = None          # Content-Length sem compressão (confere corpo truncado)
+
+    def check_response(self, status: int, headers, body_preview=None):
+        if status != 200:
+            raise DownloadError(f"HTTP {status}")
+
+        content_type = headers.get("content-type", "").lower()
+        if content_type.startswith("text/") or "json" in content_type:
+            detail = f": {body_preview()[:200]}" if body_preview else ""
+            raise DownloadError(f"resposta não é mídia ({content_type}){detail}")
+
+        length = headers.get("content-length")
+        if length and length.isdigit():
+            if int(length) > self.max_bytes:
+                raise DownloadError(f"arquivo grande demais ({int(length) / MB:.1f}MB)")
+            if headers.get("content-encoding", "identity").lower() == "identity":
+                self.length = int(length)
+
+    def feed(self, chunk: bytes):
+        now = time.monotonic()
+        if self.started is None:
+            self.started = now      # Vazão conta do primeiro byte (geração lenta não pesa)
+        self.received += len(chunk)
+
+        if self.received > self.max_bytes:
+            raise DownloadError(f"passou de {self.max_bytes / MB:.0f}MB")
+
+        if self.expected and len(self.head) < SNIFF_BYTES:
+            self.head += chunk[:SNIFF_BYTES - len(self.head)]
+            if len(self.head) >= SNIFF_BYTES:
+                self._check_signature()
+
+        elapsed = now - self.started
+        if self.min_rate and elapsed > self.grace and self.received / elapsed < self.min_rate:
+            raise DownloadError(f"lento demais ({self.received / elapsed / 1024:.0f}KB/s)")
+
+    def finish(self):
+        if self.length is not None and self.received < self.length:
+            raise DownloadError(f"corpo incompleto ({self.received}/{self.length} bytes)")
+        if self.expected and len(self.head) < SNIFF_BYTES:
+            self._check_signature()
+
+    def _check_signature(self):
+        fmt = sniff_format(self.head)
+        if fmt not in self.expected:
+            raise DownloadError(f"conteúdo {fmt or 'desconhecido'}, esperado {'/'.join(self.expected)}")
+
+
+def _timeouts(read_timeout: float = None):
+    return (DOWNLOAD_LIMITS["connect_timeout"], read_timeout or DOWNLOAD_LIMITS["read_timeout"])
+
+
+def _chunks(response):
+    """
+    Pedaços conforme chegam da rede, para a vazão ser medida de verdade
+    (iter_content espera encher o pedaço inteiro antes de devolver)
+    """
+    size = DOWNLOAD_LIMITS["chunk_kb"] * 1024
+    raw = response.raw
+    if not hasattr(raw, "read1"):       # urllib3 1.x
+        yield from response.iter_content(16 * 1024)
+        return
+    while True:
+        chunk = raw.read1(size, decode_content=True)
+        if not chunk:
+            break
+        yield chunk
+
+
+def _preview(response):
+    """Começo do corpo de uma resposta de erro (sem ler o resto)"""
+    return lambda: next(response.iter_content(200), b"").decode("utf-8", "replace")
+
+
+def download_bytes(url: str, expected=None, max_bytes: int = None, min_rate: float = None,
+                   read_timeout: float = None, headers: dict = None, session=None) -> bytes:
+    """
+    Baixa para a memória (com os limites acima)
+
+    Args:
+        expected: Formatos aceitos no primeiro pedaço ("gif", "mp4", "jpeg"...)
+        read_timeout: Silêncio máximo entre pedaços (geração de imagem: maior)
+
+    Raises:
+        DownloadError
+    """
+    guard = _Guard(url, expected, max_bytes, min_rate)
+    http = session or requests
+    try:
+        with http.get(url, stream=True, timeout=_timeouts(read_timeout), headers=headers) as response:
+            guard.check_response(response.status_code, response.headers, _preview(response))
+            buffer = bytearray()
+            for chunk in _chunks(response):
+                guard.feed(chunk)
+                buffer.extend(chunk)
+            guard.finish()
+            return bytes(buffer)
+    except NETWORK_ERRORS as e:
+        raise DownloadError(f"{type(e).__name__}: {e}") from e
+
+
+def download_file(url: str, path: str, expected=None, max_bytes: int = None,
+                  min_rate: float = None, read_timeout: float = None, headers: dict = None,
+                  session=None) -> int:
+    """
+    Baixa direto para o disco (arquivo .part renomeado no fim; removido se abortar)
+
+    Returns:
+        Bytes gravados
+    """
+    guard = _Guard(url, expected, max_bytes, min_rate)
+    http = session or requests
+    partial = f"{path}.part"
+    try:
+        with http.get(url, stream=True, timeout=_timeouts(read_timeout), headers=headers) as response:
+            guard.check_response(response.status_code, response.headers, _preview(response))
+            with open(partial, "wb") as f:
+                for chunk in _chunks(response):
+                    guard.feed(chunk)
+                    f.write(chunk)
+            guard.finish()
+        os.replace(partial, path)
+        return guard.received
+    except NETWORK_ERRORS as e:
+        raise DownloadError(f"{type(e).__name__}: {e}") from e
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+async def adownload_bytes(client, url: str, expected=None, max_bytes: int = None,
+                          min_rate: float = None) -> bytes:
+    """download_bytes com um httpx.AsyncClient (mesmos limites)"""
+    import httpx
+
+    guard = _Guard(url, expected, max_bytes, min_rate)
+    try:
+        async with client.stream("GET", url) as response:
+            guard.check_response(response.status_code, response.headers)
+            buffer = bytearray()
+            async for chunk in response.aiter_bytes():     # Do tamanho que chegar
+                guard.feed(chunk)
+                buffer.extend(chunk)
+            guard.finish()
+            return bytes(buffer)
+    except httpx.HTTPError as e:
+        raise DownloadError(f"{type(e).__name__}: {e}") from e
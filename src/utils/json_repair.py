@@ -0,0 +1,227 @@
+"""
+Reparo tolerante de JSON gerado por LLM
+
+Corrige os defeitos que aparecem na prática nas respostas de roteiro:
+- cercas de markdown (```json ... ```) e texto antes/depois do objeto
+- vírgulas sobrando antes de } ou ] e vírgulas faltando entre itens
+- aspas não escapadas e quebras de linha cruas dentro de strings
+- True/False/None do Python
+- resposta cortada no max_tokens: volta até o último valor completo e fecha
+  os objetos/arrays abertos (salva as cenas que já estavam inteiras); cortada
+  antes do primeiro valor completo, fecha a string aberta no ponto do corte
+"""
+import json
+import re
+
+_FENCE = re.compile(r"```[a-zA-Z]*")
+_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_DELIMITERS = set(",}]: \t\r\n")
+_NEXT_KEY = re.compile(r'"(?:[^"\\\n]|\\.)*"\s*:')
+
+
+def _next_significant(text: str, start: int) -> int:
+    """Índice do próximo caractere que não é espaço (ou len)"""
+    i = start
+    while i < len(text) and text[i] in " \t\r\n":
+        i += 1
+    return i
+
+
+def _closes_string(text: str, i: int, is_key: bool, in_array: bool = False) -> bool:
+    """Decide se a aspa em text[i] fecha a string ou é uma aspa interna sem escape"""
+    j = _next_significant(text, i + 1)
+    if j >= len(text):
+        return True
+
+    following = text[j]
+    if is_key:
+        return following == ":"
+    if following in "}]":
+        return True
+    if following == ",":
+        # Depois da vírgula precisa vir um valor/chave de verdade
+        k = _next_significant(text, j + 1)
+        return k >= len(text) or text[k] in '"{[]}-0123456789tfnTFN'
+    if following == '"':
+        # Próximo item/chave sem vírgula antes (["x" "y"] ou "a": "x" "b": ...)
+        return in_array or bool(_NEXT_KEY.match(text, j))
+    return False
+
+
+def repair_json(text: str):
+    """
+    Tenta transformar a resposta em JSON válido
+
+    Returns:
+        (objeto, lista de reparos aplicados); levanta ValueError se não der
+    """
+    repairs = []
+
+    cleaned = _FENCE.sub("", text)
+    if cleaned != text:
+        repairs.append("fences")
+
+    start = cleaned.find("{")
+    if start < 0:
+        raise ValueError("nenhum objeto JSON na resposta")
+    if cleaned[:start].strip():
+        repairs.append("prefix")
+    text = cleaned[start:]
+
+    out = []
+    stack = []              # '{' ou '['
+    in_string = False
+    string_is_key = False
+    last_safe = None        # (tamanho de out, pilha) depois do último valor completo
+    expect_key = False      # Dentro de objeto, próxima string é chave
+    pending_key = None      # Início (em out) da chave que ainda não tem valor
+    i = 0
+    n = len(text)
+
+    def mark_safe():
+        nonlocal last_safe
+        last_safe = (len(out), list(stack))
+
+    def last_significant():
+        for piece in reversed(out):
+            stripped = piece.rstrip()
+            if stripped:
+                return stripped[-1]
+        return ""
+
+    while i < n:
+        char = text[i]
+
+        if in_string:
+            if char == "\\" and i + 1 < n:
+                out.append(text[i:i + 2])
+                i += 2
+                continue
+            if char == '"':
+                if _closes_string(text, i, string_is_key, in_array=bool(stack) and stack[-1] == "["):
+                    in_string = False
+                    out.append(char)
+                    if not string_is_key:
+                        mark_safe()
+                else:
+                    out.append('\\"')
+                    if "quotes" not in repairs:
+                        repairs.append("quotes")
+            elif char in "\n\r\t":
+                out.append({"\n": "\\n", "\r": "\\r", "\t": "\\t"}[char])
+                if "newlines" not in repairs:
+                    repairs.append("newlines")
+            else:
+                out.append(char)
+            i += 1
+            continue
+
+        if char in " \t\r\n":
+            out.append(char)
+            i += 1
+            continue
+
+        # Vírgula faltando entre dois valores
+        previous = last_significant()
+        starts_value = char in '"{[' or char in "-0123456789" or text.startswith(("true", "false", "null", "True", "False", "None"), i)
+        if starts_value and stack and (previous in '"}]' or previous.isalnum()):
+            out.append(",")
+            if "commas" not in repairs:
+                repairs.append("commas")
+            if stack[-1] == "{":
+                expect_key = True
+
+        if char == '"':
+            in_string = True
+            string_is_key = bool(stack) and stack[-1] == "{" and expect_key
+            if string_is_key:
+                expect_key = False
+                pending_key = len(out)
+            else:
+                pending_key = None
+            out.append(char)
+        elif char in "{[":
+            pending_key = None
+            stack.append(char)
+            expect_key = char == "{"
+            out.append(char)
+        elif char in "}]":
+            # Vírgula sobrando antes de fechar
+            while out and out[-1].strip() in ("", ","):
+                if out[-1].strip() == ",":
+                    out.pop()
+                    if "trailing_commas" not in repairs:
+                        repairs.append("trailing_commas")
+                    break
+                out.pop()
+            if stack:
+                stack.pop()
+            out.append("}" if char == "}" else "]")
+            expect_key = False
+            mark_safe()
+        elif char == ",":
+            out.append(char)
+            expect_key = bool(stack) and stack[-1] == "{"
+        elif char == ":":
+            out.append(char)
+        else:
+            # Número ou literal
+            j = i
+            while j < n and text[j] not in _DELIMITERS:
+                j += 1
+            token = text[i:j]
+            pending_key = None
+            if token in _LITERALS:
+                token = _LITERALS[token]
+                if "literals" not in repairs:
+                    repairs.append("literals")
+            out.append(token)
+            i = j
+            if j < n:
+                mark_safe()
+            continue
+
+        i += 1
+
+        if not stack and out:
+            break  # Objeto raiz fechou: ignora texto depois
+
+    if (stack or in_string) and last_safe is not None:
+        # Cortado: volta ao último valor completo e fecha o que ficou aberto
+        size, open_stack = last_safe
+        out = out[:size]
+        while out and out[-1].strip() in ("", ","):
+            out.pop()
+        out.extend("}" if c == "{" else "]" for c in reversed(open_stack))
+        repairs.append("truncated")
+    elif stack or in_string:
+        # Cortado antes do primeiro valor completo ({"roteiro": "texto...):
+        # fica com o valor parcial, sem a chave que não chegou a ter valor
+        if pending_key is not None:
+            del out[pending_key:]
+        elif in_string:
+            if out[-1] == "\\":
+                out.pop()
+            out.append('"')
+        while out and out[-1].strip() in ("", ","):
+            out.pop()
+        out.extend("}" if c == "{" else "]" for c in reversed(stack))
+        repairs.append("truncated")
+
+    result = json.loads("".join(out))
+    return result, repairs
+
+
+if __name__ == "__main__":
+    samples = {
+        "vírgulas": '```json\n{"titulo": "A", "cenas": [{"a": 1,}, {"a": 2},],}\n```',
+        "aspas": '{"roteiro": "Ele disse "oi", e foi embora", "cta": "x"}',
+        "cortado": '{"titulo": "T", "cenas": [{"descricao": "um", "busca_tenor": "b1"}, {"descricao": "do',
+        "linhas": '{"roteiro": "linha 1\nlinha 2" "cta": "fim"}',
+        "cortado na string": '{"roteiro": "texto longo...',
+        "cortado no número": '{"n": 12',
+        "cortado na chave": '{"a":',
+    }
+    for name, sample in samples.items():
+        obj, repairs = repair_json(sample)
+        print(f"{name}: {repairs} → {obj}")
@@ -0,0 +1,122 @@
+"""
+Parser incremental das cenas de um roteiro JSON em streaming
+
+Recebe o texto do LLM em pedaços e devolve cada item de "cenas" assim que ele
+fecha, sem esperar o resto da resposta. Só entende o suficiente de JSON para
+achar os limites dos itens (strings, escapes e chaves aninhadas); cada item
+fechado é validado com json.loads.
+"""
+import json
+import re
+
+
+class SceneStreamParser:
+    """Extrai os itens de um array JSON (padrão: "cenas") conforme chegam"""
+
+    def __init__(self, key: str = "cenas"):
+        self._key_pattern = re.compile(r'(?<!\\)"' + re.escape(key) + r'"\s*:\s*\[')
+        self._buffer = ""
+        self._pos = 0            # Próximo caractere a analisar
+        self._state = "seek"     # seek → array → done
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._item_start = None
+        self.count = 0
+
+    @property
+    def done(self) -> bool:
+        return self._state == "done"
+
+    def feed(self, chunk: str) -> list:
+        """
+        Adiciona um pedaço do texto
+
+        Returns:
+            Itens (dict ou str) que fecharam neste pedaço, em ordem
+        """
+        self._buffer += chunk
+        items = []
+
+        if self._state == "seek":
+            match = self._key_pattern.search(self._buffer, self._pos)
+            if not match:
+                # A chave pode estar cortada entre pedaços: volta um pouco
+                self._pos = max(self._pos, len(self._buffer) - 64)
+                return items
+            self._state = "array"
+            self._pos = match.end()
+
+        if self._state == "array":
+            items = self._scan()
+
+        return items
+
+    def _scan(self) -> list:
+        items = []
+        buffer = self._buffer
+        i = self._pos
+
+        while i < len(buffer):
+            char = buffer[i]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    # String solta no array (cena como texto)
+                    if self._depth == 0 and self._item_start is not None:
+                        self._emit(buffer[self._item_start:i + 1], items)
+                i += 1
+                continue
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 0:
+                    self._item_start = i
+            elif char in "{[":
+                if self._depth == 0:
+                    self._item_start = i
+                self._depth += 1
+            elif char in "}]":
+                if self._depth == 0 and char == "]":
+                    self._state = "done"
+                    i += 1
+                    break
+                self._depth -= 1
+                if self._depth == 0 and self._item_start is not None:
+                    self._emit(buffer[self._item_start:i + 1], items)
+            i += 1
+
+        self._pos = i
+        return items
+
+    def _emit(self, text: str, items: list):
+        self._item_start = None
+        try:
+            item = json.loads(text)
+        except ValueError:
+            return
+        self.count += 1
+        items.append(item)
+
+
+if __name__ == "__main__":
+    response = '''```json
+{"titulo": "Teste \\"cenas\\": [", "roteiro": "texto com { chaves } e [colchetes]",
+ "cenas": [
+    {"descricao": "Cena 1 {x}", "busca_tenor": "stick figure thinking", "emocao": "curious"},
+    {"descricao": "Cena \\"2\\"", "busca_tenor": "stickman happy", "emocao": "happy"},
+    "cena 3 como texto"
+ ],
+ "hashtags": ["#a"]}
+```'''
+
+    parser = SceneStreamParser()
+    for start in range(0, len(response), 7):
+        for scene in parser.feed(response[start:start + 7]):
+            print(f"Cena {parser.count}: {scene}")
+    print(f"Concluído: {parser.done}")
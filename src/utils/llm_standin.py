@@ -0,0 +1,392 @@
+"""
+Servidor local que imita as APIs do Groq e do Gemini
+
+Serve para medir o pipeline sem gastar cota: responde no formato do Groq
+(OpenAI-compatível, /openai/v1/chat/completions) e do Gemini
+(/v1beta/models/<modelo>:generateContent e :streamGenerateContent), com ou
+sem streaming. As respostas vêm de fixtures gravadas, uma por hash do prompt.
+
+Modos:
+- replay: só responde com as fixtures (prompt desconhecido → 404)
+- record: repassa para a API real, grava a fixture e responde
+
+Latência (fixa + por token, simulando a geração) e erros injetados (429 com
+retry-after ou 500) são configuráveis. Para usar no TextGenerator:
+
+    python -m src.utils.llm_standin --mode replay --latency 0.8 --error-rate 0.05
+    GROQ_BASE_URL=http://127.0.0.1:8808 GEMINI_BASE_URL=http://127.0.0.1:8808
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+import sys
+
+import requests
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from config.settings import LLM_STANDIN
+
+UPSTREAMS = {
+    "groq": "https://api.groq.com",
+    "gemini": "https://generativelanguage.googleapis.com",
+}
+
+_GEMINI_PATH = re.compile(r"^/v1beta/models/([^/:]+):(generateContent|streamGenerateContent)$")
+_GROQ_PATHS = ("/openai/v1/chat/completions", "/v1/chat/completions")
+
+
+def prompt_hash(prompt: str) -> str:
+    """Chave da fixture (mesmo prompt → mesma resposta, em qualquer provider)"""
+    return hashlib.sha1(prompt.encode("utf-8")).hexdigest()
+
+
+class FixtureStore:
+    """Fixtures em JSON: {hash}.json com prompt, provider, modelo, texto e uso"""
+
+    def __init__(self, fixtures_dir):
+        self.dir = Path(fixtures_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def get(self, prompt: str) -> dict:
+        path = self.dir / f"{prompt_hash(prompt)}.json"
+        if not path.exists():
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def put(self, prompt: str, provider: str, model: str, text: str, usage: dict):
+        path = self.dir / f"{prompt_hash(prompt)}.json"
+        fixture = {
+            "prompt": prompt,
+            "provider": provider,
+            "model": model,
+            "text": text,
+            "usage": usage,
+            "recorded": time.time(),
+        }
+        with self._lock:
+            tmp = path.with_suffix(".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(fixture, f, ensure_ascii=False, indent=2)
+            tmp.replace(path)
+
+    def __len__(self):
+        return len(list(self.dir.glob("*.json")))
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    """Roteia os pedidos pelo formato de URL de cada provider"""
+
+    server_version = "LLMStandin/1.0"
+    protocol_version = "HTTP/1.1"
+
+    # Preenchidos por make_server
+    store = None
+    options = None
+    counters = None
+
+    def log_message(self, format, *args):
+        pass  # Sem uma linha por requisição (atrapalha o benchmark)
+
+    # ===========================================
+    # ENTRADA
+    # ===========================================
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._send_json(400, {"error": {"message": "JSON inválido"}})
+
+        if url.path in _GROQ_PATHS:
+            provider = "groq"
+            model = body.get("model", "")
+            prompt = "\n".join(m.get("content", "") for m in body.get("messages", []))
+            streaming = bool(body.get("stream"))
+        else:
+            match = _GEMINI_PATH.match(url.path)
+            if not match:
+                return self._send_json(404, {"error": {"message": f"rota desconhecida: {url.path}"}})
+            provider = "gemini"
+            model = match.group(1)
+            prompt = "\n".join(
+                part.get("text", "")
+                for content in body.get("contents", [])
+                for part in content.get("parts", [])
+            )
+            streaming = match.group(2) == "streamGenerateContent"
+
+        self._count("requests")
+        if self._inject_error(provider):
+            return
+
+        fixture = self.store.get(prompt)
+        if fixture is None and self.options["mode"] == "record":
+            try:
+                fixture = self._record(provider, model, prompt, body, url)
+            except Exception as e:
+                self._count("upstream_errors")
+                return self._send_json(502, {"error": {"message": f"upstream: {e}"}})
+
+        if fixture is None:
+            self._count("misses")
+            return self._send_json(404, {"error": {
+                "message": f"sem fixture para o prompt {prompt_hash(prompt)[:12]} (use --mode record)"
+            }})
+
+        self._count("hits")
+        text = fixture["text"]
+        usage = fixture.get("usage") or {}
+        if streaming:
+            self._stream(provider, model, text, usage, sse=provider == "groq" or parse_qs(url.query).get("alt") == ["sse"])
+        else:
+            self._sleep_generation(text)
+            self._send_json(200, self._completion(provider, model, text, usage))
+
+    def _count(self, name: str):
+        with self.server.counters_lock:
+            self.counters[name] = self.counters.get(name, 0) + 1
+
+    # ===========================================
+    # LATÊNCIA E ERROS
+    # ===========================================
+
+    def _inject_error(self, provider: str) -> bool:
+        if random.random() >= self.options["error_rate"]:
+            return False
+        self._count("injected_errors")
+        status = self.options["error_status"]
+        headers = {}
+        if status == 429:
+            headers["retry-after"] = str(self.options["retry_after"])
+            headers["x-ratelimit-remaining-requests"] = "0"
+        error = {"code": status, "message": "erro injetado"}
+        if provider == "gemini":
+            error["status"] = "RESOURCE_EXHAUSTED" if status == 429 else "INTERNAL"
+        time.sleep(self.options["latency"])
+        self._send_json(status, {"error": error}, headers)
+        return True
+
+    def _token_delay(self) -> float:
+        rate = self.options["tokens_per_second"]
+        return 1.0 / rate if rate > 0 else 0.0
+
+    def _sleep_generation(self, text: str):
+        """Tempo até a primeira resposta + geração de ~len/4 tokens"""
+        tokens = max(1, len(text) // 4)
+        time.sleep(self.options["latency"] + tokens * self._token_delay())
+
+    # ===========================================
+    # RESPOSTAS
+    # ===========================================
+
+    @staticmethod
+    def _completion(provider: str, model: str, text: str, usage: dict) -> dict:
+        prompt_tokens = usage.get("prompt_tokens", 0)
+        completion_tokens = usage.get("completion_tokens", max(1, len(text) // 4))
+
+        if provider == "gemini":
+            return {
+                "candidates": [{
+                    "content": {"parts": [{"text": text}], "role": "model"},
+                    "finishReason": "STOP",
+                    "index": 0,
+                }],
+                "usageMetadata": {
+                    "promptTokenCount": prompt_tokens,
+                    "candidatesTokenCount": completion_tokens,
+                    "totalTokenCount": prompt_tokens + completion_tokens,
+                },
+                "modelVersion": model,
+            }
+
+        return {
+            "id": f"chatcmpl-standin-{int(time.time() * 1000)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    def _stream(self, provider: str, model: str, text: str, usage: dict, sse: bool):
+        """Manda o texto em pedaços de ~16 caracteres, no ritmo de tokens por segundo"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream" if sse else "application/json")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        time.sleep(self.options["latency"])
+        pieces = [text[i:i + 16] for i in range(0, len(text), 16)] or [""]
+        delay = 4 * self._token_delay()     # 16 caracteres ≈ 4 tokens
+        created = int(time.time())
+        chunks = []
+
+        for index, piece in enumerate(pieces):
+            last = index == len(pieces) - 1
+            if provider == "gemini":
+                chunk = {"candidates": [{"content": {"parts": [{"text": piece}], "role": "model"}, "index": 0}]}
+                if last:
+                    chunk["candidates"][0]["finishReason"] = "STOP"
+                    chunk["usageMetadata"] = self._completion(provider, model, text, usage)["usageMetadata"]
+            else:
+                chunk = {
+                    "id": f"chatcmpl-standin-{created}",
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": "stop" if last else None}],
+                }
+                if last:
+                    # Groq manda o uso em x_groq no último pedaço
+                    chunk["x_groq"] = {"usage": self._completion(provider, model, text, usage)["usage"]}
+
+            if sse:
+                self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            else:
+                chunks.append(chunk)
+            time.sleep(delay)
+
+        if sse and provider == "groq":
+            self.wfile.write(b"data: [DONE]\n\n")
+        elif not sse:
+            self.wfile.write(json.dumps(chunks, ensure_ascii=False).encode("utf-8"))
+        self.wfile.flush()
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    # ===========================================
+    # GRAVAÇÃO
+    # ===========================================
+
+    def _record(self, provider: str, model: str, prompt: str, body: dict, url) -> dict:
+        """Repassa o pedido (sem streaming) para a API real e grava a resposta"""
+        if provider == "groq":
+            upstream_body = dict(body, stream=False)
+            upstream_body.pop("stream_options", None)
+            response = requests.post(
+                UPSTREAMS["groq"] + "/openai/v1/chat/completions",
+                json=upstream_body,
+                headers={"Authorization": self.headers.get("Authorization", "")},
+                timeout=120,
+            )
+            response.raise_for_status()
+            data = response.json()
+            text = data["choices"][0]["message"]["content"]
+            usage = {
+                "prompt_tokens": data.get("usage", {}).get("prompt_tokens", 0),
+                "completion_tokens": data.get("usage", {}).get("completion_tokens", 0),
+            }
+        else:
+            params = {k: v[0] for k, v in parse_qs(url.query).items() if k == "key"}
+            response = requests.post(
+                f"{UPSTREAMS['gemini']}/v1beta/models/{model}:generateContent",
+                json=body,
+                params=params,
+                headers={"x-goog-api-key": self.headers.get("x-goog-api-key", "")},
+                timeout=120,
+            )
+            response.raise_for_status()
+            data = response.json()
+            text = "".join(
+                part.get("text", "")
+                for part in data["candidates"][0]["content"]["parts"]
+            )
+            meta = data.get("usageMetadata", {})
+            usage = {
+                "prompt_tokens": meta.get("promptTokenCount", 0),
+                "completion_tokens": meta.get("candidatesTokenCount", 0),
+            }
+
+        self.store.put(prompt, provider, model, text, usage)
+        self._count("recorded")
+        print(f"   💾 Fixture gravada ({provider}, {prompt_hash(prompt)[:12]})")
+        return {"text": text, "usage": usage}
+
+
+def make_server(host: str = None, port: int = None, mode: str = "replay",
+                fixtures_dir=None, **options) -> ThreadingHTTPServer:
+    """
+    Cria o servidor (chame serve_forever, ou use numa thread em benchmarks)
+
+    Args:
+        mode: "replay" ou "record"
+        options: latency, tokens_per_second, error_rate, error_status,
+                 retry_after (padrões em LLM_STANDIN)
+    """
+    config = {key: LLM_STANDIN[key] for key in
+              ("latency", "tokens_per_second", "error_rate", "error_status", "retry_after")}
+    config.update({k: v for k, v in options.items() if v is not None})
+    config["mode"] = mode
+
+    handler = type("Handler", (StandinHandler,), {
+        "store": FixtureStore(fixtures_dir or LLM_STANDIN["fixtures_dir"]),
+        "options": config,
+        "counters": {},
+    })
+    server = ThreadingHTTPServer((host or LLM_STANDIN["host"], port or LLM_STANDIN["port"]), handler)
+    server.daemon_threads = True
+    server.counters_lock = threading.Lock()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor local que imita Groq/Gemini")
+    parser.add_argument("--mode", choices=["replay", "record"], default="replay")
+    parser.add_argument("--host", default=None)
+    parser.add_argument("--port", type=int, default=None)
+    parser.add_argument("--fixtures", default=None, help="Pasta das fixtures")
+    parser.add_argument("--latency", type=float, default=None, help="Segundos até a primeira resposta")
+    parser.add_argument("--tokens-per-second", type=float, default=None, help="0 = instantâneo")
+    parser.add_argument("--error-rate", type=float, default=None, help="Fração de pedidos com erro")
+    parser.add_argument("--error-status", type=int, default=None, help="429 ou 500")
+    args = parser.parse_args()
+
+    server = make_server(
+        args.host, args.port, args.mode, args.fixtures,
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+    )
+    host, port = server.server_address[:2]
+    handler = server.RequestHandlerClass
+    print(f"🧪 LLM stand-in ({args.mode}) em http://{host}:{port} — {len(handler.store)} fixtures")
+    print(f"   GROQ_BASE_URL=http://{host}:{port}  GEMINI_BASE_URL=http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"📊 {handler.counters}")
@@ -0,0 +1,784 @@
+"""
+Busca e download das mídias de várias cenas em paralelo (asyncio + httpx)
+
+Mesmo algoritmo por cena do StickerDownloader (até 4 buscas no Tenor com
+termos novos, formatos em ordem de preferência, Pixabay como reserva), mas
+com um cliente HTTP compartilhado (conexões reaproveitadas) e várias cenas
+ao mesmo tempo, limitadas por um semáforo.
+
+Termos de busca e IDs únicos entre cenas continuam garantidos pela sessão
+(MediaSession.claim_search_term / claim_id); o resultado sai na ordem das cenas.
+"""
+import asyncio
+import glob
+import os
+from pathlib import Path
+import sys
+
+import httpx
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from config.settings import PIPELINE_CONFIG, MEDIA_DEDUP, TENOR_RENDITION, DOWNLOAD_LIMITS, MEDIA_HEDGE
+from src.utils.perceptual_hash import hash_image, hash_file, to_hex, from_hex
+from src.utils.media_validator import EXTENSION_FORMATS, media_meta, remember, write_validated
+from src.utils.http_download import MB, DownloadError, adownload_bytes
+from src.utils.search_cache import SearchCache, FRESH, STALE
+
+TENOR_SEARCH_URL = "https://tenor.googleapis.com/v2/search"
+PIXABAY_SEARCH_URL = "https://pixabay.com/api/"
+
+# Formatos do Tenor em ordem de preferência quando não há resolução alvo:
+# (chave em media_formats, extensão)
+TENOR_FORMAT_PRIORITY = [
+    ("mp4", "mp4"),
+    ("gif", "gif"),
+    ("mediumgif", "gif"),
+    ("tinygif", "gif"),
+    ("nanogif", "gif"),
+]
+
+# Todas as rendições baixáveis do Tenor (escolhidas por tamanho em rank_tenor_formats)
+TENOR_FORMAT_EXT = {
+    "mp4": "mp4",
+    "tinymp4": "mp4",
+    "nanomp4": "mp4",
+    "gif": "gif",
+    "mediumgif": "gif",
+    "tinygif": "gif",
+    "nanogif": "gif",
+}
+TENOR_MEDIA_FILTER = ",".join(list(TENOR_FORMAT_EXT) + ["nanogifpreview"])
+
+STICKER_STYLES = ("tenor_sticker", "stickman", "stickman_cute")
+TENOR_SEARCH_LIMIT = 25     # Mesmo limite no job e no aquecimento (faz parte da chave do cache)
+
+# Prévias estáticas do Tenor (poucos KB) usadas no hash perceptual antes do download
+TENOR_PREVIEW_FORMATS = ("nanogifpreview", "tinygifpreview", "gifpreview")
+IMAGE_PREVIEW_FORMATS = ("gif", "png", "jpeg", "webp")
+
+
+def tenor_search_params(api_key: str, query: str, limit: int = 20, stickers: bool = False) -> dict:
+    """Parâmetros da busca no Tenor (stickers ou GIFs gerais)"""
+    params = {"q": query, "key": api_key, "limit": limit}
+    if stickers:
+        params["searchfilter"] = "sticker"
+        params["media_filter"] = TENOR_MEDIA_FILTER
+    else:
+        params["media_filter"] = TENOR_MEDIA_FILTER
+        params["contentfilter"] = "medium"
+    return params
+
+
+def pixabay_search_params(api_key: str, query: str, limit: int = 10,
+                          orientation: str = "vertical") -> dict:
+    return {
+        "key": api_key,
+        "q": query,
+        "per_page": limit,
+        "orientation": orientation,
+        "image_type": "illustration",
+        "safesearch": "true",
+    }
+
+
+def rank_tenor_formats(media_formats: dict, target: tuple = None,
+                       max_upscale: float = None) -> list:
+    """
+    Rendições do Tenor na ordem de tentativa para um tamanho na tela
+
+    Usa `dims` e `size` de cada entrada: primeiro as que cobrem o alvo
+    (encaixe "contain", como no VideoGenerator, com até max_upscale de
+    ampliação) — todas cobrem igual, então MP4 antes de GIF e, dentro de
+    cada um, a menor (bytes, depois dimensões); depois as que não cobrem,
+    da maior para a menor (MP4 antes no empate). Sem alvo (ou desligado):
+    ordem fixa de TENOR_FORMAT_PRIORITY.
+
+    Args:
+        target: (largura, altura) do vídeo
+
+    Returns:
+        Lista de (chave em media_formats, extensão)
+    """
+    if not target or not TENOR_RENDITION["enabled"]:
+        return [(key, ext) for key, ext in TENOR_FORMAT_PRIORITY
+                if media_formats.get(key, {}).get("url")]
+
+    max_upscale = max_upscale or TENOR_RENDITION["max_upscale"]
+    covering, short = [], []
+    for key, ext in TENOR_FORMAT_EXT.items():
+        entry = media_formats.get(key) or {}
+        if not entry.get("url"):
+            continue
+        width, height = (entry.get("dims") or [0, 0])[:2]
+        area = (width or 0) * (height or 0)
+        size = entry.get("size") or float("inf")
+        if area and min(target[0] / width, target[1] / height) <= max_upscale:
+            covering.append(((ext != "mp4", size, area), key, ext))
+        else:
+            short.append(((-area, ext != "mp4", size), key, ext))
+
+    return [(key, ext) for _, key, ext in sorted(covering) + sorted(short)]
+
+
+def tenor_preview_url(result: dict) -> str:
+    media_formats = result.get("media_formats", {})
+    for format_key in TENOR_PREVIEW_FORMATS:
+        url = media_formats.get(format_key, {}).get("url")
+        if url:
+            return url
+    return None
+
+
+def search_cache_key(provider: str, params: dict) -> str:
+    """Chave no SearchCache: termo, filtros e limite (sem a chave da API)"""
+    filters = {k: v for k, v in params.items() if k not in ("key", "q", "limit", "per_page")}
+    return SearchCache.make_key(provider, "search", params["q"], filters,
+                                params.get("limit", params.get("per_page")))
+
+
+class MediaAcquisition:
+    """Motor assíncrono de mídias de uma sessão (um vídeo)"""
+
+    def __init__(self, downloader, session, concurrency: int = None):
+        """
+        Args:
+            downloader: StickerDownloader (chaves, termos de busca e validação)
+            session: MediaSession (termos/IDs já usados e cenas adiantadas)
+            concurrency: Cenas em paralelo (padrão: PIPELINE_CONFIG["media_concurrency"])
+        """
+        self.downloader = downloader
+        self.session = session
+        self.concurrency = max(1, concurrency or PIPELINE_CONFIG["media_concurrency"])
+        self.reused = 0         # Cenas que vieram do prefetch da sessão
+        self.duplicates = 0     # Re-uploads pulados pelo hash perceptual
+        self.bytes_downloaded = 0
+        self.hedged = 0         # Cenas com Pixabay em paralelo ao Tenor
+        self.hedge_wins = 0     # ... em que o Pixabay chegou primeiro
+        self.dedup = MEDIA_DEDUP["enabled"]
+        self._client = None
+
+    async def run(self, scenes: list) -> list:
+        """
+        Mídia de cada cena (reaproveita o prefetch da sessão quando houver)
+
+        Returns:
+            Lista na ordem das cenas: media_info ou None
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async with self._make_client() as client:
+            self._client = client
+
+            async def one(i, scene):
+                # Erro numa cena (disco, biblioteca...) vira cena sem mídia: as outras
+                # seguem e nenhuma fica rodando depois de o cliente ser fechado
+                try:
+                    if self.session.is_prefetched(i):
+                        found, media_info = await asyncio.to_thread(self.session.take, i, scene)
+                        if found:
+                            return media_info, True
+                    async with semaphore:
+                        return await self.acquire_scene(i, scene, len(scenes)), False
+                except Exception as e:
+                    print(f"    [cena {i+1}/{len(scenes)}] ❌ Erro: {type(e).__name__}: {e}")
+                    return None, False
+
+            try:
+                outcomes = await asyncio.gather(*(one(i, scene) for i, scene in enumerate(scenes)))
+            finally:
+                self._client = None
+
+        # Usos da biblioteca ficam em memória durante o job: grava no fim
+        library = getattr(self.downloader, "media_library", None)
+        if library is not None:
+            await asyncio.to_thread(library.flush)
+
+        self.reused = sum(1 for _, reused in outcomes if reused)
+        return [media_info for media_info, _ in outcomes]
+
+    def _make_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=self.concurrency * 2,
+            max_keepalive_connections=self.concurrency * 2,
+        )
+        # Leitura curta: download parado aborta cedo (vazão mínima em http_download)
+        timeout = httpx.Timeout(PIPELINE_CONFIG["media_download_timeout"],
+                                connect=DOWNLOAD_LIMITS["connect_timeout"],
+                                read=DOWNLOAD_LIMITS["read_timeout"])
+        return httpx.AsyncClient(limits=limits, timeout=timeout, follow_redirects=True)
+
+    def fetch_scene(self, i: int, scene, total) -> dict:
+        """Uma cena, de forma síncrona (threads de prefetch): cliente próprio"""
+        async def run():
+            async with self._make_client() as client:
+                self._client = client
+                try:
+                    return await self.acquire_scene(i, scene, total)
+                finally:
+                    self._client = None
+        return asyncio.run(run())
+
+    # ===========================================
+    # UMA CENA
+    # ===========================================
+
+    async def acquire_scene(self, i: int, scene, total: int) -> dict:
+        """Busca e baixa a mídia de UMA cena (termos e IDs únicos via sessão)"""
+        downloader = self.downloader
+        session = self.session
+        topic = session.topic
+        tag = f"    [cena {i+1}/{total}]"
+
+        if isinstance(scene, dict):
+            descricao = scene.get("descricao", f"Cena {i+1}")
+            search_term = scene.get("busca_tenor", None)
+        else:
+            descricao = str(scene)
+            search_term = None
+
+        temp_path = os.path.join(session.output_dir, f"media_{i+1:02d}")
+        library = getattr(downloader, "media_library", None)
+
+        # Biblioteca local primeiro: mídia que esse mesmo termo já trouxe antes
+        if library is not None and search_term:
+            asset = await asyncio.to_thread(library.find_by_term, search_term, self._available)
+            media_info = await self._from_library(asset, temp_path, search_term)
+            if media_info:
+                print(f"{tag} 📚 Biblioteca: {media_info['type'].upper()} - ID: {str(media_info['id'])[:8]}...")
+                return media_info
+
+        progress = {"search": search_term or topic, "few_results": asyncio.Event()}
+        tenor = asyncio.create_task(
+            self.acquire_tenor(i, descricao, search_term, temp_path, tag, progress)
+        )
+        media_info = await self._race(i, tenor, progress, temp_path, tag)
+
+        if not media_info:
+            print(f"{tag} ❌ Nenhuma mídia válida")
+        return media_info
+
+    async def _race(self, i: int, tenor: asyncio.Task, progress: dict, temp_path: str,
+                    tag: str) -> dict:
+        """
+        Tenor com o Pixabay de reserva, em paralelo (hedge)
+
+        O Pixabay começa quando o Tenor passa de tenor_budget_seconds, quando
+        uma tentativa traz menos de min_results disponíveis, ou quando o Tenor
+        termina sem mídia. Vale a primeira mídia válida: a outra busca é
+        cancelada e os arquivos dela apagados. Depois de scene_deadline_seconds
+        a cena desiste (pior caso previsível, em vez de 4 tentativas × timeout).
+        """
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + MEDIA_HEDGE["scene_deadline_seconds"]
+        hedge_at = started + MEDIA_HEDGE["tenor_budget_seconds"]
+        few_results = asyncio.create_task(progress["few_results"].wait())
+        pending = {tenor}
+        pixabay = None
+        winner = None
+
+        try:
+            while pending and winner is None:
+                now = loop.time()
+                if now >= deadline:
+                    print(f"{tag} ⏱️ Prazo da cena ({MEDIA_HEDGE['scene_deadline_seconds']:.0f}s) esgotado")
+                    break
+                can_hedge = pixabay is None and bool(self.downloader.pixabay_key)
+                hedging = can_hedge and MEDIA_HEDGE["enabled"]
+                waiting = pending | ({few_results} if hedging else set())
+                timeout = min(deadline, hedge_at) - now if hedging else deadline - now
+                done, _ = await asyncio.wait(waiting, timeout=max(0.0, timeout),
+                                             return_when=asyncio.FIRST_COMPLETED)
+
+                for task in done & pending:
+                    pending.discard(task)
+                    winner = task.result()
+                    if winner:
+                        break
+                if winner or not can_hedge:
+                    continue
+
+                if tenor.done():
+                    print(f"{tag} 🔄 Fallback: Pixabay...")
+                elif hedging and (few_results.done() or loop.time() >= hedge_at):
+                    reason = ("poucos resultados no Tenor" if few_results.done()
+                              else f"Tenor há {loop.time() - started:.0f}s sem mídia")
+                    print(f"{tag} 🔀 Pixabay em paralelo ({reason})...")
+                else:
+                    continue
+                pixabay = asyncio.create_task(self.acquire_pixabay(i, progress["search"], self.session.topic))
+                pending.add(pixabay)
+        finally:
+            few_results.cancel()
+            for task in pending:
+                task.cancel()
+            # Espera os cancelados terminarem (downloads fechados, gravações concluídas)
+            await asyncio.gather(*pending, return_exceptions=True)
+            # As duas terminaram juntas: a mídia descartada devolve o ID e o hash à sessão
+            for task in pending:
+                if not task.cancelled() and task.exception() is None:
+                    loser = task.result()
+                    if loser and loser is not winner:
+                        self._release(loser)
+            if pending:
+                self._discard_scene_files(temp_path, winner)
+
+        if pixabay is not None:
+            self.hedged += 1
+            if winner and winner.get("source") == "pixabay":
+                self.hedge_wins += 1
+        return winner
+
+    def _release(self, media_info: dict):
+        """Devolve à sessão os IDs e o hash perceptual de uma mídia descartada"""
+        for media_id in media_info.get("claimed_ids", []):
+            self.session.release_id(media_id)
+        self.session.release_hash(media_info.get("phash"))
+
+    def _discard_scene_files(self, temp_path: str, keep: dict):
+        """Apaga o que a busca cancelada deixou da cena (media_XX.* exceto o vencedor)"""
+        keep_path = os.path.abspath(keep["path"]) if keep else None
+        for path in glob.glob(glob.escape(temp_path) + ".*"):
+            if os.path.abspath(path) != keep_path:
+                self._remove(path)
+
+    async def acquire_tenor(self, i: int, descricao: str, search_term: str, temp_path: str,
+                            tag: str, progress: dict) -> dict:
+        """
+        Até 4 tentativas no Tenor (termo da cena, depois termos gerados)
+
+        Args:
+            progress: Termo atual (para o Pixabay de reserva) e evento de
+                "poucos resultados" (dispara o hedge em _race)
+        """
+        downloader = self.downloader
+        session = self.session
+        topic = session.topic
+        style = session.style
+        library = getattr(downloader, "media_library", None)
+
+        media_info = None
+        attempts = 0
+        max_attempts = 4
+        current_search = search_term or topic
+        use_stickers = style in STICKER_STYLES
+
+        while media_info is None and attempts < max_attempts:
+            attempts += 1
+
+            if search_term and attempts == 1:
+                current_search = search_term
+            else:
+                current_search = downloader.generate_search_term(
+                    prompt=descricao,
+                    topic=topic,
+                    style=style,
+                    scene_index=i + (attempts - 1) * 10
+                )
+
+            current_search = session.claim_search_term(current_search, i, downloader.scene_variations)
+            progress["search"] = current_search
+
+            results = await self.search_tenor(current_search, stickers=use_stickers, limit=TENOR_SEARCH_LIMIT)
+            available = [r for r in results if not session.is_used(r.get("id"))]
+            print(f"{tag} 🔍 ({attempts}/{max_attempts}) '{current_search}': "
+                  f"{len(available)}/{len(results)} disponíveis")
+            if len(available) < MEDIA_HEDGE["min_results"]:
+                progress["few_results"].set()
+
+            if not available:
+                search_term = None
+                continue
+
+            for result in available:
+                result_id = result.get("id")
+                # Reserva o ID antes de baixar (outra cena em paralelo não pega o mesmo)
+                if not session.claim_id(result_id):
+                    continue
+
+                try:
+                    # Já baixada em outro job: link da biblioteca, sem download
+                    asset = (await asyncio.to_thread(library.lookup_id, result_id)
+                             if library is not None else None)
+                    if asset is not None:
+                        media_info = await self._from_library(asset, temp_path, current_search, claim=False)
+                        if media_info:
+                            media_info["claimed_ids"] = [result_id]
+                            print(f"{tag} 📚 Biblioteca (ID {result_id[:8]}...)")
+                            break
+                        continue
+
+                    # Re-upload de uma animação já escolhida: pula antes de baixar (pela prévia)
+                    hashes = await self._preview_hash(tenor_preview_url(result))
+                    if self._is_duplicate(hashes, tag):
+                        continue
+
+                    media_info = await self.download_tenor(result, temp_path)
+                    if media_info and not await self._check_downloaded(media_info, hashes, tag):
+                        media_info = None
+                        continue
+                    if media_info:
+                        media_info["claimed_ids"] = [result_id]
+                        print(f"{tag} ✅ {media_info['type'].upper()} ({media_info['format_used']}) - ID: {result_id[:8]}...")
+                        await self._add_to_library(media_info, current_search, result.get("tags"))
+                        break
+                except asyncio.CancelledError:
+                    # O Pixabay venceu no meio desta: o ID (e o hash, se já registrado)
+                    # volta para as outras cenas
+                    session.release_id(result_id)
+                    if media_info:
+                        session.release_hash(media_info.get("phash"))
+                    raise
+
+            if not media_info:
+                search_term = None
+
+        return media_info
+
+    async def acquire_pixabay(self, i: int, current_search: str, topic: str) -> dict:
+        """Reserva do Tenor: termos mais genéricos no Pixabay"""
+        session = self.session
+        pixabay_terms = [
+            current_search.replace("stick figure", "illustration"),
+            f"illustration {topic}",
+            topic,
+        ]
+
+        for term in pixabay_terms:
+            results = await self.search_pixabay(term, limit=10)
+            for result in results:
+                media_id = f"px_{result.get('id')}"
+                if not session.claim_id(media_id):
+                    continue
+                media_info = None
+                try:
+                    hashes = await self._preview_hash(result.get("previewURL"))
+                    if self._is_duplicate(hashes, f"    [cena {i+1}]"):
+                        continue
+                    temp_path = os.path.join(session.output_dir, f"media_{i+1:02d}")
+                    media_info = await self.download_pixabay(result, temp_path)
+                    if media_info and not await self._check_downloaded(media_info, hashes, f"    [cena {i+1}]"):
+                        continue
+                    if media_info:
+                        media_info["claimed_ids"] = [media_id]
+                        print(f"    [cena {i+1}] ✅ Pixabay: imagem válida")
+                        await self._add_to_library(media_info, term, str(result.get("tags", "")).split(", "))
+                        return media_info
+                except asyncio.CancelledError:
+                    # O Tenor venceu no meio desta: ID e hash voltam para as outras cenas
+                    session.release_id(media_id)
+                    if media_info:
+                        session.release_hash(media_info.get("phash"))
+                    raise
+        return None
+
+    # ===========================================
+    # AQUECIMENTO (bot ocioso)
+    # ===========================================
+
+    async def stock_term(self, term: str, stickers: bool, count: int,
+                         before_search, before_download) -> int:
+        """
+        Busca o termo e deixa até `count` mídias dele na biblioteca
+
+        As mídias ficam registradas com o termo: a cena com esse busca_tenor
+        resolve pela biblioteca (find_by_term) sem ida à rede.
+
+        Args:
+            before_search/before_download: Corrotinas chamadas antes de cada ida
+                à rede (cota e espera por ociosidade); a busca só vai à rede se
+                o cache não estiver fresco
+
+        Returns:
+            Mídias baixadas
+        """
+        # Índice da biblioteca e cache em disco: fora do event loop (é o loop do bot)
+        library = self.downloader.media_library
+        cache = self.downloader.search_cache
+        needed = count - await asyncio.to_thread(library.term_count, term)
+        params = tenor_search_params(self.downloader.tenor_key, term, TENOR_SEARCH_LIMIT, stickers)
+        fresh = (cache is not None and
+                 await asyncio.to_thread(cache.state, search_cache_key("tenor", params)) == FRESH)
+        if fresh:
+            if needed <= 0:
+                return 0
+        else:
+            await before_search()
+
+        downloaded = 0
+        known = []      # Já na biblioteca por outro termo: ganham este termo numa gravação só
+        async with self._make_client() as client:
+            self._client = client
+            try:
+                results = await self.search_tenor(term, stickers=stickers, limit=TENOR_SEARCH_LIMIT)
+                for index, result in enumerate(results):
+                    if needed <= 0:
+                        break
+                    asset = await asyncio.to_thread(library.lookup_id, result.get("id"))
+                    if asset is not None:
+                        known.append(asset["sha"])
+                        needed -= 1
+                        continue
+
+                    await before_download()
+                    temp_path = os.path.join(self.session.output_dir, f"warm_{index:02d}")
+                    media_info = await self.download_tenor(result, temp_path)
+                    if not media_info:
+                        continue
+                    if await self._check_downloaded(media_info, None, "   "):
+                        await self._add_to_library(media_info, term, result.get("tags"))
+                        needed -= 1
+                        downloaded += 1
+                    # A biblioteca guardou o próprio link: o temporário sai
+                    self._remove(media_info["path"])
+            finally:
+                self._client = None
+        if known:
+            await asyncio.to_thread(library.add_term, known, term)
+        return downloaded
+
+    # ===========================================
+    # HASH PERCEPTUAL
+    # ===========================================
+
+    async def _preview_hash(self, url: str):
+        """
+        Hash da prévia estática (poucos KB); None se não houver/der erro
+
+        Sem nenhum hash escolhido ainda (primeiras cenas) nada pode ser
+        duplicata: pula a ida à rede antes do download
+        """
+        if not self.dedup or not url or not self.session.has_hashes():
+            return None
+        try:
+            content = await adownload_bytes(self._client, url, expected=IMAGE_PREVIEW_FORMATS,
+                                            max_bytes=DOWNLOAD_LIMITS["preview_max_kb"] * 1024)
+        except DownloadError:
+            return None
+        return await asyncio.to_thread(hash_image, content, 1)
+
+    def _is_duplicate(self, hashes, tag: str) -> bool:
+        if not self.session.is_duplicate(hashes):
+            return False
+        self.duplicates += 1
+        print(f"{tag} ♊ Mesma animação de outra cena (hash perceptual), pulando")
+        return True
+
+    async def _check_downloaded(self, media_info: dict, preview_hashes, tag: str) -> bool:
+        """
+        Registra o hash do arquivo baixado na sessão (e no media_info, para a biblioteca)
+
+        Sem prévia (ou com duas cenas baixando a mesma animação em paralelo),
+        é aqui que o re-upload é detectado e o arquivo removido.
+        """
+        if not self.dedup:
+            return True
+        hashes = await asyncio.to_thread(hash_file, media_info["path"], MEDIA_DEDUP["frames"])
+        if hashes is None:
+            hashes = preview_hashes     # MP4 sem ffmpeg: fica a prévia
+        media_info["phash"] = hashes
+        if self.session.claim_hash(hashes):
+            return True
+        self.duplicates += 1
+        print(f"{tag} ♊ Mesma animação de outra cena (hash perceptual), descartando")
+        self._remove(media_info["path"])
+        return False
+
+    # ===========================================
+    # BIBLIOTECA LOCAL
+    # ===========================================
+
+    def _available(self, media_id) -> bool:
+        return not self.session.is_used(media_id)
+
+    async def _from_library(self, asset: dict, temp_path: str, term: str, claim: bool = True) -> dict:
+        """Link da mídia da biblioteca no projeto (reservando os IDs na sessão)"""
+        if asset is None:
+            return None
+        claimed = []
+        if claim:
+            if not self.session.claim_id(asset["ids"][0]):
+                return None
+            claimed = [asset["ids"][0]] + [
+                media_id for media_id in asset["ids"][1:] if self.session.claim_id(media_id)
+            ]
+        hashes = from_hex(asset.get("phash")) if self.dedup else None
+        if not self.session.claim_hash(hashes):
+            self.duplicates += 1
+            return None
+
+        # Link e índice fora do loop; cancelada (hedge), espera o link terminar
+        # para _discard_scene_files apagar o arquivo depois
+        link = asyncio.ensure_future(
+            asyncio.to_thread(self.downloader.media_library.link_into, asset, temp_path, term)
+        )
+        try:
+            path = await asyncio.shield(link)
+        except asyncio.CancelledError:
+            await asyncio.wait([link])
+            self.session.release_hash(hashes)
+            for media_id in claimed:
+                self.session.release_id(media_id)
+            raise
+        # Validada quando entrou na biblioteca: as próximas etapas não medem de novo
+        remember(path, dict(media_meta(asset), format=asset["ext"], size=asset["size"]))
+        source = asset.get("source", "tenor")
+        media_id = asset["ids"][0]
+        return {
+            "path": path,
+            "type": "image" if source == "pixabay" else asset["ext"],
+            "id": media_id[3:] if media_id.startswith("px_") else media_id,
+            "source": source,
+            "format_used": asset.get("format", asset["ext"]),
+            "library": True,
+            "claimed_ids": claimed,
+            "phash": hashes,
+            **media_meta(asset),
+        }
+
+    async def _add_to_library(self, media_info: dict, term: str, tags: list = None):
+        """Guarda a mídia recém-baixada (hash + índice fora do loop)"""
+        library = getattr(self.downloader, "media_library", None)
+        if library is None:
+            return
+        media_id = str(media_info.get("id"))
+        if media_info.get("source") == "pixabay":
+            media_id = f"px_{media_id}"
+        try:
+            phash = media_info.get("phash")
+            await asyncio.to_thread(
+                library.add, media_info["path"], media_info.get("source", "tenor"), media_id,
+                media_info.get("format_used"), term, tags,
+                to_hex(phash) if phash is not None else None, media_meta(media_info)
+            )
+        except OSError as e:
+            print(f"      ⚠️ Biblioteca: não foi possível guardar ({e})")
+
+    # ===========================================
+    # HTTP
+    # ===========================================
+
+    async def _get_json(self, url: str, params: dict) -> dict:
+        """GET com JSON de volta; None em erro de rede/HTTP"""
+        try:
+            response = await self._client.get(
+                url, params=params, timeout=PIPELINE_CONFIG["media_search_timeout"]
+            )
+        except httpx.HTTPError as e:
+            print(f"      ⚠️ Busca falhou ({url.split('/')[2]}): {e!r}")
+            return None
+        if response.status_code != 200:
+            print(f"      ⚠️ Busca {url.split('/')[2]}: HTTP {response.status_code}")
+            return None
+        try:
+            return response.json()
+        except ValueError:
+            return None
+
+    async def _cached_search(self, provider: str, url: str, params: dict,
+                             results_key: str, fetch_sync) -> list:
+        """
+        Busca com o SearchCache do downloader (stale: revalida em segundo plano)
+
+        Leitura e gravação do cache tocam o disco: rodam numa thread, fora do loop
+        """
+        cache = getattr(self.downloader, "search_cache", None)
+        key = None
+        if cache is not None:
+            key = search_cache_key(provider, params)
+            results, state = await asyncio.to_thread(cache.lookup, key)
+            if state == STALE:
+                cache.revalidate(key, lambda: fetch_sync(params))
+            if state in (FRESH, STALE):
+                return results
+
+        data = await self._get_json(url, params)
+        results = data.get(results_key, []) if data is not None else None
+        if cache is not None:
+            await asyncio.to_thread(cache.store, key, results)
+        return results or []
+
+    async def search_tenor(self, query: str, stickers: bool = True, limit: int = 20) -> list:
+        if not self.downloader.tenor_key:
+            return []
+        params = tenor_search_params(self.downloader.tenor_key, query, limit, stickers)
+        return await self._cached_search("tenor", TENOR_SEARCH_URL, params, "results",
+                                         self.downloader.fetch_tenor)
+
+    async def search_pixabay(self, query: str, limit: int = 10, orientation: str = "vertical") -> list:
+        if not self.downloader.pixabay_key:
+            return []
+        params = pixabay_search_params(self.downloader.pixabay_key, query, limit, orientation)
+        return await self._cached_search("pixabay", PIXABAY_SEARCH_URL, params, "hits",
+                                         self.downloader.fetch_pixabay)
+
+    async def _download_to(self, url: str, path: str, max_bytes: int = None) -> dict:
+        """
+        Baixa em streaming para a memória (limites de tamanho/vazão e assinatura
+        conferida no primeiro pedaço), valida e só então grava
+
+        Returns:
+            Informações da mídia (formato, dimensões, duração) ou None
+        """
+        ext = os.path.splitext(path)[1].lstrip(".").lower()
+        try:
+            content = await adownload_bytes(self._client, url, expected=EXTENSION_FORMATS.get(ext),
+                                            max_bytes=max_bytes)
+        except DownloadError as e:
+            print(f"      ⚠️ Download abortado: {e}")
+            return None
+        self.bytes_downloaded += len(content)
+
+        # Parse das caixas/PIL é bloqueante: fora do loop. A thread não pára
+        # com o cancelamento (hedge): espera a gravação e apaga o arquivo
+        write = asyncio.ensure_future(asyncio.to_thread(write_validated, content, path))
+        try:
+            return await asyncio.shield(write)
+        except asyncio.CancelledError:
+            if await write:
+                self._remove(path)
+            raise
+
+    async def download_tenor(self, result: dict, output_path: str) -> dict:
+        media_formats = result.get("media_formats", {})
+        base = output_path.rsplit(".", 1)[0]
+
+        for format_key, ext in rank_tenor_formats(media_formats, self.session.target_size):
+            media_url = media_formats[format_key]["url"]
+            final_path = f"{base}.{ext}"
+            info = await self._download_to(media_url, final_path)
+            if info:
+                return {
+                    "path": final_path,
+                    "type": ext,
+                    "id": result.get("id"),
+                    "source": "tenor",
+                    "format_used": format_key,
+                    **media_meta(info),
+                }
+        return None
+
+    async def download_pixabay(self, result: dict, output_path: str) -> dict:
+        final_path = output_path.rsplit(".", 1)[0] + ".jpg"
+        for key in ("largeImageURL", "webformatURL", "previewURL"):
+            image_url = result.get(key)
+            info = (await self._download_to(image_url, final_path,
+                                            max_bytes=DOWNLOAD_LIMITS["image_max_mb"] * MB)
+                    if image_url else None)
+            if info:
+                return {
+                    "path": final_path,
+                    "type": "image",
+                    "id": result.get("id"),
+                    "source": "pixabay",
+                    **media_meta(info),
+                }
+        return None
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
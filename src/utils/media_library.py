@@ -0,0 +1,370 @@
+"""
+Biblioteca local de mídias reaproveitadas entre jobs
+
+Cada mídia validada fica uma vez só em disco, endereçada pelo sha256 do
+conteúdo (objects/ab/abcdef....gif), com um índice JSON:
+- assets: sha → formato, tamanho, dimensões, duração, origem, tags, termos
+  de busca que a encontraram, hash perceptual (hex por quadro), último uso
+- ids: ID da origem ("123" do Tenor, "px_456" do Pixabay) → sha
+
+Os projetos recebem um hardlink do arquivo da biblioteca (cópia só se o
+link não for possível, ex.: outro disco). Passando do orçamento de disco,
+sai quem foi usado há mais tempo.
+
+Vários processos (workers do bot) dividem a mesma biblioteca: toda gravação
+do índice acontece com index.lock travado, relendo o index.json se outro
+processo mexeu nele. Último uso/contagem de usos ficam acumulados em memória
+e vão para o disco a cada USAGE_FLUSH_EVERY usos ou USAGE_FLUSH_SECONDS.
+"""
+from contextlib import contextmanager
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from config.settings import MEDIA_LIBRARY, MEDIA_LIBRARY_DIR
+from src.utils.media_validator import InvalidMedia, inspect_file, media_meta
+
+try:
+    import fcntl
+except ImportError:     # Windows: só o lock entre threads
+    fcntl = None
+
+USAGE_FLUSH_EVERY = 20      # Usos acumulados antes de gravar o índice
+USAGE_FLUSH_SECONDS = 60    # ... ou tempo desde a última gravação
+
+
+def normalize_term(term: str) -> str:
+    return " ".join(str(term).lower().split())
+
+
+def probe_media(path: str) -> dict:
+    """Dimensões, duração e quadros (o que der para descobrir, sem ffprobe)"""
+    try:
+        return media_meta(inspect_file(path))
+    except (OSError, InvalidMedia):
+        return {"width": None, "height": None, "duration": None, "frames": None}
+
+
+class MediaLibrary:
+    """Mídias por hash de conteúdo + índice por ID de origem e termo de busca"""
+
+    def __init__(self, root: str = None, max_bytes: int = None):
+        self.root = Path(root or MEDIA_LIBRARY_DIR)
+        self.objects_dir = self.root / "objects"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.root / "index.json"
+        self.lock_path = self.root / "index.lock"
+        self.max_bytes = max_bytes if max_bytes is not None else MEDIA_LIBRARY["max_mb"] * 1024 * 1024
+
+        self._lock = threading.RLock()
+        self._lock_file = None
+        self._lock_depth = 0
+        self.assets = {}
+        self.ids = {}
+        self._stamp = None          # Versão do index.json carregada (muda quando outro processo grava)
+        self._usage = {}            # sha → usos ainda não gravados (last_used, uses, terms)
+        self._pending_uses = 0
+        self._flushed_at = time.monotonic()
+        self._load()
+
+        self.hits = 0
+        self.added = 0
+        self.evictions = 0
+
+    # ===========================================
+    # ÍNDICE
+    # ===========================================
+
+    def _index_stamp(self):
+        try:
+            st = os.stat(self.index_path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _load(self):
+        self._stamp = self._index_stamp()
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.assets = data.get("assets", {})
+            self.ids = data.get("ids", {})
+        except (OSError, ValueError):
+            self.assets, self.ids = {}, {}
+
+    def _refresh(self):
+        """Relê o índice se outro processo gravou e reaplica os usos pendentes (chamar com lock)"""
+        if self._index_stamp() == self._stamp:
+            return
+        self._load()
+        for sha, usage in self._usage.items():
+            stored = self.assets.get(sha)
+            if stored is not None:
+                self._apply_usage(stored, usage["last_used"], usage["uses"], usage["terms"])
+
+    @staticmethod
+    def _apply_usage(stored: dict, last_used: float, uses: int, terms: list):
+        stored["last_used"] = max(stored.get("last_used", 0), last_used)
+        stored["uses"] = stored.get("uses", 0) + uses
+        for term in terms:
+            if term not in stored["terms"]:
+                stored["terms"].append(term)
+
+    @contextmanager
+    def _exclusive(self):
+        """
+        Lock entre threads e entre processos para ler-alterar-gravar o índice
+
+        Relê o index.json ao entrar: a alteração parte do que está em disco.
+        Reentrante (add → _evict → _valid...): só o primeiro nível trava o arquivo.
+        """
+        with self._lock:
+            if self._lock_depth == 0 and fcntl is not None:
+                self._lock_file = open(self.lock_path, "a")
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            self._lock_depth += 1
+            try:
+                self._refresh()
+                yield
+            finally:
+                self._lock_depth -= 1
+                if self._lock_depth == 0 and self._lock_file is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+                    self._lock_file.close()
+                    self._lock_file = None
+
+    def _save(self):
+        """Grava o índice com os usos pendentes (chamar dentro de _exclusive; escrita atômica)"""
+        tmp = self.index_path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"assets": self.assets, "ids": self.ids}, f, ensure_ascii=False)
+        os.replace(tmp, self.index_path)
+        self._stamp = self._index_stamp()
+        self._usage.clear()
+        self._pending_uses = 0
+        self._flushed_at = time.monotonic()
+
+    def flush(self):
+        """Grava os usos acumulados por link_into (fim do job)"""
+        with self._lock:
+            if not self._usage:
+                return
+            with self._exclusive():
+                self._save()
+
+    def _object_path(self, sha: str, ext: str) -> Path:
+        return self.objects_dir / sha[:2] / f"{sha}.{ext}"
+
+    def _drop(self, sha: str):
+        """Remove a mídia do índice e do disco (chamar com lock)"""
+        asset = self.assets.pop(sha, None)
+        if asset is None:
+            return
+        for media_id in asset.get("ids", []):
+            if self.ids.get(media_id) == sha:
+                del self.ids[media_id]
+        try:
+            os.remove(self._object_path(sha, asset["ext"]))
+        except OSError:
+            pass
+
+    # ===========================================
+    # CONSULTA
+    # ===========================================
+
+    def lookup_id(self, media_id: str) -> dict:
+        """Mídia já baixada com esse ID de origem (ou None)"""
+        with self._lock:
+            self._refresh()
+            sha = self.ids.get(str(media_id))
+            return self._valid(sha)
+
+    def find_by_term(self, term: str, is_available) -> dict:
+        """
+        Mídia que já foi encontrada por esse termo de busca
+
+        Args:
+            is_available: Função id_de_origem → bool (ex.: ainda não usado na sessão)
+        """
+        term = normalize_term(term)
+        with self._lock:
+            self._refresh()
+            candidates = [
+                (sha, asset) for sha, asset in self.assets.items()
+                if term in asset.get("terms", [])
+            ]
+        # Menos usada primeiro: espalha as mídias entre os vídeos
+        candidates.sort(key=lambda item: item[1].get("uses", 0))
+        for sha, asset in candidates:
+            if asset.get("ids") and all(is_available(media_id) for media_id in asset["ids"]):
+                with self._lock:
+                    valid = self._valid(sha)
+                if valid:
+                    return valid
+        return None
+
+    def term_count(self, term: str) -> int:
+        """Quantas mídias já foram encontradas por esse termo"""
+        term = normalize_term(term)
+        with self._lock:
+            self._refresh()
+            return sum(1 for asset in self.assets.values() if term in asset.get("terms", []))
+
+    def add_term(self, shas: list, term: str):
+        """Associa mais um termo de busca a mídias que já estão na biblioteca (uma gravação do índice)"""
+        term = normalize_term(term)
+        with self._exclusive():
+            changed = False
+            for sha in shas:
+                asset = self.assets.get(sha)
+                if asset is not None and term not in asset["terms"]:
+                    asset["terms"].append(term)
+                    changed = True
+            if changed:
+                self._save()
+
+    def _valid(self, sha: str) -> dict:
+        """Asset com sha e caminho, se o arquivo ainda existir (chamar com lock)"""
+        if not sha or sha not in self.assets:
+            return None
+        asset = self.assets[sha]
+        path = self._object_path(sha, asset["ext"])
+        if not path.exists():
+            with self._exclusive():
+                self._drop(sha)
+                self._save()
+            return None
+        return dict(asset, sha=sha, path=str(path))
+
+    # ===========================================
+    # ESCRITA
+    # ===========================================
+
+    def add(self, path: str, source: str, media_id: str, format_used: str = None,
+            term: str = None, tags: list = None, phash: list = None,
+            meta: dict = None) -> dict:
+        """
+        Guarda uma mídia já validada (hardlink do arquivo do projeto)
+
+        Args:
+            meta: Dimensões/duração já medidas na validação (sem meta, mede aqui)
+
+        Returns:
+            Asset do índice (mídia repetida com outro ID só ganha o ID novo)
+        """
+        hasher = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                hasher.update(block)
+        sha = hasher.hexdigest()
+        ext = Path(path).suffix.lstrip(".").lower()
+        target = self._object_path(sha, ext)
+
+        with self._exclusive():
+            asset = self.assets.get(sha)
+            if asset is None or not target.exists():
+                target.parent.mkdir(parents=True, exist_ok=True)
+                if not target.exists():
+                    try:
+                        os.link(path, target)
+                    except OSError:
+                        shutil.copy2(path, target)
+                asset = {
+                    "ext": ext,
+                    "size": target.stat().st_size,
+                    "source": source,
+                    "format": format_used or ext,
+                    **(meta or probe_media(str(target))),
+                    "ids": [],
+                    "terms": [],
+                    "tags": [],
+                    "added": time.time(),
+                    "last_used": time.time(),
+                    "uses": 0,
+                }
+                self.assets[sha] = asset
+                self.added += 1
+
+            media_id = str(media_id)
+            if media_id not in asset["ids"]:
+                asset["ids"].append(media_id)
+            self.ids[media_id] = sha
+            if phash and not asset.get("phash"):
+                asset["phash"] = phash
+            if term and normalize_term(term) not in asset["terms"]:
+                asset["terms"].append(normalize_term(term))
+            for tag in tags or []:
+                tag = normalize_term(tag)
+                if tag and tag not in asset["tags"]:
+                    asset["tags"].append(tag)
+
+            self._evict()
+            self._save()
+            return dict(asset, sha=sha, path=str(target))
+
+    def link_into(self, asset: dict, output_path: str, term: str = None) -> str:
+        """
+        Coloca a mídia da biblioteca no projeto (hardlink; cópia se não der)
+
+        Último uso e contagem ficam em memória até o próximo flush (sem regravar
+        o índice inteiro a cada cena)
+
+        Args:
+            output_path: Caminho sem extensão (a extensão vem do asset)
+        """
+        final_path = output_path.rsplit(".", 1)[0] + f".{asset['ext']}"
+        try:
+            os.remove(final_path)
+        except OSError:
+            pass
+        try:
+            os.link(asset["path"], final_path)
+        except OSError:
+            shutil.copy2(asset["path"], final_path)
+
+        terms = [normalize_term(term)] if term else []
+        with self._lock:
+            self._refresh()
+            stored = self.assets.get(asset["sha"])
+            if stored is not None:
+                now = time.time()
+                self._apply_usage(stored, now, 1, terms)
+                usage = self._usage.setdefault(asset["sha"], {"last_used": 0, "uses": 0, "terms": []})
+                self._apply_usage(usage, now, 1, terms)
+                self._pending_uses += 1
+            self.hits += 1
+            due = (self._pending_uses >= USAGE_FLUSH_EVERY or
+                   (self._usage and time.monotonic() - self._flushed_at >= USAGE_FLUSH_SECONDS))
+        if due:
+            self.flush()
+        return final_path
+
+    def _evict(self):
+        """LRU por orçamento de disco (chamar com lock)"""
+        total = sum(asset["size"] for asset in self.assets.values())
+        if total <= self.max_bytes:
+            return
+        for sha, asset in sorted(self.assets.items(), key=lambda item: item[1]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            total -= asset["size"]
+            self._drop(sha)
+            self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refresh()
+            return {
+                "assets": len(self.assets),
+                "bytes": sum(asset["size"] for asset in self.assets.values()),
+                "hits": self.hits,
+                "added": self.added,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,404 @@
+"""
+Validação de mídias em memória (bytes da resposta HTTP)
+
+Antes: cada candidato era gravado em disco e validado com ffprobe (MP4) ou
+reaberto com PIL (GIF/imagens); os inválidos eram apagados em seguida.
+Agora a validação roda nos bytes já baixados e só o que passa é gravado:
+- MP4/MOV: caixas ISO-BMFF (ftyp, moov/mvhd, trak/tkhd de vídeo, mdat)
+- WebM: cabeçalho EBML + Segment/Info/Tracks (dimensões e duração)
+- GIF/PNG/JPEG/WebP: PIL decodifica só o primeiro quadro de um BytesIO;
+  quadros e duração das animações saem dos blocos do GIF (Graphic Control
+  Extension) e dos chunks ANMF do WebP, sem decodificar o resto
+
+Dimensões, duração e número de quadros ficam no resultado e num registro
+do processo (por caminho), para as etapas seguintes não medirem de novo.
+"""
+import io
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+MIN_FILE_SIZE = 1000        # Menos de 1KB geralmente é resposta de erro
+MIN_DIMENSION = 10
+
+# Extensão do arquivo → formatos aceitos no conteúdo
+EXTENSION_FORMATS = {
+    "mp4": ("mp4",),
+    "mov": ("mp4",),
+    "webm": ("webm",),
+    "gif": ("gif",),
+    "png": ("png",),
+    "jpg": ("jpeg", "png", "webp"),     # Pixabay às vezes devolve PNG/WebP como .jpg
+    "jpeg": ("jpeg", "png", "webp"),
+    "webp": ("webp",),
+}
+
+
+class InvalidMedia(ValueError):
+    """Conteúdo que não é a mídia esperada (ou está truncado/corrompido)"""
+
+
+def sniff_format(data: bytes) -> str:
+    """Formato pelo cabeçalho (None se desconhecido)"""
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return "png"
+    if data[:3] == b"\xff\xd8\xff":
+        return "jpeg"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "webp"
+    if data[4:8] == b"ftyp":
+        return "mp4"
+    if data[:4] == b"\x1a\x45\xdf\xa3":
+        return "webm"
+    return None
+
+
+# ===========================================
+# MP4 (ISO-BMFF)
+# ===========================================
+
+def _boxes(data: bytes, start: int = 0, end: int = None):
+    """(tipo, início do conteúdo, fim) de cada caixa entre start e end"""
+    end = len(data) if end is None else end
+    offset = start
+    while offset + 8 <= end:
+        size, box_type = struct.unpack_from(">I4s", data, offset)
+        header = 8
+        if size == 1:
+            if offset + 16 > end:
+                raise InvalidMedia("caixa MP4 truncada")
+            size = struct.unpack_from(">Q", data, offset + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - offset         # Vai até o fim do arquivo
+        if size < header or offset + size > end:
+            raise InvalidMedia(f"caixa MP4 '{box_type.decode('latin-1')}' truncada")
+        yield box_type, offset + header, offset + size
+        offset += size
+
+
+def _child(data: bytes, start: int, end: int, box_type: bytes):
+    for child_type, child_start, child_end in _boxes(data, start, end):
+        if child_type == box_type:
+            return child_start, child_end
+    return None
+
+
+def parse_mp4(data: bytes) -> dict:
+    top = {box_type: (start, end) for box_type, start, end in _boxes(data)}
+    if b"moov" not in top:
+        raise InvalidMedia("MP4 sem moov")
+    mdat = top.get(b"mdat")
+    if mdat is None or mdat[1] <= mdat[0]:
+        if not any(box_type == b"moof" for box_type in top):     # MP4 fragmentado
+            raise InvalidMedia("MP4 sem dados (mdat)")
+
+    moov_start, moov_end = top[b"moov"]
+    info = {"format": "mp4", "width": None, "height": None, "duration": None, "frames": None}
+
+    mvhd = _child(data, moov_start, moov_end, b"mvhd")
+    if mvhd:
+        version = data[mvhd[0]]
+        if version == 1:
+            timescale, duration = struct.unpack_from(">IQ", data, mvhd[0] + 20)
+        else:
+            timescale, duration = struct.unpack_from(">II", data, mvhd[0] + 12)
+        if timescale:
+            info["duration"] = round(duration / timescale, 2)
+
+    for box_type, start, end in _boxes(data, moov_start, moov_end):
+        if box_type != b"trak":
+            continue
+        mdia = _child(data, start, end, b"mdia")
+        hdlr = mdia and _child(data, mdia[0], mdia[1], b"hdlr")
+        if not hdlr or data[hdlr[0] + 8:hdlr[0] + 12] != b"vide":
+            continue
+        tkhd = _child(data, start, end, b"tkhd")
+        if tkhd:
+            # Largura/altura em ponto fixo 16.16 nos 8 bytes finais do tkhd
+            width, height = struct.unpack_from(">II", data, tkhd[1] - 8)
+            info["width"], info["height"] = width >> 16, height >> 16
+        break
+    else:
+        raise InvalidMedia("MP4 sem trilha de vídeo")
+
+    return info
+
+
+# ===========================================
+# WEBM (EBML)
+# ===========================================
+
+EBML_SEGMENT = 0x18538067
+EBML_INFO = 0x1549A966
+EBML_TRACKS = 0x1654AE6B
+EBML_TRACK_ENTRY = 0xAE
+EBML_VIDEO = 0xE0
+EBML_TIMECODE_SCALE = 0x2AD7B1
+EBML_DURATION = 0x4489
+EBML_PIXEL_WIDTH = 0xB0
+EBML_PIXEL_HEIGHT = 0xBA
+EBML_MASTERS = (EBML_SEGMENT, EBML_INFO, EBML_TRACKS, EBML_TRACK_ENTRY, EBML_VIDEO)
+
+
+def _vint(data: bytes, offset: int, keep_marker: bool):
+    first = data[offset]
+    length = 1
+    while length <= 8 and not first & (0x80 >> (length - 1)):
+        length += 1
+    if length > 8 or offset + length > len(data):
+        raise InvalidMedia("WebM corrompido")
+    value = first if keep_marker else first & (0xFF >> length)
+    for byte in data[offset + 1:offset + length]:
+        value = (value << 8) | byte
+    return value, length
+
+
+def _ebml_elements(data: bytes, start: int, end: int):
+    offset = start
+    while offset < end:
+        element_id, id_length = _vint(data, offset, keep_marker=True)
+        size, size_length = _vint(data, offset + id_length, keep_marker=False)
+        body = offset + id_length + size_length
+        # Tamanho "desconhecido" (streaming): vai até o fim do pai
+        if size == (1 << (7 * size_length)) - 1:
+            size = end - body
+        elif body + size > end:
+            raise InvalidMedia("elemento WebM truncado")
+        yield element_id, body, body + size
+        offset = body + size
+
+
+def parse_webm(data: bytes) -> dict:
+    info = {"format": "webm", "width": None, "height": None, "duration": None, "frames": None}
+    values = {}
+
+    def walk(start, end):
+        for element_id, body, body_end in _ebml_elements(data, start, end):
+            if element_id in EBML_MASTERS:
+                walk(body, body_end)
+            elif element_id in (EBML_TIMECODE_SCALE, EBML_PIXEL_WIDTH, EBML_PIXEL_HEIGHT):
+                values.setdefault(element_id, int.from_bytes(data[body:body_end], "big"))
+            elif element_id == EBML_DURATION:
+                fmt = ">f" if body_end - body == 4 else ">d"
+                values.setdefault(element_id, struct.unpack(fmt, data[body:body_end])[0])
+
+    header_id, header_body, header_end = next(_ebml_elements(data, 0, len(data)))
+    walk(header_end, len(data))
+    if EBML_PIXEL_WIDTH not in values:
+        raise InvalidMedia("WebM sem trilha de vídeo")
+
+    info["width"] = values[EBML_PIXEL_WIDTH]
+    info["height"] = values.get(EBML_PIXEL_HEIGHT)
+    if EBML_DURATION in values:
+        scale = values.get(EBML_TIMECODE_SCALE, 1_000_000)
+        info["duration"] = round(values[EBML_DURATION] * scale / 1e9, 2)
+    return info
+
+
+# ===========================================
+# IMAGENS / GIF
+# ===========================================
+
+def _gif_skip_subblocks(data: bytes, offset: int) -> int:
+    """Pula a sequência de sub-blocos (tamanho + dados) até o terminador 0"""
+    while True:
+        size = data[offset]
+        offset += 1
+        if not size:
+            return offset
+        offset += size
+        if offset > len(data):
+            raise InvalidMedia("GIF truncado")
+
+
+def _gif_frame_delays(data: bytes) -> list:
+    """
+    Atraso (ms) de cada quadro, pelos blocos do arquivo (sem decodificar)
+
+    A Graphic Control Extension (0x21 0xF9) antes de cada descritor de imagem
+    (0x2C) traz o atraso em centésimos de segundo; quadro sem ela conta 100ms
+    """
+    flags = data[10]
+    offset = 13
+    if flags & 0x80:        # Tabela de cores global
+        offset += 3 << ((flags & 0x07) + 1)
+
+    delays = []
+    delay = None
+    while offset < len(data):
+        block = data[offset]
+        if block == 0x3B:       # Trailer
+            break
+        if block == 0x21:       # Extensão
+            if data[offset + 1] == 0xF9 and data[offset + 2] >= 4:
+                delay = struct.unpack_from("<H", data, offset + 4)[0] * 10
+            offset = _gif_skip_subblocks(data, offset + 2)
+        elif block == 0x2C:     # Descritor de imagem
+            flags = data[offset + 9]
+            offset += 10
+            if flags & 0x80:    # Tabela de cores local
+                offset += 3 << ((flags & 0x07) + 1)
+            offset = _gif_skip_subblocks(data, offset + 1)  # +1: tamanho mínimo do código LZW
+            delays.append(100 if delay is None else delay)
+            delay = None
+        else:
+            raise InvalidMedia(f"GIF com bloco desconhecido (0x{block:02x})")
+    return delays
+
+
+def _webp_frame_delays(data: bytes) -> list:
+    """Atraso (ms) de cada quadro de um WebP animado (chunks ANMF); [] se estático"""
+    delays = []
+    offset = 12
+    while offset + 8 <= len(data):
+        chunk = data[offset:offset + 4]
+        size = struct.unpack_from("<I", data, offset + 4)[0]
+        if chunk == b"ANMF":
+            delays.append(int.from_bytes(data[offset + 20:offset + 23], "little"))
+        offset += 8 + size + (size & 1)
+    return delays
+
+
+def parse_image(data: bytes, fmt: str) -> dict:
+    from PIL import Image
+
+    # Quadros pelos cabeçalhos: seek em cada quadro decodificaria a animação inteira
+    if fmt == "gif":
+        delays = _gif_frame_delays(data)
+    elif fmt == "webp":
+        delays = _webp_frame_delays(data)
+    else:
+        delays = []
+
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.load()      # Decodifica o primeiro quadro (pega arquivo truncado)
+            info = {"format": fmt, "width": img.width, "height": img.height,
+                    "duration": None, "frames": len(delays) or 1}
+            if fmt == "png":
+                info["frames"] = getattr(img, "n_frames", 1)     # APNG: só a contagem (acTL)
+    except Exception as e:
+        raise InvalidMedia(f"{fmt.upper()} inválido: {e}")
+
+    if len(delays) > 1:
+        info["duration"] = round(sum(delays) / 1000, 2)
+    return info
+
+
+# ===========================================
+# API
+# ===========================================
+
+def inspect_bytes(data: bytes, ext: str = None, min_size: int = MIN_FILE_SIZE) -> dict:
+    """
+    Valida a mídia em memória
+
+    Args:
+        ext: Extensão com que o arquivo vai ser gravado (confere com o conteúdo)
+
+    Returns:
+        {"format", "width", "height", "duration", "frames", "size"}
+
+    Raises:
+        InvalidMedia: Com o motivo (mensagem curta para o log)
+    """
+    if len(data) < min_size:
+        raise InvalidMedia(f"Arquivo muito pequeno: {len(data)} bytes")
+
+    fmt = sniff_format(data)
+    if fmt is None:
+        raise InvalidMedia("formato desconhecido")
+    if ext and fmt not in EXTENSION_FORMATS.get(ext.lower().lstrip("."), (fmt,)):
+        raise InvalidMedia(f"conteúdo {fmt} num .{ext}")
+
+    try:
+        if fmt == "mp4":
+            info = parse_mp4(data)
+        elif fmt == "webm":
+            info = parse_webm(data)
+        else:
+            info = parse_image(data, fmt)
+    except (struct.error, IndexError, StopIteration):
+        raise InvalidMedia(f"{fmt.upper()} truncado")
+
+    width, height = info["width"], info["height"]
+    if width is not None and (width < MIN_DIMENSION or (height or 0) < MIN_DIMENSION):
+        raise InvalidMedia(f"Dimensões inválidas: {width}x{height}")
+
+    info["size"] = len(data)
+    return info
+
+
+def validate_bytes(data: bytes, ext: str = None, min_size: int = MIN_FILE_SIZE) -> dict:
+    """inspect_bytes que devolve None (e avisa) em vez de levantar"""
+    try:
+        return inspect_bytes(data, ext, min_size)
+    except InvalidMedia as e:
+        print(f"      ⚠️ {e}")
+        return None
+
+
+def media_meta(info: dict) -> dict:
+    """Campos que vão junto no media_info (e no índice da biblioteca)"""
+    return {key: info.get(key) for key in ("width", "height", "duration", "frames")}
+
+
+def write_validated(data: bytes, path: str, min_size: int = MIN_FILE_SIZE) -> dict:
+    """Valida e só então grava (registrando as informações para as próximas etapas)"""
+    info = validate_bytes(data, os.path.splitext(path)[1], min_size)
+    if info is None:
+        return None
+    with open(path, "wb") as f:
+        f.write(data)
+    remember(path, info)
+    return info
+
+
+def inspect_file(path: str) -> dict:
+    """Informações de um arquivo já em disco (registro primeiro, senão lê e valida)"""
+    info = lookup(path)
+    if info is not None:
+        return info
+    with open(path, "rb") as f:
+        data = f.read()
+    info = inspect_bytes(data, os.path.splitext(path)[1])
+    remember(path, info)
+    return info
+
+
+# ===========================================
+# REGISTRO DO PROCESSO
+# ===========================================
+
+KNOWN_MAX_ENTRIES = 4096     # Bot roda por dias: guarda só os jobs recentes
+
+_known = OrderedDict()
+_known_lock = threading.Lock()
+
+
+def remember(path: str, info: dict):
+    with _known_lock:
+        _known[os.path.abspath(path)] = info
+        _known.move_to_end(os.path.abspath(path))
+        while len(_known) > KNOWN_MAX_ENTRIES:
+            _known.popitem(last=False)
+
+
+def lookup(path: str) -> dict:
+    """Informações de um arquivo validado neste processo (None se mudou/sumiu)"""
+    with _known_lock:
+        info = _known.get(os.path.abspath(path))
+    if info is None:
+        return None
+    try:
+        if os.path.getsize(path) == info["size"]:
+            return info
+    except OSError:
+        pass
+    with _known_lock:
+        _known.pop(os.path.abspath(path), None)
+    return None
@@ -0,0 +1,175 @@
+"""
+Hash perceptual (dHash) de stickers e GIFs para achar re-uploads
+
+O Tenor devolve a mesma animação com IDs diferentes; used_ids não pega isso.
+Cada mídia vira até N hashes de 64 bits (um por quadro amostrado): o quadro
+é reduzido para 9x8 em cinza e cada bit diz se o pixel é mais claro que o
+vizinho da direita. Duas mídias são "a mesma" se algum par de quadros fica a
+até `threshold` bits de distância (Hamming).
+
+Tudo vetorizado com NumPy: os quadros são empilhados e as distâncias entre
+todos os pares saem de um XOR + contagem de bits numa operação só.
+"""
+import io
+import subprocess
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+HASH_WIDTH = 9      # 9 colunas → 8 diferenças por linha
+HASH_HEIGHT = 8
+
+
+def dhash_frames(frames: np.ndarray) -> np.ndarray:
+    """
+    Args:
+        frames: Array (n, 8, 9) em tons de cinza
+
+    Returns:
+        Array uint64 (n,) com um hash por quadro
+    """
+    frames = np.asarray(frames, dtype=np.int16)
+    bits = frames[:, :, 1:] > frames[:, :, :-1]                 # (n, 8, 8)
+    packed = np.packbits(bits.reshape(len(frames), 64), axis=1)  # (n, 8) bytes
+    return packed.view(">u8").ravel().astype(np.uint64)
+
+
+def informative(hashes: np.ndarray, min_bits: int = 6) -> np.ndarray:
+    """
+    Descarta quadros quase lisos (fundo de uma cor só, degradê): o dHash
+    deles fica perto de 0 ou de 64 bits ligados e "casaria" com qualquer
+    outra mídia lisa
+    """
+    if hashes is None:
+        return None
+    bits = np.unpackbits(hashes.astype(">u8").view(np.uint8).reshape(len(hashes), 8), axis=1).sum(axis=1)
+    kept = hashes[(bits >= min_bits) & (bits <= 64 - min_bits)]
+    return kept if len(kept) else None
+
+
+def _sample_indices(total: int, count: int) -> list:
+    if total <= count:
+        return list(range(total))
+    return sorted({round(k * (total - 1) / (count - 1)) for k in range(count)}) if count > 1 else [0]
+
+
+def hash_image(source, max_frames: int = 4) -> np.ndarray:
+    """
+    Hashes de uma imagem/GIF/WebP (caminho ou bytes); None se não abrir
+
+    Quadros amostrados igualmente espaçados (o primeiro sempre entra, que é
+    o mesmo quadro das prévias estáticas do Tenor).
+    """
+    try:
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+        with Image.open(source) as img:
+            total = getattr(img, "n_frames", 1)
+            frames = []
+            for index in _sample_indices(total, max_frames):
+                img.seek(index)
+                frame = img.convert("L").resize((HASH_WIDTH, HASH_HEIGHT), Image.BILINEAR)
+                frames.append(np.asarray(frame))
+    except Exception:
+        return None
+    return dhash_frames(np.stack(frames)) if frames else None
+
+
+def hash_video(path: str, max_frames: int = 4, timeout: float = 15) -> np.ndarray:
+    """Hashes de um MP4/WebM via ffmpeg (quadros 9x8 em cinza direto no pipe); None sem ffmpeg"""
+    try:
+        result = subprocess.run([
+            "ffmpeg", "-v", "error", "-i", path,
+            "-vf", f"select='lt(n\\,{max_frames * 12})*not(mod(n\\,12))',"
+                   f"scale={HASH_WIDTH}:{HASH_HEIGHT}:flags=bilinear,format=gray",
+            "-vsync", "vfr", "-frames:v", str(max_frames),
+            "-f", "rawvideo", "-"
+        ], capture_output=True, timeout=timeout)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+    frame_size = HASH_WIDTH * HASH_HEIGHT
+    data = np.frombuffer(result.stdout, dtype=np.uint8)
+    count = len(data) // frame_size
+    if result.returncode != 0 or count == 0:
+        return None
+    return dhash_frames(data[:count * frame_size].reshape(count, HASH_HEIGHT, HASH_WIDTH))
+
+
+def hash_file(path: str, max_frames: int = 4) -> np.ndarray:
+    if Path(path).suffix.lower() in (".mp4", ".webm", ".mov"):
+        return hash_video(path, max_frames)
+    return hash_image(path, max_frames)
+
+
+def min_distance(a: np.ndarray, b: np.ndarray) -> int:
+    """Menor distância de Hamming entre qualquer quadro de a e qualquer quadro de b"""
+    xor = np.bitwise_xor(a[:, None], b[None, :]).astype(">u8")
+    bits = np.unpackbits(xor.view(np.uint8).reshape(xor.size, 8), axis=1).sum(axis=1)
+    return int(bits.min())
+
+
+def to_hex(hashes: np.ndarray) -> list:
+    """Para guardar em JSON (índice da biblioteca)"""
+    return [f"{int(h):016x}" for h in hashes]
+
+
+def from_hex(values: list) -> np.ndarray:
+    if not values:
+        return None
+    return np.array([int(v, 16) for v in values], dtype=np.uint64)
+
+
+class HashSet:
+    """Hashes das mídias já escolhidas, com busca vetorizada por vizinhos"""
+
+    def __init__(self, threshold: int = 10):
+        self.threshold = threshold
+        self._hashes = np.empty(0, dtype=np.uint64)
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def is_near(self, hashes: np.ndarray) -> bool:
+        hashes = informative(hashes)
+        if hashes is None or len(self._hashes) == 0:
+            return False
+        return min_distance(hashes, self._hashes) <= self.threshold
+
+    def add(self, hashes: np.ndarray):
+        hashes = informative(hashes)
+        if hashes is not None:
+            self._hashes = np.concatenate([self._hashes, hashes.astype(np.uint64)])
+
+    def remove(self, hashes: np.ndarray):
+        """Tira os hashes de uma mídia descartada (uma ocorrência de cada)"""
+        hashes = informative(hashes)
+        if hashes is None or len(self._hashes) == 0:
+            return
+        keep = np.ones(len(self._hashes), dtype=bool)
+        for value in hashes.astype(np.uint64):
+            match = np.flatnonzero(keep & (self._hashes == value))
+            if len(match):
+                keep[match[0]] = False
+        self._hashes = self._hashes[keep]
+
+
+if __name__ == "__main__":
+    import time
+
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (4, HASH_HEIGHT, HASH_WIDTH))
+    reupload = np.clip(base + rng.integers(-6, 6, base.shape), 0, 255)   # recompressão
+    other = rng.integers(0, 255, (4, HASH_HEIGHT, HASH_WIDTH))
+
+    a, b, c = dhash_frames(base), dhash_frames(reupload), dhash_frames(other)
+    print(f"re-upload: {min_distance(a, b)} bits | outra mídia: {min_distance(a, c)} bits")
+
+    chosen = HashSet(threshold=10)
+    for _ in range(500):
+        chosen.add(dhash_frames(rng.integers(0, 255, (4, HASH_HEIGHT, HASH_WIDTH))))
+    start = time.perf_counter()
+    for _ in range(100):
+        chosen.is_near(b)
+    print(f"busca em {len(chosen)} hashes: {(time.perf_counter() - start) * 10:.2f} ms")
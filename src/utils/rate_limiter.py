@@ -0,0 +1,228 @@
+"""
+Limite de taxa por provider (token bucket) compartilhado no processo
+
+Cada provider tem dois baldes: requisições por minuto e tokens por minuto.
+Quem chama espera na fila até ter saldo, em vez de tomar 429. Quando o
+provider responde 429, o retry-after (ou um backoff exponencial com jitter)
+pausa TODAS as chamadas daquele provider, evitando a manada de retries.
+Os cabeçalhos x-ratelimit-* das respostas corrigem o saldo local.
+"""
+import random
+import re
+import threading
+import time
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from config.settings import LLM_RATE_LIMITS
+
+
+class TokenBucket:
+    """Balde que enche a uma taxa fixa até a capacidade"""
+
+    def __init__(self, rate_per_minute: float, capacity: float = None):
+        """rate_per_minute <= 0: sem limite (o balde nunca faz esperar)"""
+        self.rate = max(0.0, rate_per_minute) / 60.0
+        self.capacity = capacity or max(1.0, rate_per_minute)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Segundos até ter saldo para amount (0 = já tem)"""
+        if not self.rate:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        self.level -= min(amount, self.capacity)
+
+    def set_remaining(self, remaining: float, now: float):
+        """Saldo informado pelo servidor (só reduz: o local pode estar otimista)"""
+        self._refill(now)
+        self.level = min(self.level, remaining)
+
+
+def parse_reset(value) -> float:
+    """Converte '7.66s', '2m59.56s', '120ms' ou '30' em segundos"""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+
+    total = 0.0
+    matched = False
+    for amount, unit in re.findall(r"([\d.]+)(ms|h|m|s)", value):
+        matched = True
+        total += float(amount) * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+    return total if matched else None
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Backoff exponencial com jitter total (espalha os retries no tempo)"""
+    return random.uniform(base, min(cap, base * (2 ** attempt)))
+
+
+# "429" só conta junto de uma palavra de status HTTP (não em contagem de tokens/IDs)
+RATE_LIMIT_PATTERN = re.compile(
+    r"\b(?:http|status|code|error)\b[\s:=_-]*429\b|\b429\s+too many requests"
+    r"|\bresource_exhausted\b|\brate[\s_-]?limit",
+    re.IGNORECASE,
+)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    response = getattr(error, "response", None)
+    for status in (getattr(error, "status_code", None), getattr(error, "code", None),
+                   getattr(response, "status_code", None)):
+        if status == 429 or status == "429":
+            return True
+    return bool(RATE_LIMIT_PATTERN.search(str(error)))
+
+
+def retry_after_from_error(error: Exception) -> float:
+    """retry-after dos cabeçalhos da resposta de erro (se houver)"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for name in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        seconds = parse_reset(headers.get(name)) if hasattr(headers, "get") else None
+        if seconds:
+            return seconds
+    return None
+
+
+class ProviderRateLimiter:
+    """Baldes de requisições e tokens de um provider + pausa global após 429"""
+
+    def __init__(self, name: str, rpm: float, tpm: float, workers: int = 1):
+        """
+        Args:
+            name: Nome do provider (logs)
+            rpm: Requisições por minuto da conta
+            tpm: Tokens por minuto da conta
+            workers: Processos do bot dividindo a mesma conta (cada um usa 1/workers)
+        """
+        workers = max(1, workers)
+        self.name = name
+        self.requests = TokenBucket(rpm / workers)
+        self.tokens = TokenBucket(tpm / workers)
+        self._blocked_until = 0.0
+        self._cond = threading.Condition()
+
+        self.waits = 0
+        self.waited_seconds = 0.0
+        self.rate_limited = 0
+
+    def acquire(self, estimated_tokens: int, timeout: float = None) -> bool:
+        """
+        Espera na fila até poder fazer a requisição
+
+        Returns:
+            False se o timeout estourou
+        """
+        start = time.monotonic()
+        waited = False
+
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                delay = max(
+                    self._blocked_until - now,
+                    self.requests.wait_time(1, now),
+                    self.tokens.wait_time(estimated_tokens, now),
+                )
+                if delay <= 0:
+                    self.requests.take(1)
+                    self.tokens.take(estimated_tokens)
+                    break
+
+                if timeout is not None and now - start + delay > timeout:
+                    return False
+
+                waited = True
+                self._cond.wait(delay)
+
+            if waited:
+                self.waits += 1
+                self.waited_seconds += time.monotonic() - start
+        return True
+
+    def settle(self, estimated_tokens: int, actual_tokens: int):
+        """Acerta o balde de tokens com o uso real (devolve ou cobra a diferença)"""
+        if not actual_tokens:
+            return
+        with self._cond:
+            self.tokens.level = min(self.tokens.capacity,
+                                    self.tokens.level + estimated_tokens - actual_tokens)
+            self._cond.notify_all()
+
+    def refund(self, estimated_tokens: int):
+        """Devolve a reserva de uma tentativa que falhou sem gastar tokens (429, erro de rede)"""
+        with self._cond:
+            self.tokens.level = min(self.tokens.capacity,
+                                    self.tokens.level + min(estimated_tokens, self.tokens.capacity))
+            self._cond.notify_all()
+
+    def update_from_headers(self, headers):
+        """Corrige o saldo local com x-ratelimit-remaining-* da resposta"""
+        if not headers or not hasattr(headers, "get"):
+            return
+        now = time.monotonic()
+        with self._cond:
+            remaining = headers.get("x-ratelimit-remaining-requests")
+            if remaining is not None:
+                try:
+                    self.requests.set_remaining(float(remaining), now)
+                except ValueError:
+                    pass
+            remaining = headers.get("x-ratelimit-remaining-tokens")
+            if remaining is not None:
+                try:
+                    self.tokens.set_remaining(float(remaining), now)
+                except ValueError:
+                    pass
+
+    def penalize(self, seconds: float):
+        """Pausa todas as chamadas deste provider (após 429)"""
+        with self._cond:
+            self.rate_limited += 1
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+        print(f"   🚦 [{self.name}] limite de taxa, pausando {seconds:.1f}s")
+
+    def stats(self) -> dict:
+        return {
+            "waits": self.waits,
+            "waited_seconds": round(self.waited_seconds, 1),
+            "rate_limited": self.rate_limited,
+        }
+
+
+_LIMITERS = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def get_limiter(provider: str) -> ProviderRateLimiter:
+    """Limiter único por provider no processo"""
+    with _LIMITERS_LOCK:
+        if provider not in _LIMITERS:
+            limits = LLM_RATE_LIMITS.get(provider, {})
+            _LIMITERS[provider] = ProviderRateLimiter(
+                provider,
+                rpm=limits.get("rpm", 30),
+                tpm=limits.get("tpm", 100000),
+                workers=LLM_RATE_LIMITS["workers"],
+            )
+        return _LIMITERS[provider]
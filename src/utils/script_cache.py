@@ -0,0 +1,54 @@
+"""
+Cache de roteiros gerados pelo TextGenerator
+
+A chave combina tema normalizado, duração, número de cenas, provider, modelo
+e versão dos prompts. O valor é o roteiro já pós-processado (cenas e termos de
+busca garantidos, narração montada), então um hit não chama a API.
+"""
+import copy
+import re
+import unicodedata
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from config.settings import SCRIPT_CACHE, SCRIPT_CACHE_DIR
+from src.utils.disk_cache import DiskCache
+
+
+def normalize_topic(topic: str) -> str:
+    """Tema sem acentos, caixa, pontuação e espaços extras"""
+    text = unicodedata.normalize("NFKD", topic)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+class ScriptCache(DiskCache):
+    """DiskCache específico para roteiros"""
+
+    def __init__(self, cache_dir: str = None):
+        super().__init__(
+            "scripts",
+            cache_dir=cache_dir or SCRIPT_CACHE_DIR,
+            ttl=SCRIPT_CACHE["ttl_hours"] * 3600,
+            max_entries=SCRIPT_CACHE["max_entries"],
+            max_bytes=SCRIPT_CACHE["max_mb"] * 1024 * 1024,
+        )
+
+    @staticmethod
+    def make_key(topic: str, target_duration: int, num_scenes: int,
+                 provider: str, model: str, prompt_version: str) -> str:
+        return "|".join([
+            normalize_topic(topic), str(int(target_duration)), str(int(num_scenes)),
+            provider, model, prompt_version,
+        ])
+
+    def get_script(self, key: str) -> dict:
+        """Cópia do roteiro em cache (quem chama pode alterar à vontade)"""
+        script = self.get(key)
+        return copy.deepcopy(script) if script is not None else None
+
+    def set_script(self, key: str, script: dict):
+        self.set(key, copy.deepcopy(script))
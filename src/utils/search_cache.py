@@ -0,0 +1,140 @@
+"""
+Cache das respostas de busca do Tenor e do Pixabay
+
+Termos comuns ("stick figure thinking", "stickman excited"...) se repetem entre
+jobs; a resposta da busca fica em disco (DiskCache) e a cena resolve sem ida à
+rede. A chave combina provider, endpoint, termo normalizado, filtros e limite.
+
+Cada provider tem duas idades:
+- fresh: até aqui a resposta é usada direto
+- stale: até aqui é usada também, mas uma atualização roda em segundo plano
+  (stale-while-revalidate); depois disso conta como miss
+"""
+import threading
+import time
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from config.settings import SEARCH_CACHE, SEARCH_CACHE_DIR
+from src.utils.disk_cache import DiskCache
+
+FRESH = "fresh"
+STALE = "stale"
+MISS = "miss"
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(str(query).lower().split())
+
+
+class SearchCache(DiskCache):
+    """DiskCache das buscas, com revalidação em segundo plano"""
+
+    def __init__(self, cache_dir: str = None):
+        self.policies = {
+            provider: (hours["fresh_hours"] * 3600, hours["stale_hours"] * 3600)
+            for provider, hours in SEARCH_CACHE["providers"].items()
+        }
+        super().__init__(
+            "searches",
+            cache_dir=cache_dir or SEARCH_CACHE_DIR,
+            ttl=max(stale for _, stale in self.policies.values()),
+            max_entries=SEARCH_CACHE["max_entries"],
+            max_bytes=SEARCH_CACHE["max_mb"] * 1024 * 1024,
+        )
+        self._refreshing = set()
+        self.stale_hits = 0
+        self.revalidations = 0
+
+    @staticmethod
+    def make_key(provider: str, endpoint: str, query: str, filters: dict = None,
+                 limit: int = None) -> str:
+        filters = ";".join(f"{k}={v}" for k, v in sorted((filters or {}).items()))
+        return "|".join([provider, endpoint, normalize_query(query), filters, str(limit)])
+
+    def lookup(self, key: str):
+        """
+        Returns:
+            (resultados ou None, FRESH | STALE | MISS)
+        """
+        provider = key.split("|", 1)[0]
+        fresh, stale = self.policies.get(provider, (self.ttl, self.ttl))
+
+        entry = self.get_entry(key)
+        if entry is None:
+            self.misses += 1
+            return None, MISS
+
+        age = time.time() - entry["created"]
+        if age <= fresh:
+            self.hits += 1
+            return entry["value"], FRESH
+        if age <= stale:
+            self.stale_hits += 1
+            return entry["value"], STALE
+
+        self.misses += 1
+        self.delete(key)
+        return None, MISS
+
+    def state(self, key: str) -> str:
+        """FRESH | STALE | MISS sem mexer nas estatísticas (aquecimento do cache)"""
+        provider = key.split("|", 1)[0]
+        fresh, stale = self.policies.get(provider, (self.ttl, self.ttl))
+        entry = self.get_entry(key)
+        if entry is None:
+            return MISS
+        age = time.time() - entry["created"]
+        return FRESH if age <= fresh else STALE if age <= stale else MISS
+
+    def store(self, key: str, results):
+        """Guarda a resposta; None (erro de rede/HTTP) não entra no cache"""
+        if results is None:
+            return
+        try:
+            self.set(key, results)
+        except OSError as e:
+            print(f"   ⚠️ Cache de buscas: não foi possível gravar ({e})")
+
+    def revalidate(self, key: str, fetch):
+        """Atualiza a entrada em segundo plano (uma atualização por chave de cada vez)"""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run():
+            try:
+                self.store(key, fetch())
+                self.revalidations += 1
+            except Exception as e:
+                print(f"   ⚠️ Revalidação da busca falhou: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=run, daemon=True, name="search-revalidate").start()
+
+    def fetch(self, key: str, fetch):
+        """
+        Resposta do cache ou da rede (fetch() → lista, ou None em erro)
+
+        Stale: devolve o que tem e revalida em segundo plano.
+        """
+        results, state = self.lookup(key)
+        if state == STALE:
+            self.revalidate(key, fetch)
+        if state != MISS:
+            return results
+
+        results = fetch()
+        self.store(key, results)
+        return results if results is not None else []
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        stats["stale_hits"] = self.stale_hits
+        stats["revalidations"] = self.revalidations
+        return stats
@@ -0,0 +1,278 @@
+"""
+Termos de busca do Tenor a partir das descrições das cenas
+
+Os dicionários PT → EN viram UMA regex (alternância fatorada por prefixo, com
+limites de palavra), compilada uma vez: o prompt é percorrido uma única vez
+em vez de um `in` por entrada do dicionário a cada chamada. Limite de palavra
+também evita falsos positivos da busca por substring ("ar" em "para", "sol"
+em "solução"); plural simples (s/es) continua casando.
+"""
+import re
+
+# Mapeamento de ações/emoções PT → EN
+ACTION_MAPPINGS = {
+    "pensando": "thinking",
+    "pensar": "thinking",
+    "refletindo": "thinking pondering",
+    "andando": "walking",
+    "andar": "walking",
+    "correndo": "running",
+    "correr": "running fast",
+    "falando": "talking speaking",
+    "falar": "talking",
+    "apontando": "pointing",
+    "apontar": "pointing finger",
+    "dançando": "dancing",
+    "dançar": "dancing happy",
+    "escrevendo": "writing",
+    "escrever": "writing pen",
+    "digitando": "typing keyboard",
+    "digitar": "typing computer",
+    "pulando": "jumping",
+    "pular": "jumping excited",
+    "chorando": "crying sad",
+    "chorar": "crying tears",
+    "rindo": "laughing",
+    "rir": "laughing funny",
+    "gargalhando": "laughing hard lol",
+    "surpreso": "surprised shocked",
+    "surpresa": "surprised wow",
+    "chocado": "shocked omg",
+    "confuso": "confused thinking",
+    "feliz": "happy smiling",
+    "triste": "sad crying",
+    "animado": "excited happy",
+    "nervoso": "nervous anxious",
+    "com medo": "scared afraid",
+    "assustado": "scared frightened",
+    "bravo": "angry mad",
+    "irritado": "angry frustrated",
+    "dormindo": "sleeping zzz",
+    "acordando": "waking up morning",
+    "comendo": "eating food",
+    "bebendo": "drinking",
+    "trabalhando": "working busy",
+    "estudando": "studying reading",
+    "lendo": "reading book",
+    "olhando": "looking watching",
+    "procurando": "searching looking",
+    "esperando": "waiting bored",
+    "comemorando": "celebrating party",
+    "aplaudindo": "clapping applause",
+    "acenando": "waving hello",
+    "explicando": "explaining teaching",
+    "mostrando": "showing presenting",
+    "descobrindo": "discovering eureka",
+    "aprendendo": "learning studying",
+    "perguntando": "asking question",
+    "respondendo": "answering",
+    "concordando": "agreeing nodding yes",
+    "discordando": "disagreeing no",
+    "duvidando": "doubting hmm",
+    "amando": "loving heart",
+    "odiando": "hating angry",
+    "ignorando": "ignoring whatever",
+    "fugindo": "running away escape",
+    "chegando": "arriving coming",
+    "saindo": "leaving bye",
+    "começando": "starting begin",
+    "terminando": "finishing done",
+    "ganhando": "winning victory",
+    "perdendo": "losing fail",
+}
+
+# Mapeamento de conceitos/objetos PT → EN
+CONCEPT_MAPPINGS = {
+    "dinheiro": "money cash",
+    "rico": "rich money",
+    "pobre": "poor broke",
+    "cérebro": "brain smart",
+    "inteligente": "smart genius",
+    "burro": "dumb confused",
+    "coração": "heart love",
+    "amor": "love heart romantic",
+    "ódio": "hate angry",
+    "ideia": "idea lightbulb eureka",
+    "pergunta": "question confused",
+    "resposta": "answer solution",
+    "sucesso": "success winner",
+    "fracasso": "fail loser",
+    "vitória": "victory winning",
+    "derrota": "defeat losing",
+    "tempo": "time clock",
+    "rápido": "fast speed",
+    "devagar": "slow waiting",
+    "universo": "universe space galaxy",
+    "espaço": "space astronaut",
+    "planeta": "planet earth world",
+    "terra": "earth world globe",
+    "sol": "sun sunny bright",
+    "lua": "moon night",
+    "estrela": "star shining",
+    "fogo": "fire burning hot",
+    "água": "water splash",
+    "ar": "wind air blow",
+    "comida": "food eating hungry",
+    "fome": "hungry starving",
+    "casa": "house home",
+    "família": "family together",
+    "carro": "car driving",
+    "avião": "airplane flying",
+    "computador": "computer typing",
+    "celular": "phone texting",
+    "internet": "internet online",
+    "livro": "book reading",
+    "escola": "school studying",
+    "trabalho": "work office busy",
+    "música": "music dancing",
+    "filme": "movie watching",
+    "jogo": "game playing",
+    "esporte": "sports athletic",
+    "animal": "animal cute",
+    "cachorro": "dog puppy",
+    "gato": "cat kitty",
+    "pessoa": "person human",
+    "homem": "man guy",
+    "mulher": "woman girl",
+    "criança": "child kid",
+    "bebê": "baby cute",
+    "velho": "old elderly",
+    "jovem": "young teenager",
+    "amigo": "friend buddy",
+    "inimigo": "enemy rival",
+    "incrível": "amazing wow awesome",
+    "impressionante": "impressive wow",
+    "curioso": "curious wondering",
+    "interessante": "interesting hmm",
+    "chato": "boring bored",
+    "divertido": "funny fun",
+    "perigoso": "danger warning",
+    "seguro": "safe secure",
+    "importante": "important attention",
+    "secreto": "secret mystery shh",
+    "misterioso": "mystery suspicious",
+    "verdade": "true real",
+    "mentira": "lie false",
+    "problema": "problem trouble",
+    "solução": "solution fixed",
+    "começar": "start begin",
+    "fim": "end finish",
+    "primeiro": "first number one",
+    "último": "last final",
+    "maior": "bigger large",
+    "menor": "smaller tiny",
+    "melhor": "better best",
+    "pior": "worse worst",
+}
+
+
+# Palavras que não ajudam na busca (fallback com palavras do próprio prompt)
+STOPWORDS = frozenset({
+    "a", "o", "as", "os", "um", "uma", "de", "da", "do", "das", "dos",
+    "em", "na", "no", "nas", "nos", "para", "por", "com", "sem",
+    "que", "se", "é", "são", "foi", "era", "será", "está", "estão",
+    "muito", "mais", "menos", "bem", "mal", "aqui", "ali", "lá",
+    "isso", "isto", "esse", "este", "essa", "esta", "qual", "quais",
+    "como", "quando", "onde", "porque", "porquê", "scene", "showing",
+    "image", "depicting", "illustration", "about", "the", "and",
+    "cena", "mostrando", "imagem", "sobre", "dramatic", "high", "quality",
+    "parte", "primeiro", "segundo", "terceiro", "número",
+})
+
+
+def _trie_pattern(words) -> str:
+    """
+    Alternância fatorada por prefixo ("pens(?:ando|ar)" em vez de
+    "pensando|pensar"): o `re` testa cada prefixo uma vez só, em vez de
+    tentar todas as palavras em cada posição do texto
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def build(node) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        # Palavra que termina aqui: o resto é opcional (guloso → mais longa primeiro)
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class KeywordMatcher:
+    """Vários dicionários PT → EN numa regex só (uma passada pelo texto)"""
+
+    def __init__(self, *mappings: dict):
+        self._values = [list(mapping.values()) for mapping in mappings]
+        # palavra → [(dicionário, posição no dicionário)]
+        self._positions = {}
+        for index, mapping in enumerate(mappings):
+            for position, word in enumerate(mapping):
+                self._positions.setdefault(word, []).append((index, position))
+
+        self._pattern = re.compile(rf"\b({_trie_pattern(self._positions)})(?:e?s)?\b")
+
+    def find(self, text: str) -> tuple:
+        """
+        Returns:
+            Uma lista de traduções por dicionário, na ordem do dicionário
+            (sem repetição), como no laço antigo
+        """
+        found = [set() for _ in self._values]
+        for match in self._pattern.finditer(text):
+            for index, position in self._positions[match.group(1)]:
+                found[index].add(position)
+        return tuple(
+            [values[position] for position in sorted(positions)]
+            for values, positions in zip(self._values, found)
+        )
+
+
+def relevant_words(text: str) -> list:
+    return [w for w in text.split() if w not in STOPWORDS and len(w) > 3]
+
+
+if __name__ == "__main__":
+    import time
+
+    # 60 cenas × até 4 tentativas por cena (termo novo a cada retry)
+    prompts = [
+        "Boneco palito pensando sobre o universo e as estrelas, mostrando surpresa",
+        "Pessoa correndo para o trabalho com o celular na mão, muito atrasada",
+        "Cena dramática de uma criança descobrindo uma ideia incrível na escola",
+        "Homem comemorando a vitória com os amigos, dinheiro caindo do céu",
+        "Mulher confusa olhando o computador, problema misterioso na internet",
+        "Ilustração de um planeta distante com fogo e água em parte da imagem",
+    ] * 40
+
+    def legacy(prompt):
+        legacy_stopwords = list(STOPWORDS)      # a lista era recriada a cada chamada
+        prompt_lower = prompt.lower()
+        actions = [en for pt, en in ACTION_MAPPINGS.items() if pt in prompt_lower]
+        concepts = [en for pt, en in CONCEPT_MAPPINGS.items() if pt in prompt_lower]
+        words = [w for w in prompt_lower.split() if w not in legacy_stopwords and len(w) > 3]
+        return actions, concepts, words
+
+    matcher = KeywordMatcher(ACTION_MAPPINGS, CONCEPT_MAPPINGS)
+
+    def compiled(prompt):
+        prompt_lower = prompt.lower()
+        actions, concepts = matcher.find(prompt_lower)
+        return actions, concepts, relevant_words(prompt_lower)
+
+    for name, func in (("substring + lista", legacy), ("regex + frozenset", compiled)):
+        start = time.perf_counter()
+        for _ in range(20):
+            for prompt in prompts:
+                func(prompt)
+        elapsed = (time.perf_counter() - start) / 20
+        print(f"{name:>18}: {elapsed * 1000:.2f} ms por job de 60 cenas ({len(prompts)} chamadas)")
+
+    # "ar" (de "para") não entra mais como conceito
+    print("antes:", legacy(prompts[1])[:2])
+    print("agora:", compiled(prompts[1])[:2])
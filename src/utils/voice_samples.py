@@ -0,0 +1,127 @@
+"""
+Amostras de voz pré-geradas para o menu /voice
+
+Sintetiza uma frase curta fixa para cada voz × velocidade e guarda em disco.
+No bot, a amostra é enviada direto do cache, sem chamar o TTS na hora.
+"""
+import asyncio
+import hashlib
+import os
+import uuid
+from pathlib import Path
+import sys
+
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from config.settings import VOICE_SAMPLES_DIR
+
+SAMPLE_PHRASE = "Olá! Esta é uma amostra da minha voz. Posso narrar os seus vídeos assim."
+
+
+class VoiceSampleStore:
+    """Cache em disco de amostras de voz"""
+
+    def __init__(self, audio_gen, cache_dir: str = None, phrase: str = SAMPLE_PHRASE):
+        """
+        Args:
+            audio_gen: AudioGenerator só das amostras (usa o Edge direto, sem
+                os circuit breakers do gerador dos jobs)
+            cache_dir: Pasta das amostras
+            phrase: Frase falada em todas as amostras
+        """
+        self.audio_gen = audio_gen
+        self.cache_dir = Path(cache_dir or VOICE_SAMPLES_DIR)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.phrase = phrase
+
+        # Trocar a frase invalida as amostras antigas
+        self._phrase_id = hashlib.sha1(phrase.encode("utf-8")).hexdigest()[:8]
+
+        # file_id do Telegram por amostra (evita reenviar o arquivo)
+        self.file_ids = {}
+
+        self._building = None
+        self._pending = {}      # (voz, velocidade) → tarefa em andamento (botão + build juntos)
+
+    def path_for(self, voice: str, speed: str) -> Path:
+        return self.cache_dir / f"{voice}_{speed}_{self._phrase_id}.mp3"
+
+    def get(self, voice: str, speed: str) -> str:
+        """Retorna o caminho da amostra se já estiver em cache, senão None"""
+        path = self.path_for(voice, speed)
+        if path.exists() and path.stat().st_size > 0:
+            return str(path)
+        return None
+
+    async def ensure(self, voice: str, speed: str) -> str:
+        """Retorna a amostra, sintetizando se ainda não existir"""
+        cached = self.get(voice, speed)
+        if cached:
+            return cached
+
+        # Mesma amostra já sendo gerada (build de startup + botão do usuário): espera a mesma
+        key = (voice, speed)
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._synthesize(voice, speed))
+            self._pending[key] = task
+            task.add_done_callback(
+                lambda done: self._pending.pop(key) if self._pending.get(key) is done else None
+            )
+        return await asyncio.shield(task)
+
+    async def _synthesize(self, voice: str, speed: str) -> str:
+        path = self.path_for(voice, speed)
+        # Nome único: outro processo gerando a mesma amostra não mistura os bytes
+        tmp_path = str(path.with_name(f"{path.stem}.{uuid.uuid4().hex[:8]}.tmp.mp3"))
+
+        # Só Edge (amostra do gTTS não representa a voz escolhida)
+        try:
+            await self.audio_gen.generate_edge_async(self.phrase, tmp_path, voice, float(speed))
+        except Exception as e:
+            print(f"   ⚠️ Amostra {voice} {speed}x: Edge-TTS falhou ({e})")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            return None
+
+        os.replace(tmp_path, path)
+        return str(path)
+
+    async def build(self, voices, speeds, concurrency: int = 3) -> dict:
+        """
+        Gera todas as amostras faltantes (voz × velocidade)
+
+        Returns:
+            Dict com contagem de amostras em cache, geradas e com falha
+        """
+        missing = [(v, s) for v in voices for s in speeds if not self.get(v, s)]
+        stats = {"cached": len(voices) * len(speeds) - len(missing), "generated": 0, "failed": 0}
+
+        if not missing:
+            return stats
+
+        print(f"🔊 Gerando {len(missing)} amostras de voz em segundo plano...")
+        slots = asyncio.Semaphore(concurrency)
+
+        async def one(voice, speed):
+            async with slots:
+                try:
+                    ok = await self.ensure(voice, speed)
+                except Exception as e:
+                    print(f"   ⚠️ Amostra {voice} {speed}x falhou: {e}")
+                    ok = None
+            stats["generated" if ok else "failed"] += 1
+
+        await asyncio.gather(*(one(v, s) for v, s in missing))
+
+        print(f"✅ Amostras de voz: {stats['generated']} geradas, "
+              f"{stats['cached']} em cache, {stats['failed']} falhas")
+        return stats
+
+    def start_background_build(self, voices, speeds):
+        """Agenda o build no event loop atual (uma vez por processo)"""
+        if self._building is None or self._building.done():
+            self._building = asyncio.create_task(self.build(list(voices), list(speeds)))
+        return self._building
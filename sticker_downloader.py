@@ -10,6 +10,9 @@ from pathlib import Path
 from dotenv import load_dotenv
 import logging
 
+from config.settings import DOWNLOAD_LIMITS
+from src.utils.http_download import DownloadError, download_file
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
@@ -241,25 +244,22 @@ class StickerDownloader:
                 logger.error("Nenhum formato adequado encontrado")
                 return None
             
-            # Baixa o arquivo
-            response = requests.get(media_url, timeout=60)
+            # Baixa o arquivo (streaming direto para o disco, com limites)
+            download_file(media_url, output_path, expected=("mp4",) if media_type == "video" else ("gif",))
             
-            if response.status_code == 200:
-                with open(output_path, "wb") as f:
-                    f.write(response.content)
-                
-                # Obtém duração do clipe
-                duration = self._get_media_duration(output_path)
-                
-                return {
-                    "path": output_path,
-                    "type": media_type,
-                    "duration": duration,
-                    "source": "tenor"
-                }
+            # Obtém duração do clipe
+            duration = self._get_media_duration(output_path)
             
-            return None
+            return {
+                "path": output_path,
+                "type": media_type,
+                "duration": duration,
+                "source": "tenor"
+            }
             
+        except DownloadError as e:
+            logger.error(f"Download do Tenor abortado: {e}")
+            return None
         except Exception as e:
             logger.error(f"Erro ao baixar do Tenor: {e}")
             return None
@@ -304,21 +304,21 @@ class StickerDownloader:
             
             output_path = output_path.rsplit(".", 1)[0] + ".jpg"
             
-            response = requests.get(image_url, timeout=60)
+            download_file(
+                image_url, output_path, expected=("jpeg", "png", "webp"),
+                max_bytes=DOWNLOAD_LIMITS["image_max_mb"] * 1024 * 1024
+            )
             
-            if response.status_code == 200:
-                with open(output_path, "wb") as f:
-                    f.write(response.content)
-                
-                return {
-                    "path": output_path,
-                    "type": "image",
-                    "duration": 0,  # Imagens não têm duração
-                    "source": "pixabay"
-                }
+            return {
+                "path": output_path,
+                "type": "image",
+                "duration": 0,  # Imagens não têm duração
+                "source": "pixabay"
+            }
             
+        except DownloadError as e:
+            logger.error(f"Download do Pixabay abortado: {e}")
             return None
-            
         except Exception as e:
             logger.error(f"Erro ao baixar do Pixabay: {e}")
             return None